@@ -0,0 +1,245 @@
+"""
+Admission control - bounded, priority-ordered access to frame processing
+
+At most max_active frames are processed at once per worker. Further frames wait
+in a queue of at most max_queue entries, urgent sessions first (alert active,
+confirmation running, eyes closing or score rising - as of the session's last
+frame), then in arrival order. A frame is rejected right away when the queue is
+full (unless it is urgent and a non-urgent frame can be shed to make room) or
+when it has waited max_wait seconds, so latency stays bounded at saturation.
+
+Each session also has a token bucket: rate frames per second on average, bursts
+of up to burst frames. A frame may name a different client key for its bucket
+(the server uses the remote address for clients that send no session id, which
+all share one session). Rejections carry a retry-after estimate for the client.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+MIN_RETRY_AFTER = 0.1  # Seconds; floor of the retry-after estimate
+MAX_RETRY_AFTER = 5.0
+SERVICE_TIME_SMOOTHING = 0.1  # Weight of the newest frame in the mean processing time
+
+# Rejection reason -> HTTP status
+REJECT_STATUS = {'rate_limited': 429, 'queue_full': 503, 'shed': 503, 'timeout': 503}
+REJECT_MESSAGES = {
+    'rate_limited': 'Too many frames for this session',
+    'queue_full': 'Server busy',
+    'shed': 'Server busy (frame dropped for a more urgent one)',
+    'timeout': 'Server busy (queued too long)'
+}
+
+
+class Rejected(Exception):
+    """A frame turned away by admission control; retry_after in seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f'{REJECT_MESSAGES[reason]}, retry after {retry_after:.1f}s')
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def status(self):
+        return REJECT_STATUS[self.reason]
+
+    def headers(self):
+        # Retry-After takes whole seconds
+        return {'Retry-After': str(max(1, math.ceil(self.retry_after)))}
+
+    def payload(self):
+        return {'error': str(self), 'reason': self.reason, 'retry_after_ms': int(self.retry_after * 1000)}
+
+
+class _Session:
+    """Per-session token bucket and priority"""
+    __slots__ = ('tokens', 'updated', 'urgent')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.urgent = False
+
+
+class _Waiter:
+    __slots__ = ('event', 'outcome')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.outcome = None  # 'admitted' or 'shed' once decided
+
+
+class AdmissionController:
+    """Processing slots, priority wait queue and per-session rate limits"""
+
+    def __init__(self, max_active, max_queue, max_wait, rate, burst, max_sessions=1000, clock=time.monotonic):
+        if max_active < 1:
+            raise ValueError('max_active must be at least 1')
+        self.max_active = max_active
+        self.max_queue = max(max_queue, 0)
+        self.max_wait = max_wait
+        self.rate = rate  # Frames per second per session; 0 = unlimited
+        self.burst = max(burst, 1)
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = {}  # In creation order; the oldest go first beyond max_sessions
+        self._queue = []  # Heap of (0 urgent / 1 normal, arrival number, waiter)
+        self._arrivals = itertools.count()
+        self.active = 0
+        self.service_time = None  # Smoothed seconds per admitted frame
+        self.admitted = 0
+        self.admitted_urgent = 0
+        self.queued = 0
+        self.rejected = {reason: 0 for reason in REJECT_STATUS}
+
+    # ---- per-session state ---------------------------------------------------
+
+    def _session(self, session_id, now):
+        session = self._sessions.get(session_id)
+        if session is None:
+            while len(self._sessions) >= self.max_sessions:
+                del self._sessions[next(iter(self._sessions))]
+            session = self._sessions[session_id] = _Session(self.burst, now)
+        return session
+
+    def set_urgent(self, session_id, urgent):
+        """Record whether the session's latest frame makes its next frames urgent"""
+        with self._lock:
+            self._session(session_id, self._clock()).urgent = urgent
+
+    def discard(self, session_id):
+        """Forget a session (registry eviction listener)"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _take_token(self, session, now):
+        """Seconds until the session may send again, or 0 after taking a token. Caller holds the lock."""
+        if not self.rate:
+            return 0.0
+        session.tokens = min(self.burst, session.tokens + (now - session.updated) * self.rate)
+        session.updated = now
+        if session.tokens >= 1.0:
+            session.tokens -= 1.0
+            return 0.0
+        return (1.0 - session.tokens) / self.rate
+
+    def _retry_after(self):
+        """Estimated seconds until a slot frees up for a new frame. Caller holds the lock."""
+        if self.service_time is None:
+            return MIN_RETRY_AFTER
+        estimate = self.service_time * (len(self._queue) + 1) / self.max_active
+        return min(max(estimate, MIN_RETRY_AFTER), MAX_RETRY_AFTER)
+
+    def _reject(self, reason, retry_after):
+        self.rejected[reason] += 1
+        return Rejected(reason, retry_after)
+
+    # ---- slots ---------------------------------------------------------------
+
+    @property
+    def queue_length(self):
+        """Frames waiting for a slot right now"""
+        return len(self._queue)
+
+    def _acquire(self, session_id, client=None):
+        """Take a processing slot for one frame of session_id (blocks while queued)"""
+        with self._lock:
+            now = self._clock()
+            session = self._session(session_id, now)
+            bucket = session if client is None else self._session(client, now)
+            wait = self._take_token(bucket, now)
+            if wait:
+                raise self._reject('rate_limited', wait)
+            urgent = session.urgent
+            if self.active < self.max_active and not self._queue:
+                self.active += 1
+                self._count_admitted(urgent)
+                return urgent
+            if len(self._queue) >= self.max_queue:
+                if not (urgent and self._shed_one()):
+                    raise self._reject('queue_full', self._retry_after())
+            waiter = _Waiter()
+            heapq.heappush(self._queue, (0 if urgent else 1, next(self._arrivals), waiter))
+            self.queued += 1
+
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            if waiter.outcome == 'admitted':
+                self._count_admitted(urgent)
+                return urgent
+            if waiter.outcome is None:
+                # Timed out: leave the queue
+                self._queue = [item for item in self._queue if item[2] is not waiter]
+                heapq.heapify(self._queue)
+                raise self._reject('timeout', self._retry_after())
+            raise self._reject('shed', self._retry_after())
+
+    def _shed_one(self):
+        """Drop the newest non-urgent waiter to make room; False if all are urgent. Caller holds the lock."""
+        normal = [item for item in self._queue if item[0] == 1]
+        if not normal:
+            return False
+        victim = max(normal)
+        self._queue.remove(victim)
+        heapq.heapify(self._queue)
+        victim[2].outcome = 'shed'
+        victim[2].event.set()
+        return True
+
+    def _count_admitted(self, urgent):
+        self.admitted += 1
+        if urgent:
+            self.admitted_urgent += 1
+
+    def _release(self, seconds):
+        with self._lock:
+            if self.service_time is None:
+                self.service_time = seconds
+            else:
+                self.service_time += SERVICE_TIME_SMOOTHING * (seconds - self.service_time)
+            if self._queue:
+                # Hand the slot straight to the most urgent, longest-waiting frame
+                _, _, waiter = heapq.heappop(self._queue)
+                waiter.outcome = 'admitted'
+                waiter.event.set()
+            else:
+                self.active -= 1
+
+    @contextmanager
+    def admit(self, session_id, client=None):
+        """
+        with admission.admit(session_id) as waited: ... - runs the block in a processing
+        slot (waited = seconds spent queued), raising Rejected if the frame is turned away.
+        client: rate-limit key if not the session id.
+        """
+        arrived = self._clock()
+        self._acquire(session_id, client)
+        start = self._clock()
+        try:
+            yield start - arrived
+        finally:
+            self._release(self._clock() - start)
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'active': self.active,
+                'max_active': self.max_active,
+                'queue_length': len(self._queue),
+                'max_queue': self.max_queue,
+                'max_wait_seconds': self.max_wait,
+                'rate_per_session': self.rate,
+                'burst_per_session': self.burst,
+                'sessions': len(self._sessions),
+                'urgent_sessions': sum(session.urgent for session in self._sessions.values()),
+                'admitted': self.admitted,
+                'admitted_urgent': self.admitted_urgent,
+                'queued': self.queued,
+                'rejected': dict(self.rejected),
+                'service_time_ms': round(self.service_time * 1000, 2) if self.service_time is not None else None
+            }
@@ -0,0 +1,276 @@
+"""
+Offline analysis - run the live detection logic over recorded video files
+
+Frames are streamed from cv2.VideoCapture through a generator pipeline
+(read -> sample -> analyze) and fed to the same analyze_frame() the API uses, with
+video time instead of wall-clock time. Long files are split into chunks that run in
+parallel worker processes. A chunk starts WARMUP_SECONDS before its first reported
+frame and replays that stretch silently, so the temporal state (EAR history, drowsy
+score, closure and confirmation timers, alert grace period) is rebuilt before its
+own frames are scored. Each chunk boundary is checked: the state rebuilt by the
+warm-up is compared with the state the previous chunk ended in.
+
+    python analyze_video.py dashcam.mp4 [--fps 5] [--processes 8] [-o timeline.json]
+
+Output is a columnar JSON timeline (t, ear, score, drowsy per analyzed frame) plus
+the alert intervals and a summary.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import namedtuple
+
+# Alerts are reported in the output file; keep the per-event trace quiet by default
+os.environ.setdefault('TRACE_LEVEL', 'warning')
+
+import cv2  # noqa: E402
+
+ANALYSIS_FPS = 5.0  # Frames analyzed per second of video (the frontend streams one frame per 200 ms)
+CHUNK_SECONDS = 120.0  # Video per parallel chunk
+WARMUP_SECONDS = 15.0  # Replayed before each chunk; well past the EAR history, grace period and score decay
+
+# Frame indices [warmup_start, start) are replayed, [start, stop) reported
+Chunk = namedtuple('Chunk', ['index', 'warmup_start', 'start', 'stop'])
+
+
+def video_info(path):
+    """(frames per second, frame count) of a video file"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f'Cannot open video: {path}')
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        capture.release()
+    if fps <= 0:
+        raise ValueError(f'Video reports no frame rate: {path}')
+    return fps, frame_count
+
+
+def plan_chunks(frame_count, step, chunk_frames, warmup_frames):
+    """
+    Split [0, frame_count) into chunks whose boundaries fall on sampled frames
+    (multiples of step). Every sampled frame is reported by exactly one chunk;
+    warm-up starts are on the same grid.
+    """
+    chunk_frames = max(chunk_frames // step, 1) * step
+    warmup_frames = -(-warmup_frames // step) * step
+    chunks = []
+    for start in range(0, frame_count, chunk_frames):
+        stop = min(start + chunk_frames, frame_count)
+        chunks.append(Chunk(len(chunks), max(start - warmup_frames, 0), start, stop))
+    return chunks
+
+
+def read_frames(path, start, stop, step):
+    """Yield (frame index, BGR frame) for every step-th frame in [start, stop); start must be a multiple of step"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f'Cannot open video: {path}')
+    try:
+        if start:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        while index < stop:
+            if index % step == 0:
+                ok, frame = capture.read()
+                if not ok:
+                    return
+                yield index, frame
+            elif not capture.grab():  # Skipped frames are demuxed but never converted to BGR
+                return
+            index += 1
+    finally:
+        capture.release()
+
+
+def alert_intervals(times, drowsy, frame_interval):
+    """[[start, end], ...] in seconds for each run of drowsy frames; a run ends one frame after its last frame"""
+    intervals = []
+    start = None
+    for t, is_drowsy in zip(times, drowsy):
+        if is_drowsy and start is None:
+            start = t
+        elif not is_drowsy and start is not None:
+            intervals.append([start, t])
+            start = None
+    if start is not None:
+        intervals.append([start, round(times[-1] + frame_interval, 3)])
+    return intervals
+
+
+# ============================================================================
+# WORKER SIDE
+# ============================================================================
+
+_detector = None
+
+
+def load_detector():
+    """api_server, imported once per worker process (its startup banner goes to stderr)"""
+    global _detector
+    if _detector is None:
+        with contextlib.redirect_stdout(sys.stderr):
+            import api_server
+        _detector = api_server
+    return _detector
+
+
+def state_fingerprint(state):
+    """The parts of DrowsinessState that decide future output, rounded like the output"""
+    return [
+        round(state.drowsy_score, 1), state.is_in_alert, state.eyes_closed_start,
+        state.confirmation_start, state.last_alert_time, [round(ear, 3) for ear in state.ear_history]
+    ]
+
+
+def analyze_frames(frames, fps, session_id):
+    """
+    Generator stage: (frame index, frame) in, (frame index, result dict, state) out.
+    One DrowsinessState for the whole stream, timed by the video clock.
+    """
+    api_server = load_detector()
+    state = api_server.DrowsinessState()
+    try:
+        for index, frame in frames:
+            original_shape = frame.shape
+            if not api_server.ROI_CROP:
+                frame = api_server.resize_for_processing(frame)  # Everything downstream works at this size
+            result = api_server.analyze_frame(state, frame, original_shape, index / fps, session_id)
+            yield index, result, state
+    finally:
+        api_server.tracking_meshes.release(session_id)
+
+
+def analyze_chunk(job):
+    """
+    Process one chunk. Returns its columns, the state after the warm-up (before its
+    first reported frame) and the state after its last frame.
+    """
+    path, chunk, step, fps = job
+    columns = {'t': [], 'ear': [], 'score': [], 'drowsy': []}
+    warm_state = end_state = None
+    frames = read_frames(path, chunk.warmup_start, chunk.stop, step)
+    for index, result, state in analyze_frames(frames, fps, f'video-{os.getpid()}-{chunk.index}'):
+        if index < chunk.start:
+            warm_state = state_fingerprint(state)  # Warm-up: rebuild state, report nothing
+            continue
+        columns['t'].append(round(index / fps, 3))
+        columns['ear'].append(result.get('ear'))  # None when no face was found
+        columns['score'].append(result['drowsy_score'])
+        columns['drowsy'].append(bool(result['is_drowsy']))
+        end_state = state
+    return {
+        'chunk': chunk.index,
+        'columns': columns,
+        'warm_state': warm_state,
+        'end_state': state_fingerprint(end_state) if end_state is not None else None
+    }
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def analyze_video(path, analysis_fps=ANALYSIS_FPS, processes=None, chunk_seconds=CHUNK_SECONDS,
+                  warmup_seconds=WARMUP_SECONDS, progress=None):
+    """
+    Analyze a whole video; returns the output document (timeline, alerts, summary).
+    progress(done, total) is called as chunks finish.
+    """
+    started = time.perf_counter()
+    fps, frame_count = video_info(path)
+    step = max(int(round(fps / analysis_fps)), 1)
+    if frame_count > 0:
+        chunks = plan_chunks(frame_count, step, int(chunk_seconds * fps), int(warmup_seconds * fps))
+    else:
+        chunks = [Chunk(0, 0, 0, sys.maxsize)]  # Length unknown (some streams): one sequential pass
+    jobs = [(path, chunk, step, fps) for chunk in chunks]
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+
+    if processes == 1:
+        results = []
+        for job in jobs:
+            results.append(analyze_chunk(job))
+            if progress:
+                progress(len(results), len(jobs))
+    else:
+        # spawn: each worker builds its own MediaPipe graphs
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            results = []
+            for result in pool.imap(analyze_chunk, jobs):
+                results.append(result)
+                if progress:
+                    progress(len(results), len(jobs))
+
+    timeline = {'t': [], 'ear': [], 'score': [], 'drowsy': []}
+    mismatches = []
+    for previous, result in zip([None] + results[:-1], results):
+        for key, values in result['columns'].items():
+            timeline[key].extend(values)
+        if previous is not None and result['warm_state'] != previous['end_state']:
+            mismatches.append(result['columns']['t'][0] if result['columns']['t'] else None)
+
+    frame_interval = step / fps
+    alerts = alert_intervals(timeline['t'], timeline['drowsy'], frame_interval)
+    duration = (timeline['t'][-1] + frame_interval) if timeline['t'] else 0.0
+    wall_seconds = time.perf_counter() - started
+    return {
+        'video': os.path.abspath(path),
+        'video_fps': fps,
+        'analysis_fps': round(fps / step, 3),
+        'timeline': timeline,
+        'alerts': alerts,
+        'summary': {
+            'duration_seconds': round(duration, 3),
+            'frames_analyzed': len(timeline['t']),
+            'frames_without_face': sum(ear is None for ear in timeline['ear']),
+            'alert_count': len(alerts),
+            'alert_seconds': round(sum(end - start for start, end in alerts), 3),
+            'chunks': len(chunks),
+            'processes': processes,
+            # Chunk starts (seconds) where the warm-up did not rebuild the previous chunk's state
+            'boundary_mismatches': mismatches,
+            'wall_seconds': round(wall_seconds, 3),
+            'speed_vs_real_time': round(duration / wall_seconds, 1) if wall_seconds else None
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('video', help='Video file readable by OpenCV')
+    parser.add_argument('-o', '--output', help='Timeline JSON file (default: <video>.timeline.json)')
+    parser.add_argument('--fps', type=float, default=ANALYSIS_FPS, help='Frames analyzed per second of video')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Parallel worker processes')
+    parser.add_argument('--chunk-seconds', type=float, default=CHUNK_SECONDS, help='Video per parallel chunk')
+    parser.add_argument('--warmup-seconds', type=float, default=WARMUP_SECONDS,
+                        help='Video replayed before each chunk to rebuild the detection state')
+    args = parser.parse_args()
+
+    def progress(done, total):
+        print(f'\rchunks {done}/{total}', end='' if done < total else '\n', file=sys.stderr, flush=True)
+
+    report = analyze_video(args.video, args.fps, args.processes, args.chunk_seconds, args.warmup_seconds, progress)
+    output = args.output or os.path.splitext(args.video)[0] + '.timeline.json'
+    with open(output, 'w') as f:
+        json.dump(report, f, separators=(',', ':'))
+
+    summary = report['summary']
+    print(f"{summary['duration_seconds']:.1f}s of video, {summary['frames_analyzed']} frames analyzed in "
+          f"{summary['wall_seconds']:.1f}s ({summary['speed_vs_real_time']}x real time, "
+          f"{summary['processes']} processes, {summary['chunks']} chunks)")
+    for start, end in report['alerts']:
+        print(f'  alert {start:9.2f}s - {end:9.2f}s')
+    if summary['boundary_mismatches']:
+        print(f"  warning: warm-up did not converge at {summary['boundary_mismatches']} - raise --warmup-seconds")
+    print(f'Wrote {output}')
+
+
+if __name__ == '__main__':
+    main()
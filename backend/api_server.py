@@ -1,12 +1,46 @@
 import os
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import cv2
-import numpy as np
-import base64
-import mediapipe as mp
-from collections import deque
+import json
+import atexit
+import functools
+import tempfile
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from startup import StartupTimer
+
+# Cold-start measurements: each heavy import, then model build and warm-up (see /ready)
+startup = StartupTimer()
+with startup.phase('import_flask'):
+    from flask import Flask, request, jsonify
+    from flask_cors import CORS
+    from flask_sock import Sock
+with startup.phase('import_numpy'):
+    import numpy as np
+with startup.phase('import_cv2'):
+    import cv2
+with startup.phase('import_mediapipe'):
+    import mediapipe  # noqa: F401 - timed here; face_mesh_pool.build_face_mesh uses it
+with startup.phase('import_detector_modules'):
+    from sessions import SessionRegistry
+    from shared_sessions import SharedSessionRegistry
+    from face_mesh_pool import FaceMeshPool, build_face_mesh
+    from frames import PROCESSING_SIZE, decode_data_uri, decode_image_bytes, resize_for_processing
+    from landmarks import (
+        LEFT_EYE_IDX, RIGHT_EYE_IDX, landmarks_to_array, eye_points_to_array, calc_face_box, eye_aspect_ratios,
+        parse_face_box
+    )
+    from change_detector import ChangeDetector
+    from inference_workers import InferenceWorkerPool
+    from tracing import Tracer, parse_level
+    from metrics import Metrics
+    from scoring import ScoringEngine, ScoringParams, ScoringState
+    from recorder import SessionRecorder
+    from face_tracker import FaceTracks
+    from frame_cache import FrameCache, frame_key
+    from sampling import SamplingPolicy
+    from admission import AdmissionController, Rejected
 
 app = Flask(__name__)
 
@@ -16,330 +50,937 @@ CORS(app, resources={
     r"/*": {
         "origins": "*",
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "X-Session-ID"]
     }
 })
 
 print("[CORS] Configured to allow all origins (*)")
 
-# ============================================================================
-# INTELLIGENT DROWSINESS DETECTION PARAMETERS
-# ============================================================================
+# WebSocket support for the streaming endpoint (/ws/detect)
+sock = Sock(app)
+
+# Tracing - structured diagnostic events, buffered and written by a background thread.
+# TRACE_LEVEL=debug shows every per-frame detail (EAR, blink, score changes).
+TRACE_LEVEL = parse_level(os.environ.get('TRACE_LEVEL', 'info'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 1.0))  # Share of sessions traced below WARNING
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', 10000))  # Oldest events dropped beyond this
+TRACE_FORMAT = os.environ.get('TRACE_FORMAT', 'text')  # 'text' or 'json' (one object per line)
+
+# Metrics - per-stage latency histograms and counters served at /metrics. Each process
+# writes its own memory-mapped file in METRICS_DIR (set by gunicorn_config.py) so a
+# scrape of any worker reports all of them; unset = this process only.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Session recording (opt-in) - every frame's landmarks, raw EAR and emitted result are
+# appended to a memory-mapped file per session in RECORD_DIR, for replay_sessions.py
+RECORD_SESSIONS = os.environ.get('RECORD_SESSIONS', 'false').lower() == 'true'
+RECORD_DIR = os.environ.get('RECORD_DIR', 'recordings')
+
+# Session registry - one detection state per client session
+DEFAULT_SESSION_ID = 'default'  # Used by clients that don't send a session id
+MAX_SESSION_ID_LENGTH = 128
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 1000))  # LRU-evict beyond this
+SESSION_TTL_SECONDS = float(os.environ.get('SESSION_TTL_SECONDS', 300))  # Evict after this long idle
+# State backend: 'memory' = each process keeps its own sessions, 'shared' = every
+# session's scoring state lives in STATE_FILE, a memory-mapped table all worker
+# processes share, so a client's frames may land on any worker (see gunicorn_config.py)
+STATE_BACKEND = os.environ.get('STATE_BACKEND', 'memory')
+STATE_FILE = os.environ.get('STATE_FILE') or os.path.join(tempfile.gettempdir(), 'drowsiness-sessions.bin')
+
+# Face mesh mode: 'tracking' = per-session FaceMesh that tracks landmarks between frames,
+# 'static' = one shared FaceMesh running full face detection on every frame
+FACE_MESH_MODE = os.environ.get('FACE_MESH_MODE', 'tracking')
+MAX_TRACKING_MESHES = int(os.environ.get('MAX_TRACKING_MESHES', 16))  # Cap on tracking instances (~1 per active camera)
+TRACKING_MESH_IDLE_SECONDS = float(os.environ.get('TRACKING_MESH_IDLE_SECONDS', 120))
+# With the pool full, a new session takes over an instance only if it was unused this
+# long; otherwise it falls back to the static mesh instead of rebuilding one per frame
+TRACKING_MESH_RECLAIM_SECONDS = float(os.environ.get('TRACKING_MESH_RECLAIM_SECONDS', 10))
+
+# Multi-face: with MAX_FACES > 1 one inference returns every occupant's landmarks. Faces
+# keep stable ids across frames (box overlap, see face_tracker.py), each face has its own
+# DrowsinessState and the response adds a per-face 'faces' array. ROI cropping and frame
+# skipping follow a single face, so they are off in this mode.
+MAX_FACES = max(int(os.environ.get('MAX_FACES', 1)), 1)
 
-# Eye Aspect Ratio thresholds - ADJUSTED FOR REAL DROWSINESS DETECTION
-# Lower thresholds = only trigger on genuinely closed/very sleepy eyes
-EAR_THRESHOLD = 0.24  # Below this = eyes truly closed/very sleepy (was 0.27)
-EAR_ALERT_THRESHOLD = 0.28  # Above this = definitely alert (was 0.32)
-EAR_PARTIAL_OPEN = 0.24  # Between closed and open = slightly open, don't count as drowsy
+# Region-of-interest cropping: run the mesh only on the padded area around the
+# previous frame's face box (full frame again whenever no face is found there).
+# Crops always go through a static-image mesh, never the session's tracking mesh
+ROI_CROP = os.environ.get('ROI_CROP', 'false').lower() == 'true' and MAX_FACES == 1
+ROI_PADDING = 0.25  # Pad the face box by 25% of its size on each side
+ROI_INPUT_SIZE = 192  # Longest side of the crop fed to the mesh (pixels)
+ROI_MIN_SIZE = 32  # Smaller crops fall back to the full frame
 
-# Blink detection - to ignore normal blinks
-BLINK_DURATION_MAX = 0.4  # Max duration (seconds) for normal blink
-BLINK_EAR_THRESHOLD = 0.18  # Very low EAR indicates full eye closure (was 0.22)
+# Reduced-resolution decode: JPEGs are decoded at 1/2, 1/4 or 1/8 scale (DCT-domain
+# downscaling) when that still covers PROCESSING_SIZE, instead of full decode + resize
+REDUCED_DECODE = os.environ.get('REDUCED_DECODE', 'true').lower() == 'true'
 
-# Drowsiness detection parameters - IMMEDIATE RESPONSE
-DROWSY_SCORE_THRESHOLD = 35.0  # Score above this triggers alert (lower = faster response)
-DROWSY_CONFIRMATION_TIME = 0.3  # Must maintain high score for this long (0.3s = immediate after blink filter)
-GRACE_PERIOD_AFTER_ALERT = 2.0  # Recovery time after opening eyes (seconds)
+# Adaptive frame skipping: when a frame barely differs from the session's last analyzed
+# frame (whole frame and eye band) and the eyes were clearly open, reuse that frame's
+# landmarks and only advance the temporal logic instead of running the face mesh
+FRAME_SKIP = os.environ.get('FRAME_SKIP', 'true').lower() == 'true' and MAX_FACES == 1
+FRAME_SKIP_MAX_DIFF = float(os.environ.get('FRAME_SKIP_MAX_DIFF', 4.0))  # Mean gray-level difference, whole frame
+FRAME_SKIP_EYE_MAX_DIFF = float(os.environ.get('FRAME_SKIP_EYE_MAX_DIFF', 6.0))  # Mean gray-level difference, eye band
+FRAME_SKIP_MAX_CONSECUTIVE = int(os.environ.get('FRAME_SKIP_MAX_CONSECUTIVE', 2))  # Fresh inference at least every N+1 frames
+FRAME_SKIP_EAR_MARGIN = 0.04  # Only skip while raw EAR >= the scoring's ear_alert_threshold + margin
 
-# Temporal smoothing
-EAR_HISTORY_SIZE = 10  # Keep last 10 EAR readings for smoothing
-DROWSY_SCORE_DECAY = 0.85  # Score decay when eyes are open (0.85 = 15% decay per frame)
-DROWSY_SCORE_INCREMENT = 40.0  # Score increase when eyes closed (DOUBLED for immediate detection)
+# Frame dedupe cache: a byte-identical repeat of a frame the session already sent
+# (frozen webcam, retried upload) reuses that frame's landmarks, looked up by a hash
+# of the raw bytes before decoding; the temporal logic still runs at the new time
+FRAME_CACHE = os.environ.get('FRAME_CACHE', 'true').lower() == 'true'
+FRAME_CACHE_SIZE = int(os.environ.get('FRAME_CACHE_SIZE', 1024))  # Entries across all sessions (LRU)
 
-# Debug mode - set to True to see detailed values in console
-DEBUG_MODE = True
+# Inference backend: 'thread' = face mesh runs in this process, 'process' = in
+# INFERENCE_PROCESSES worker processes fed through a shared-memory ring buffer
+# (each worker holds a static-image FaceMesh; temporal state stays here)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'thread')
+INFERENCE_PROCESSES = int(os.environ.get('INFERENCE_PROCESSES', os.cpu_count() or 2))
+INFERENCE_TIMEOUT_SECONDS = float(os.environ.get('INFERENCE_TIMEOUT_SECONDS', 10))
+
+# Adaptive sampling: single-frame responses carry next_capture_ms, shorter while the
+# eyes are closing or the score is rising, longer for an awake driver, and longer
+# still (awake drivers only) while more frames are in flight than SAMPLING_CAPACITY
+SAMPLING_FAST_MS = int(os.environ.get('SAMPLING_FAST_MS', 250))
+SAMPLING_SLOW_MS = int(os.environ.get('SAMPLING_SLOW_MS', 1500))
+SAMPLING_OVERLOAD_MS = int(os.environ.get('SAMPLING_OVERLOAD_MS', 3000))
+SAMPLING_CAPACITY = int(os.environ.get('SAMPLING_CAPACITY', os.cpu_count() or 2))  # Frames this process handles at once
+
+# Admission control: at most ADMISSION_MAX_ACTIVE frames are processed at once per
+# worker; up to ADMISSION_MAX_QUEUE more wait (urgent sessions first) for at most
+# ADMISSION_MAX_WAIT_SECONDS, anything beyond gets 503 + Retry-After. Each session may
+# send SESSION_RATE_LIMIT frames per second (bursts of SESSION_RATE_BURST), else 429.
+# Off by default: existing deployments keep serving every frame.
+ADMISSION = os.environ.get('ADMISSION', 'false').lower() == 'true'
+ADMISSION_MAX_ACTIVE = int(os.environ.get('ADMISSION_MAX_ACTIVE', SAMPLING_CAPACITY))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 4 * ADMISSION_MAX_ACTIVE))
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get('ADMISSION_MAX_WAIT_SECONDS', 1.0))
+SESSION_RATE_LIMIT = float(os.environ.get('SESSION_RATE_LIMIT', 8.0))  # Frames per second; 0 = unlimited
+SESSION_RATE_BURST = int(os.environ.get('SESSION_RATE_BURST', 16))
+# Reverse proxies in front of the server that append to X-Forwarded-For (Render: 1).
+# Clients without a session id are rate-limited by address, which behind a proxy is
+# the forwarded one; 0 = use the peer address and ignore the header.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+# Batch endpoint - buffered frames from one session in one request
+MAX_BATCH_FRAMES = int(os.environ.get('MAX_BATCH_FRAMES', 32))
+BATCH_DECODE_THREADS = int(os.environ.get('BATCH_DECODE_THREADS', 4))  # cv2.imdecode releases the GIL
+
+# Landmark ingestion - accepted range of normalized eye coordinates (face mesh
+# landmarks may fall slightly outside the frame)
+LANDMARK_MIN = -0.5
+LANDMARK_MAX = 1.5
+
+# Warm-up: build the face mesh(es) and run one inference on a synthetic frame before
+# serving (gunicorn post_worker_init hook, ASGI lifespan startup or the dev server;
+# otherwise in the background from the first request), so no user request pays for
+# loading the graphs. /ready reports 503 until done.
+WARMUP_ON_BOOT = os.environ.get('WARMUP_ON_BOOT', 'true').lower() == 'true'
+WARMUP_SESSION_ID = '__warmup__'
 
 # ============================================================================
-# GLOBAL STATE - Tracks detection state across frames
+# SESSION STATE - Tracks detection state across frames, per client session
 # ============================================================================
 
-class DrowsinessState:
-    """Maintains temporal state for intelligent drowsiness detection"""
+class DrowsinessState(ScoringState):
+    """Scoring state (see scoring.py) plus the per-session frame pipeline state"""
+    __slots__ = (
+        'roi', 'skip_reference', 'reference_points', 'reference_ear', 'consecutive_skips',
+        'frames_analyzed', 'frames_skipped', 'faces'
+    )
+
     def __init__(self):
-        self.ear_history = deque(maxlen=EAR_HISTORY_SIZE)
-        self.drowsy_score = 0.0  # Current drowsiness score (0-100)
-        self.eyes_closed_start = None  # Timestamp when eyes closed
-        self.last_alert_time = None  # Last time alert was triggered
-        self.is_in_alert = False  # Currently in alert state
-        self.blink_detected = False  # Was last closure a blink?
-        self.confirmation_start = None  # When did score exceed threshold?
+        super().__init__(scoring_engine.params.history_size)
+        self.roi = None  # Last face box (left, top, right, bottom), normalized - for ROI cropping
+        self.skip_reference = None  # Thumbnails of the last analyzed frame - for frame skipping
+        self.reference_points = None  # ...and its landmarks and raw EAR
+        self.reference_ear = None
+        self.consecutive_skips = 0
+        self.frames_analyzed = 0  # Per-session counters behind skip_rate
+        self.frames_skipped = 0
+        self.faces = None  # Multi-face mode: FaceTracks of per-face DrowsinessStates
         
     def reset(self):
         """Reset state (e.g., when face is lost)"""
-        self.ear_history.clear()
-        self.drowsy_score = 0.0
-        self.eyes_closed_start = None
-        self.blink_detected = False
-        self.confirmation_start = None
-        # Keep last_alert_time and is_in_alert for grace period
+        super().reset()  # Keeps last_alert_time and is_in_alert for grace period
+        self.roi = None
+        self.skip_reference = None
+        self.reference_points = None
+        self.reference_ear = None
+        self.consecutive_skips = 0
+
+# Under the shared backend every worker sees the same sessions, so their gauge is merged with max
+metrics = Metrics(METRICS_DIR, shared_gauges=('active_sessions',) if STATE_BACKEND == 'shared' else ())
+
+tracer = Tracer(
+    level=TRACE_LEVEL,
+    capacity=TRACE_BUFFER_SIZE,
+    sample_rate=TRACE_SAMPLE_RATE,
+    fmt=TRACE_FORMAT
+)
+
+# Temporal drowsiness logic; thresholds and rates are the defaults in scoring.py
+scoring_engine = ScoringEngine(ScoringParams(), tracer=tracer)
+
+if STATE_BACKEND == 'shared':
+    sessions = SharedSessionRegistry(
+        DrowsinessState,
+        STATE_FILE,
+        history_size=scoring_engine.params.history_size,
+        max_sessions=MAX_SESSIONS,
+        ttl_seconds=SESSION_TTL_SECONDS
+    )
+elif STATE_BACKEND == 'memory':
+    sessions = SessionRegistry(
+        DrowsinessState,
+        max_sessions=MAX_SESSIONS,
+        ttl_seconds=SESSION_TTL_SECONDS
+    )
+else:
+    raise ValueError(f"STATE_BACKEND must be 'memory' or 'shared', not {STATE_BACKEND!r}")
+
+
+def active_session_count():
+    """Sessions for the active_sessions gauge: the shared table's (every worker's) or this process's"""
+    return sessions.slots_used if STATE_BACKEND == 'shared' else len(sessions)
+
+change_detector = ChangeDetector(max_frame_diff=FRAME_SKIP_MAX_DIFF, max_eye_diff=FRAME_SKIP_EYE_MAX_DIFF)
+
+frame_cache = FrameCache(FRAME_CACHE_SIZE) if FRAME_CACHE else None
+if frame_cache is not None:
+    sessions.add_eviction_listener(frame_cache.discard)
+
+# Fast sampling from the score where the status turns to 'Eyes getting heavy...'
+sampling = SamplingPolicy(
+    urgent_score=scoring_engine.params.caution_score,
+    capacity=SAMPLING_CAPACITY,
+    fast_ms=SAMPLING_FAST_MS,
+    slow_ms=SAMPLING_SLOW_MS,
+    overload_ms=SAMPLING_OVERLOAD_MS
+)
+
+admission = None
+if ADMISSION:
+    admission = AdmissionController(
+        max_active=ADMISSION_MAX_ACTIVE,
+        max_queue=ADMISSION_MAX_QUEUE,
+        max_wait=ADMISSION_MAX_WAIT_SECONDS,
+        rate=SESSION_RATE_LIMIT,
+        burst=SESSION_RATE_BURST,
+        max_sessions=MAX_SESSIONS
+    )
+    sessions.add_eviction_listener(admission.discard)
+    # Frames queued for a slot count toward the load, not only the ones running
+    sampling.add_backlog(lambda: admission.queue_length)
+
+recorder = None
+if RECORD_SESSIONS:
+    recorder = SessionRecorder(RECORD_DIR)
+    sessions.add_eviction_listener(recorder.close_session)
+    atexit.register(recorder.close)
+
+
+batch_decode_pool = None  # Created on the first batch request
+
+
+def get_batch_decode_pool():
+    """Lazy-create the thread pool that decodes batch frames in parallel"""
+    global batch_decode_pool
+    if batch_decode_pool is None:
+        batch_decode_pool = ThreadPoolExecutor(max_workers=BATCH_DECODE_THREADS, thread_name_prefix='batch-decode')
+    return batch_decode_pool
+
+
+def get_session_id(data=None, req=None):
+    """
+    Read the client-supplied session id from the X-Session-ID header,
+    the JSON body or the query string. Falls back to the shared default session.
+    req defaults to the current Flask request.
+    """
+    req = request if req is None else req
+    session_id = req.headers.get('X-Session-ID')
+    if not session_id and isinstance(data, dict):
+        session_id = data.get('session_id')
+    if not session_id:
+        session_id = req.args.get('session_id')
+    if not session_id:
+        return DEFAULT_SESSION_ID
+    if not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID_LENGTH:
+        raise ValueError(f'session_id must be a string of at most {MAX_SESSION_ID_LENGTH} characters')
+    return session_id
 
-state = DrowsinessState()
 
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = None  # Initialize lazily on first request to avoid startup timeout
+def client_address(req):
+    """The client's address: the X-Forwarded-For entry the trusted proxies added, else the peer's"""
+    if TRUSTED_PROXIES:
+        forwarded = [part.strip() for part in req.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= TRUSTED_PROXIES:
+            return forwarded[-TRUSTED_PROXIES]
+    return req.remote_addr
+
+
+def client_key(session_id, req=None):
+    """
+    Admission rate-limit key for a request of session_id: None for the session's own
+    bucket, or the client address for clients that sent no session id, which would
+    otherwise all share the default session's bucket. req defaults to the current Flask request.
+    """
+    if session_id != DEFAULT_SESSION_ID:
+        return None
+    req = request if req is None else req
+    return f'{DEFAULT_SESSION_ID}@{client_address(req)}'
+
+face_mesh = None  # Built by warm_up() before serving, or lazily on first request
+face_mesh_lock = threading.Lock()  # FaceMesh graphs are not safe to run from several threads at once
+
+
+def create_face_mesh(static_image_mode):
+    """Build a FaceMesh with the detector's standard settings"""
+    return build_face_mesh(static_image_mode, MAX_FACES)
+
 
 def get_face_mesh():
     """Lazy-load face mesh model on first use"""
     global face_mesh
     if face_mesh is None:
-        face_mesh = mp_face_mesh.FaceMesh(
-            static_image_mode=True,
-            max_num_faces=1,
-            refine_landmarks=False,
-            min_detection_confidence=0.3,
-            min_tracking_confidence=0.3
-        )
+        face_mesh = create_face_mesh(static_image_mode=True)
     return face_mesh
 
-# Landmark indices for MediaPipe face mesh
-LEFT_EYE_IDX = [33, 160, 158, 133, 153, 144]
-RIGHT_EYE_IDX = [362, 385, 387, 263, 373, 380]
 
+# Threads of the async server's inference pool each own a static-image FaceMesh, so
+# they never queue on face_mesh_lock (see enable_thread_face_mesh / asgi_server.py)
+thread_meshes = threading.local()
 
-def euclidean_distance(point1, point2):
-    """Calculate Euclidean distance between two points"""
-    return np.linalg.norm(np.array(point1) - np.array(point2))
 
+def enable_thread_face_mesh():
+    """Thread initializer: the calling thread gets its own static-image FaceMesh (built on first use)"""
+    thread_meshes.enabled = True
+    thread_meshes.mesh = None
 
-def landmark_to_point(landmark, width, height):
-    """Convert normalized MediaPipe landmark to pixel coordinates"""
-    return (int(landmark.x * width), int(landmark.y * height))
 
+def get_thread_face_mesh():
+    """The calling thread's own FaceMesh, or None if the thread doesn't own one"""
+    if not getattr(thread_meshes, 'enabled', False):
+        return None
+    if thread_meshes.mesh is None:
+        thread_meshes.mesh = create_face_mesh(static_image_mode=True)
+    return thread_meshes.mesh
 
-def eye_aspect_ratio_from_landmarks(landmark_list, width, height, indices):
-    """Calculate EAR using MediaPipe landmark indices"""
-    points = [landmark_to_point(landmark_list[idx], width, height) for idx in indices]
-    A = euclidean_distance(points[1], points[5])
-    B = euclidean_distance(points[2], points[4])
-    C = euclidean_distance(points[0], points[3])
-    if C == 0:
-        return 0.0
-    return (A + B) / (2.0 * C)
 
+# Tracking mode: each session gets its own static_image_mode=False FaceMesh, so after
+# the first detection MediaPipe tracks landmarks between that driver's frames instead
+# of re-running face detection. It re-detects by itself when the face is lost.
+tracking_meshes = FaceMeshPool(
+    lambda: create_face_mesh(static_image_mode=False),
+    max_instances=MAX_TRACKING_MESHES,
+    idle_seconds=TRACKING_MESH_IDLE_SECONDS,
+    reclaim_seconds=TRACKING_MESH_RECLAIM_SECONDS
+)
+sessions.add_eviction_listener(tracking_meshes.release)
 
-def calc_face_box(landmark_list, width, height):
-    xs = [int(lm.x * width) for lm in landmark_list]
-    ys = [int(lm.y * height) for lm in landmark_list]
-    return {
-        'left': max(min(xs), 0),
-        'top': max(min(ys), 0),
-        'right': min(max(xs), width),
-        'bottom': min(max(ys), height)
-    }
+
+inference_workers = None  # Started on first use when INFERENCE_BACKEND == 'process'
+inference_workers_lock = threading.Lock()
+
+
+def get_inference_workers():
+    """Lazy-start the worker processes (never at import: spawned workers import this module)"""
+    global inference_workers
+    with inference_workers_lock:
+        if inference_workers is None:
+            # Largest frame sent to a worker: the processing-size frame or a ROI crop
+            max_pixels = max(PROCESSING_SIZE[0] * PROCESSING_SIZE[1], ROI_INPUT_SIZE * ROI_INPUT_SIZE)
+            # A factory outside this module: spawned workers then import only MediaPipe
+            inference_workers = InferenceWorkerPool(
+                functools.partial(build_face_mesh, True, MAX_FACES), INFERENCE_PROCESSES, max_frame_bytes=max_pixels * 3, max_faces=MAX_FACES
+            )
+            atexit.register(inference_workers.close)
+        return inference_workers
 
 
-def get_smoothed_ear(current_ear):
+def process_face_mesh(session_id, rgb_frame, tracking=True):
     """
-    Get temporally smoothed EAR value using rolling average
-    This reduces noise and prevents false alerts from momentary fluctuations
+    Run face mesh on one frame. Uses the session's tracking instance in tracking mode,
+    otherwise (static mode, tracking=False, or tracking pool full) the calling
+    thread's own static-image instance if it has one, else the shared one.
     """
-    state.ear_history.append(current_ear)
+    if tracking and FACE_MESH_MODE == 'tracking':
+        with tracking_meshes.acquire(session_id) as mesh:
+            if mesh is not None:
+                return mesh.process(rgb_frame)
     
-    if len(state.ear_history) < 3:
-        # Not enough history yet, return current value
-        return current_ear
+    mesh = get_thread_face_mesh()
+    if mesh is not None:
+        return mesh.process(rgb_frame)
     
-    # Use weighted average: recent values matter more
-    # Weights: [0.5, 0.3, 0.2] for last 3 values
-    recent_ears = list(state.ear_history)[-3:]
-    weights = [0.5, 0.3, 0.2]
-    smoothed = sum(ear * w for ear, w in zip(reversed(recent_ears), weights))
-    
-    return smoothed
+    mesh = get_face_mesh()
+    with face_mesh_lock:
+        return mesh.process(rgb_frame)
 
 
-def detect_blink(smoothed_ear, current_time):
+def run_face_mesh_faces(session_id, frame, tracking=True):
+    """
+    Landmarks of every face (up to MAX_FACES) in a BGR frame, as a list of normalized
+    (2, N) arrays. Runs in the inference worker processes with INFERENCE_BACKEND=process,
+    otherwise in this process. tracking=False keeps the frame away from the session's
+    tracking mesh (for frames that don't show the same view as the session's others).
     """
-    Detect if current eye closure is a normal blink or potential drowsiness
-    Uses SMOOTHED EAR to prevent false classifications from noise
+    if INFERENCE_BACKEND == 'process':
+        with metrics.timed('face_mesh'):  # Includes the worker's color conversion
+            return get_inference_workers().process_faces(frame, timeout=INFERENCE_TIMEOUT_SECONDS)
     
-    EAR Ranges:
-    - >= 0.28: Eyes fully open/alert (normal state)
-    - 0.24-0.28: Eyes slightly smaller (OK, not drowsy - could be natural)
-    - 0.21-0.24: Eyes very sleepy/barely open (borderline)
-    - < 0.21: Eyes closed/very drowsy (ALERT!)
+    with metrics.timed('color_convert'):
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    with metrics.timed('face_mesh'):
+        results = process_face_mesh(session_id, rgb_frame, tracking)
+    return [landmarks_to_array(face.landmark) for face in results.multi_face_landmarks or []]
+
+
+def run_face_mesh(session_id, frame, tracking=True):
+    """Landmarks of the first face in a BGR frame as a normalized (2, N) array, or None"""
+    faces = run_face_mesh_faces(session_id, frame, tracking)
+    return faces[0] if faces else None
+
+
+# ============================================================================
+# WARM-UP - models built and exercised before the first request (see /ready)
+# ============================================================================
+
+warmup_lock = threading.Lock()
+warmup_thread = None  # Background warm-up started by start_warm_up()
+
+
+def make_warmup_frame():
+    """Synthetic BGR frame at the processing size: a face-like oval on a gray background"""
+    width, height = PROCESSING_SIZE
+    frame = np.full((height, width, 3), 128, dtype=np.uint8)
+    center = (width // 2, height // 2)
+    cv2.ellipse(frame, center, (width // 6, height // 4), 0, 0, 360, (150, 170, 200), -1)
+    for dx in (-width // 14, width // 14):
+        cv2.ellipse(frame, (center[0] + dx, center[1] - height // 16), (width // 40, height // 80), 0, 0, 360,
+                    (40, 40, 40), -1)
+    return frame
+
+
+def warm_up_face_mesh(mesh, frame=None):
+    """One inference through mesh, so its graph and model are fully initialized"""
+    frame = make_warmup_frame() if frame is None else frame
+    mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+def warm_up():
+    """
+    Build the models this configuration serves with, run one warm-up inference through
+    each, and mark the process ready. Safe to call more than once; a failure is traced
+    and leaves the process not ready (requests still load the models lazily).
+    """
+    with warmup_lock:
+        if startup.ready:
+            return True
+        try:
+            frame = make_warmup_frame()
+            with startup.phase('warmup_decode'):
+                decode_image_bytes(cv2.imencode('.jpg', frame)[1].tobytes(), PROCESSING_SIZE)
+            if INFERENCE_BACKEND == 'process':
+                with startup.phase('warmup_inference_workers'):
+                    workers = get_inference_workers()
+                    # One frame per worker in flight at once, so every worker gets one
+                    timeout = INFERENCE_TIMEOUT_SECONDS * 3
+                    for future in [workers.submit(frame, timeout) for _ in range(workers.processes)]:
+                        future.result(timeout=timeout)
+            else:
+                with startup.phase('build_face_mesh'):
+                    mesh = get_face_mesh()
+                with startup.phase('warmup_face_mesh'):
+                    with face_mesh_lock:
+                        warm_up_face_mesh(mesh, frame)
+                if FACE_MESH_MODE == 'tracking':
+                    # Per-session instances come and go; this loads their graph type once
+                    with startup.phase('warmup_tracking_mesh'):
+                        with tracking_meshes.acquire(WARMUP_SESSION_ID) as tracking_mesh:
+                            if tracking_mesh is not None:
+                                warm_up_face_mesh(tracking_mesh, frame)
+                        tracking_meshes.release(WARMUP_SESSION_ID)
+        except Exception as e:
+            tracer.error('warmup_failed', exc=e)
+            return False
+        startup.mark_ready()
+        tracer.info('ready', ready_after_seconds=startup.ready_after, **startup.phases)
+        return True
+
+
+@app.before_request
+def start_warm_up():
+    """
+    Run warm_up() once on a background thread if no server hook has (e.g. gunicorn
+    started without gunicorn_config.py), so /ready still turns 200 after the first probe
+    """
+    global warmup_thread
+    if not WARMUP_ON_BOOT or startup.ready or warmup_thread is not None:
+        return
+    with warmup_lock:
+        if warmup_thread is None and not startup.ready:
+            warmup_thread = threading.Thread(target=warm_up, name='warmup', daemon=True)
+            warmup_thread.start()
+
+
+def decode_target_size(session_id):
+    """
+    Size to decode a session's next frame at: PROCESSING_SIZE (reduced JPEG decode),
+    or None for full resolution when the frame will be cropped to the previous face box.
+    """
+    if not REDUCED_DECODE:
+        return None
+    if ROI_CROP:
+        state = sessions.peek(session_id)
+        if state is not None and state.roi is not None:
+            return None
+    return PROCESSING_SIZE
+
+
+def read_frame_upload(req=None):
+    """
+    Pull the encoded frame out of the request (default: the current Flask request). Supports:
+    - raw image body (Content-Type: image/jpeg, image/png or application/octet-stream)
+    - multipart/form-data with an 'image' file field
+    - JSON {"image": "data:image/jpeg;base64,..."} (original format)
+    Returns (image_bytes or None, request fields used to look up the session id)
+    """
+    req = request if req is None else req
+    mimetype = req.mimetype
+    if mimetype.startswith('image/') or mimetype == 'application/octet-stream':
+        return req.get_data(cache=False), None
+    if mimetype == 'multipart/form-data':
+        upload = req.files.get('image')
+        return (upload.read() if upload else None), req.form
     
-    Returns: (is_blink, is_eyes_closed)
+    data = req.get_json(silent=True) or {}
+    image_data = data.get('image')
+    if not image_data:
+        return None, data
+    with metrics.timed('base64_decode'):
+        return decode_data_uri(image_data), data
+
+def crop_roi(frame, roi):
     """
-    # Use smoothed EAR for more reliable detection
-    # Only truly closed eyes (< 0.21) count as "closed"
-    is_eyes_closed = smoothed_ear < EAR_THRESHOLD
+    Cut the padded, square region around the previous face box out of the frame.
+    roi is (left, top, right, bottom) normalized to the frame.
+    Returns (crop resized to ROI_INPUT_SIZE, (x0, y0, crop_width, crop_height)) or None.
+    """
+    frame_h, frame_w = frame.shape[:2]
+    left, top, right, bottom = roi
+    center_x = (left + right) / 2 * frame_w
+    center_y = (top + bottom) / 2 * frame_h
+    side = max((right - left) * frame_w, (bottom - top) * frame_h) * (1 + 2 * ROI_PADDING)
     
-    # Safety check: If EAR is alert or even partially open, force eyes_open state
-    if smoothed_ear >= EAR_ALERT_THRESHOLD:
-        # Eyes are definitely open - clear any closure tracking
-        if state.eyes_closed_start is not None:
-            if DEBUG_MODE:
-                closure_duration = current_time - state.eyes_closed_start
-                print(f"[DEBUG] ✅ Eyes ALERT/OPEN (EAR: {smoothed_ear:.3f}) after {closure_duration:.2f}s")
-            state.eyes_closed_start = None
-            state.blink_detected = False
-        return False, False  # Not blink, eyes are open
+    x0 = max(int(center_x - side / 2), 0)
+    y0 = max(int(center_y - side / 2), 0)
+    x1 = min(int(center_x + side / 2), frame_w)
+    y1 = min(int(center_y + side / 2), frame_h)
+    crop_w, crop_h = x1 - x0, y1 - y0
+    if crop_w < ROI_MIN_SIZE or crop_h < ROI_MIN_SIZE:
+        return None
     
-    # Partial open check: Eyes smaller than normal but NOT drowsy (0.24-0.28 range)
-    if smoothed_ear >= EAR_PARTIAL_OPEN and smoothed_ear < EAR_ALERT_THRESHOLD:
-        # Eyes are partially open - this is OK, could be natural eye size
-        if state.eyes_closed_start is not None:
-            if DEBUG_MODE:
-                print(f"[DEBUG] 👁️ Eyes partially open (EAR: {smoothed_ear:.3f}) - Natural state, clearing closure")
-            state.eyes_closed_start = None
-            state.blink_detected = False
-        return False, False  # Not drowsy, just natural smaller eyes
+    scale = ROI_INPUT_SIZE / max(crop_w, crop_h)
+    input_size = (max(int(round(crop_w * scale)), 1), max(int(round(crop_h * scale)), 1))
+    crop = cv2.resize(frame[y0:y1, x0:x1], input_size)
+    return crop, (x0, y0, crop_w, crop_h)
+
+
+def detect_face_points(state, frame, session_id):
+    """
+    Run face mesh on a decoded frame and return the first face's landmarks as a
+    normalized (2, N) array in full-frame coordinates, or None.
     
-    # Track eye closure duration (only for truly closed/very sleepy eyes < 0.21)
-    if is_eyes_closed:
-        if state.eyes_closed_start is None:
-            state.eyes_closed_start = current_time
-            if DEBUG_MODE:
-                print(f"[DEBUG] ⚠️ Eye closure/very sleepy detected (EAR: {smoothed_ear:.3f})")
-            
-        closure_duration = current_time - state.eyes_closed_start
-        
-        # Very low EAR and quick closure/opening = blink
-        if smoothed_ear < BLINK_EAR_THRESHOLD and closure_duration < BLINK_DURATION_MAX:
-            state.blink_detected = True
-            return True, True  # is_blink=True, is_eyes_closed=True
-    else:
-        # Eyes are in the sleepy zone (0.21-0.24) but not fully closed
-        if state.eyes_closed_start is not None:
-            # Just opened from closure - check if it was a blink
-            closure_duration = current_time - state.eyes_closed_start
-            was_blink = closure_duration < BLINK_DURATION_MAX
-            
-            if DEBUG_MODE:
-                print(f"[DEBUG] Eyes no longer closed after {closure_duration:.2f}s - {'BLINK' if was_blink else 'DROWSY CLOSURE'}")
-            
-            state.eyes_closed_start = None
-            state.blink_detected = False
+    With ROI_CROP enabled and a face box from the previous frame, only the padded
+    region around that box goes through the mesh; if no face is found there the
+    whole frame is processed. Crops run on a static-image mesh: a tracking mesh
+    would carry its face box between crops and full frames of different geometry,
+    so the session's tracking instance only ever sees full frames. Returns
+    (points or None, frame resized to PROCESSING_SIZE if the full-frame path ran,
+    else None).
+    """
+    if ROI_CROP and state.roi is not None:
+        with metrics.timed('resize'):
+            region = crop_roi(frame, state.roi)
+        if region is not None:
+            crop, (x0, y0, crop_w, crop_h) = region
+            points = run_face_mesh(session_id, crop, tracking=False)
+            if points is not None:
+                # Map crop-normalized landmarks back to full-frame normalized coordinates
+                frame_h, frame_w = frame.shape[:2]
+                points[0] = (points[0] * crop_w + x0) / frame_w
+                points[1] = (points[1] * crop_h + y0) / frame_h
+                return points, None
+            tracer.debug('roi_miss')
     
-    return False, is_eyes_closed
+    with metrics.timed('resize'):
+        small_frame = resize_for_processing(frame)
+    return run_face_mesh(session_id, small_frame), small_frame
 
 
-def update_drowsy_score(is_eyes_closed, is_blink, smoothed_ear, current_time):
+def can_skip_inference(state, frame):
     """
-    Update drowsiness score based on current eye state
-    Uses exponential decay for gradual recovery and intelligent increment for closures
-    Returns: (drowsy_score, is_confirmed_drowsy)
+    True if the previous analyzed frame's landmarks can stand in for this frame:
+    eyes were clearly open, no alert is active, the consecutive-skip cap isn't
+    reached, and neither the whole frame nor the eye band changed noticeably.
     """
-    # SAFETY CHECK: If eyes are clearly wide open, score should NEVER increase
-    if smoothed_ear >= EAR_ALERT_THRESHOLD:
-        # Eyes are definitely open - only decay, never increase
-        old_score = state.drowsy_score
-        
-        if state.is_in_alert:
-            # In alert - decay very fast
-            state.drowsy_score = max(0.0, state.drowsy_score * 0.50)
-        else:
-            # Normal decay
-            state.drowsy_score = max(0.0, state.drowsy_score * 0.75)
-        
-        if DEBUG_MODE and old_score > 5:
-            print(f"[DEBUG] 👁️ Eyes WIDE OPEN (EAR: {smoothed_ear:.3f}) - Score decaying: {old_score:.1f} → {state.drowsy_score:.1f}")
-        
-        # Reset confirmation if score drops
-        if state.drowsy_score < DROWSY_SCORE_THRESHOLD and state.confirmation_start is not None:
-            state.confirmation_start = None
-        
-        return state.drowsy_score, False
-    
-    # If it's just a blink, don't increase score much
-    if is_blink:
-        if DEBUG_MODE:
-            print(f"[DEBUG] Blink detected - score unchanged: {state.drowsy_score:.1f}")
-        return state.drowsy_score, False
-    
-    # Update score based on eye state
-    if is_eyes_closed:
-        # Eyes truly closed or very sleepy (EAR < 0.21) - increase score
-        # Increase more if EAR is very low (deeply closed)
-        increment = DROWSY_SCORE_INCREMENT
-        if smoothed_ear < BLINK_EAR_THRESHOLD:
-            # Deeply closed (< 0.18) - very drowsy!
-            increment *= 2.0  # DOUBLE for deeply closed eyes = IMMEDIATE alert
-            if DEBUG_MODE:
-                print(f"[DEBUG] 🚨 Eyes DEEPLY CLOSED (EAR: {smoothed_ear:.3f}) - Score increased: {state.drowsy_score:.1f} + {increment:.1f}")
-        else:
-            if DEBUG_MODE:
-                print(f"[DEBUG] ⚠️ Eyes very sleepy/closed (EAR: {smoothed_ear:.3f}) - Score increased: {state.drowsy_score:.1f} + {increment:.1f}")
-        
-        state.drowsy_score = min(100.0, state.drowsy_score + increment)
-        
-        if DEBUG_MODE:
-            print(f"[DEBUG] → New Score: {state.drowsy_score:.1f}/100")
-    else:
-        # Eyes open - decay score gradually
-        # Determine decay rate based on how open eyes are
-        if state.is_in_alert and smoothed_ear >= EAR_ALERT_THRESHOLD:
-            # Super fast decay when recovering from alert - 50% per frame!
-            decay_rate = 0.50  # 50% decay per frame = very responsive
-            if DEBUG_MODE:
-                print(f"[DEBUG] 🚀 RAPID RECOVERY MODE - Wide awake after alert!")
-        elif smoothed_ear >= EAR_ALERT_THRESHOLD:
-            # Eyes fully alert (>= 0.28) - decay faster
-            decay_rate = 0.70  # 30% decay per frame
-        elif smoothed_ear >= EAR_PARTIAL_OPEN:
-            # Eyes partially open (0.24-0.28) - moderate decay (not drowsy, just smaller eyes)
-            decay_rate = 0.75  # 25% decay per frame
-        else:
-            # Eyes in sleepy zone (0.21-0.24) but not closed - slow decay
-            decay_rate = DROWSY_SCORE_DECAY  # 15% decay per frame
-        
-        old_score = state.drowsy_score
-        state.drowsy_score = max(0.0, state.drowsy_score * decay_rate)
-        
-        if DEBUG_MODE and old_score > 10:
-            print(f"[DEBUG] Eyes open (EAR: {smoothed_ear:.3f}) - Score decaying: {old_score:.1f} → {state.drowsy_score:.1f}")
-    
-    # Check if score is high enough for drowsiness detection
-    if state.drowsy_score >= DROWSY_SCORE_THRESHOLD:
-        if state.confirmation_start is None:
-            state.confirmation_start = current_time
-            if DEBUG_MODE:
-                print(f"[DEBUG] Drowsiness score reached threshold - starting confirmation period")
-        
-        confirmation_duration = current_time - state.confirmation_start
-        
-        # Must maintain high score for confirmation period
-        if confirmation_duration >= DROWSY_CONFIRMATION_TIME:
-            if DEBUG_MODE:
-                print(f"[ALERT] DROWSINESS CONFIRMED after {confirmation_duration:.1f}s - Score: {state.drowsy_score:.1f}/100")
-            return state.drowsy_score, True
+    if not FRAME_SKIP or state.skip_reference is None or state.is_in_alert:
+        return False
+    if state.consecutive_skips >= FRAME_SKIP_MAX_CONSECUTIVE:
+        return False
+    if state.reference_ear < scoring_engine.params.ear_alert_threshold + FRAME_SKIP_EAR_MARGIN:
+        return False  # Too close to the thresholds - every frame counts
+    return change_detector.is_unchanged(state.skip_reference, frame, state.reference_points)
+
+
+def no_face_message(brightness):
+    """Helpful feedback for a frame without a face, based on its brightness if known"""
+    if brightness is not None and brightness < 50:
+        return 'No face detected - Too dark, improve lighting'
+    if brightness is not None and brightness > 200:
+        return 'No face detected - Too bright, reduce lighting'
+    return 'No face detected - Position face in frame'
+
+
+def analyze_frame(state, frame, original_shape, current_time, session_id=DEFAULT_SESSION_ID, cache_key=None):
+    """
+    Run face mesh + temporal drowsiness logic on one decoded frame for one session.
+    Returns the response payload as a dict. With cache_key, freshly computed
+    landmarks are kept in the frame dedupe cache under it.
+    """
+    if MAX_FACES > 1:
+        return analyze_faces(state, frame, original_shape, current_time, session_id, cache_key)
+    change_start = time.perf_counter()
+    frame_skipped = can_skip_inference(state, frame)
+    change_detect_time = time.perf_counter() - change_start
+    if frame_skipped:
+        face_points, small_frame = state.reference_points, None
+        state.consecutive_skips += 1
+        state.frames_skipped += 1
+        tracer.debug('frame_skipped', consecutive=state.consecutive_skips)
     else:
-        # Score dropped below threshold - reset confirmation
-        if state.confirmation_start is not None:
-            if DEBUG_MODE:
-                print(f"[DEBUG] Score dropped below threshold - resetting confirmation")
-            state.confirmation_start = None
+        face_points, small_frame = detect_face_points(state, frame, session_id)
+        state.consecutive_skips = 0
+        state.frames_analyzed += 1
+    change_detector.record(frame_skipped)
+    scoring_start = time.perf_counter()
+    skip_rate = round(state.frames_skipped / (state.frames_analyzed + state.frames_skipped), 3)
+    
+    if face_points is None:
+        # Check image quality (brightness)
+        avg_brightness = np.mean(cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY))
+        if cache_key is not None:
+            frame_cache.put(cache_key, [], avg_brightness, original_shape)
+        result = no_face_result(state, avg_brightness, skip_rate)
+        metrics.observe('change_detect', change_detect_time)
+        metrics.observe('scoring', time.perf_counter() - scoring_start)
+        if recorder is not None:
+            recorder.record(session_id, current_time, None, None, original_shape, result)
+        return result
+    
+    if cache_key is not None and not frame_skipped:
+        frame_cache.put(cache_key, [face_points], None, original_shape)
     
-    return state.drowsy_score, False
+    # Remember where the face is so the next frame can be cropped to it
+    state.roi = face_bounds(face_points)
+    
+    result, raw_ear = score_face(state, face_points, original_shape, current_time)
+    
+    if FRAME_SKIP and not frame_skipped:
+        # This frame becomes the reference the next frames are compared against
+        snapshot_start = time.perf_counter()
+        state.skip_reference = change_detector.snapshot(frame, face_points)
+        state.reference_points = face_points
+        state.reference_ear = raw_ear
+        snapshot_time = time.perf_counter() - snapshot_start
+        change_detect_time += snapshot_time
+        scoring_start += snapshot_time  # Counted under change_detect, not scoring
+    
+    metrics.inc('frames_face')
+    if frame_skipped:
+        metrics.inc('frames_skipped')
+    metrics.observe('change_detect', change_detect_time)
+    metrics.observe('scoring', time.perf_counter() - scoring_start)
+    
+    result['frame_skipped'] = frame_skipped
+    result['skip_rate'] = skip_rate
+    if recorder is not None:
+        recorder.record(session_id, current_time, face_points, raw_ear, original_shape, result)
+    return result
+
+
+def no_face_result(state, brightness, skip_rate):
+    """Face lost - reset state but keep alert status for grace period"""
+    tracer.debug('no_face', brightness=brightness)
+    is_drowsy = scoring_engine.no_face(state)  # Keep alert if in grace period
+    metrics.inc('frames_no_face')
+    return {
+        'is_drowsy': is_drowsy,
+        'message': no_face_message(brightness),
+        'brightness': round(brightness, 1),
+        'drowsy_score': 0,
+        'confidence': 0,
+        'frame_skipped': False,
+        'skip_rate': skip_rate
+    }
 
 
-def check_grace_period(current_time):
+def analyze_cached_frame(state, cached, current_time, session_id=DEFAULT_SESSION_ID):
     """
-    Check if we're in grace period after an alert
-    This prevents rapid re-alerting when user is recovering
+    Temporal drowsiness logic for a byte-identical repeat of an analyzed frame: the
+    cached landmarks are scored at the new timestamp, with no decode or inference.
+    Reported as a skipped frame.
     """
-    if state.last_alert_time is None:
-        return False
+    state.frames_skipped += 1
+    metrics.inc('frames_skipped')
+    if MAX_FACES > 1:
+        return score_faces(state, cached.faces, cached.brightness, cached.original_shape, current_time,
+                           session_id, frame_skipped=True)
+    scoring_start = time.perf_counter()
+    skip_rate = round(state.frames_skipped / (state.frames_analyzed + state.frames_skipped), 3)
+    
+    face_points = cached.faces[0] if cached.faces else None
+    if face_points is None:
+        result = no_face_result(state, cached.brightness, skip_rate)
+        raw_ear = None
+    else:
+        state.roi = face_bounds(face_points)
+        result, raw_ear = score_face(state, face_points, cached.original_shape, current_time)
+        metrics.inc('frames_face')
+    result['frame_skipped'] = True
+    result['skip_rate'] = skip_rate
+    metrics.observe('scoring', time.perf_counter() - scoring_start)
+    if recorder is not None:
+        recorder.record(session_id, current_time, face_points, raw_ear, cached.original_shape, result)
+    return result
+
+
+def face_bounds(face_points):
+    """(left, top, right, bottom) of a landmark array, normalized"""
+    (min_x, min_y), (max_x, max_y) = face_points.min(axis=1), face_points.max(axis=1)
+    return (float(min_x), float(min_y), float(max_x), float(max_y))
+
+
+def score_face(state, face_points, original_shape, current_time):
+    """
+    Face box, EAR and temporal scoring for one face's landmarks.
+    Returns (result fields, raw EAR).
+    """
+    # Landmark math runs on the PROCESSING_SIZE grid whatever resolution the mesh saw
+    width, height = PROCESSING_SIZE
+    
+    # Calculate scaling factors for coordinate conversion
+    scale_x = original_shape[1] / width
+    scale_y = original_shape[0] / height
+    
+    # Calculate face box on resized image
+    face_box = calc_face_box(face_points, width, height)
+    
+    # Scale face box coordinates back to original image dimensions
+    face_box = {
+        'left': int(face_box['left'] * scale_x),
+        'top': int(face_box['top'] * scale_y),
+        'right': int(face_box['right'] * scale_x),
+        'bottom': int(face_box['bottom'] * scale_y)
+    }
     
-    time_since_alert = current_time - state.last_alert_time
-    in_grace = time_since_alert < GRACE_PERIOD_AFTER_ALERT
+    # Calculate EAR for both eyes
+    left_ear, right_ear = eye_aspect_ratios(face_points, width, height)
+    raw_ear = (left_ear + right_ear) / 2.0
     
-    # Exit alert state if drowsy score is very low and grace period over
-    if not in_grace and state.drowsy_score < 20:
-        state.is_in_alert = False
+    score = scoring_engine.score_frame(state, raw_ear, current_time)
+    if score.alert_triggered:
+        metrics.inc('alerts')
     
-    return in_grace
+    return {
+        'is_drowsy': score.should_alert,
+        'ear': round(score.smoothed_ear, 3),
+        'raw_ear': round(raw_ear, 3),
+        'message': score.message,
+        'face_box': face_box,
+        'drowsy_score': round(score.drowsy_score, 1),
+        'confidence': int(score.drowsy_score),
+        'is_blink': score.is_blink,
+        'in_grace_period': score.in_grace_period
+    }, raw_ear
+
+
+def analyze_faces(state, frame, original_shape, current_time, session_id=DEFAULT_SESSION_ID, cache_key=None):
+    """
+    Multi-face variant of analyze_frame: one inference for every face in the frame, each
+    face scored with its own DrowsinessState (see score_faces).
+    """
+    with metrics.timed('resize'):
+        small_frame = resize_for_processing(frame)
+    faces = run_face_mesh_faces(session_id, small_frame)
+    state.frames_analyzed += 1
+    change_detector.record(False)
+    brightness = None if faces else np.mean(cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY))
+    if cache_key is not None:
+        frame_cache.put(cache_key, faces, brightness, original_shape)
+    return score_faces(state, faces, brightness, original_shape, current_time, session_id)
+
+
+def score_faces(state, faces, brightness, original_shape, current_time, session_id, frame_skipped=False):
+    """
+    Match the faces to the session's face tracks and score each with its own state.
+    The top-level fields are the largest face's (nearest the camera); 'faces' holds
+    every face's result with its stable face_id.
+    """
+    scoring_start = time.perf_counter()
+    skip_rate = round(state.frames_skipped / (state.frames_analyzed + state.frames_skipped), 3)
+    if state.faces is None:
+        # An unseen face goes through the same no-face handling as in single-face mode
+        state.faces = FaceTracks(DrowsinessState, on_missed=scoring_engine.no_face)
+    boxes = [face_bounds(face_points) for face_points in faces]
+    assigned, dropped = state.faces.update(boxes)
+    if recorder is not None:
+        # An unseen face's state went through no_face() - record it like a frame without a
+        # face, so replay resets it too (a dropped face has no frames left to replay)
+        for face_id, track in state.faces.tracks.items():
+            if track.missed:
+                recorder.record(session_id, current_time, None, None, original_shape,
+                                {'is_drowsy': track.state.is_in_alert, 'drowsy_score': 0}, face_id=face_id)
+        for face_id in dropped:
+            recorder.close_session(session_id, face_id)
+
+    if not faces:
+        tracer.debug('no_face', brightness=brightness)
+        metrics.inc('frames_no_face')
+        metrics.observe('scoring', time.perf_counter() - scoring_start)
+        # Faces keep their state while briefly unseen (see face_tracker.MAX_MISSED_FRAMES);
+        # like a lost single face, an alert carries over
+        return {
+            'is_drowsy': any(track.state.is_in_alert for track in state.faces.tracks.values()),
+            'message': no_face_message(brightness),
+            'brightness': round(brightness, 1),
+            'drowsy_score': 0,
+            'confidence': 0,
+            'frame_skipped': frame_skipped,
+            'skip_rate': skip_rate,
+            'faces': []
+        }
+
+    results = []
+    for (face_id, face_state), face_points in zip(assigned, faces):
+        result, raw_ear = score_face(face_state, face_points, original_shape, current_time)
+        result['face_id'] = face_id
+        results.append(result)
+        if recorder is not None:
+            recorder.record(session_id, current_time, face_points, raw_ear, original_shape, result, face_id=face_id)
+    metrics.inc('frames_face')
+    metrics.observe('scoring', time.perf_counter() - scoring_start)
+
+    areas = [(right - left) * (bottom - top) for left, top, right, bottom in boxes]
+    primary = results[areas.index(max(areas))]
+    return dict(primary, frame_skipped=frame_skipped, skip_rate=skip_rate,
+                faces=sorted(results, key=lambda face: face['face_id']))
+
+
+@contextmanager
+def admit(session_id, admitted=False, client=None):
+    """
+    Admission control slot for one request of session_id; raises Rejected if turned
+    away. admitted=True: the caller already holds the slot (asgi_server).
+    client: rate-limit key from client_key().
+    """
+    if admission is None or admitted:
+        yield
+        return
+    with admission.admit(session_id, client) as waited:
+        metrics.observe('admission_wait', waited)
+        yield
+
+
+def rejection(e):
+    """Count a rejected request; returns its error payload (next_capture_ms = retry-after)"""
+    metrics.inc(f'rejected_{e.reason}')
+    tracer.debug('rejected', reason=e.reason, retry_after=e.retry_after)
+    return dict(e.payload(), next_capture_ms=int(e.retry_after * 1000))
+
+
+def scored_states(state):
+    """The scoring states behind a session's last frame: one per tracked face"""
+    if state.faces is not None:
+        return [track.state for track in state.faces.tracks.values()]
+    return [state]
+
+
+def session_score(state):
+    """Highest drowsy score among the session's faces"""
+    return max((face.drowsy_score for face in scored_states(state)), default=0.0)
+
+
+def update_priority(session_id, state, score_before):
+    """
+    Mark the session urgent for admission if its last frame left an alert active, a
+    confirmation running, the eyes closing or the drowsy score higher than before
+    """
+    if admission is None:
+        return
+    urgent = session_score(state) > score_before or any(
+        face.is_in_alert or face.confirmation_start is not None or face.eyes_closed_start is not None
+        for face in scored_states(state)
+    )
+    admission.set_urgent(session_id, urgent)
+
+
+def finish_frame(session_id, state, result, score_before):
+    """Per-frame follow-up once the session's state has advanced: sampling hint and priority"""
+    result['next_capture_ms'] = next_capture_ms(state, result)
+    update_priority(session_id, state, score_before)
+
+
+def next_capture_ms(state, result):
+    """Recommended delay before the client's next capture, from the faces just scored"""
+    if state.faces is not None:
+        # Faces seen in this frame, and unseen ones whose alert carries over
+        face_states = [track.state for track in state.faces.tracks.values()
+                       if track.missed == 0 or track.state.is_in_alert]
+    elif result.get('face_box') or state.is_in_alert:
+        # A face lost during an alert still needs fast sampling
+        face_states = [state]
+    else:
+        face_states = []
+    return sampling.next_interval([
+        (face.drowsy_score, face.eyes_closed_start is not None, face.is_in_alert) for face in face_states
+    ])
+
+
+def lookup_frame(session_id, image_bytes, key=None):
+    """(cache key, cached frame or None) for one upload; (None, None) with the cache off"""
+    if frame_cache is None:
+        return None, None
+    if key is None:
+        key = frame_key(session_id, image_bytes)
+    cached = frame_cache.get(key)
+    metrics.inc('frame_cache_hits' if cached is not None else 'frame_cache_misses')
+    return key, cached
+
+
+def process_frame(session_id, image_bytes, current_time, admitted=False, client=None):
+    """
+    Decode one encoded frame and run it through the session's detection state.
+    Raises Rejected if admission control turns the frame away.
+    """
+    with admit(session_id, admitted, client), metrics.timed('frame_total'), sampling.frame():
+        cache_key, cached = lookup_frame(session_id, image_bytes)
+        if cached is not None:
+            with sessions.session(session_id) as state, tracer.session(session_id):
+                score_before = session_score(state)
+                result = analyze_cached_frame(state, cached, current_time, session_id)
+                finish_frame(session_id, state, result, score_before)
+            metrics.set_gauge('active_sessions', active_session_count())
+            return result
+        with metrics.timed('imdecode'):
+            frame, original_shape = decode_image_bytes(image_bytes, decode_target_size(session_id))
+        with sessions.session(session_id) as state, tracer.session(session_id):
+            score_before = session_score(state)
+            result = analyze_frame(state, frame, original_shape, current_time, session_id, cache_key)
+            finish_frame(session_id, state, result, score_before)
+    metrics.set_gauge('active_sessions', active_session_count())
+    return result
 
-def decode_image(base64_string):
-    """Decode base64 string to OpenCV image"""
-    img_data = base64.b64decode(base64_string.split(',')[1])
-    nparr = np.frombuffer(img_data, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    original_shape = img.shape  # Store original dimensions
-    # Resize to smaller dimensions for faster processing
-    img = cv2.resize(img, (320, 240))
-    return img, original_shape
 
 @app.route('/detect_drowsiness', methods=['POST'])
 def detect_drowsiness():
@@ -348,161 +989,369 @@ def detect_drowsiness():
     """
     try:
         current_time = time.time()
-        data = request.json
-        image_data = data.get('image')
+        image_bytes, fields = read_frame_upload()
         
-        if not image_data:
+        if not image_bytes:
             return jsonify({'error': 'No image provided'}), 400
         
-        # Decode image
-        frame, original_shape = decode_image(image_data)
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Calculate scaling factors for coordinate conversion
-        scale_x = original_shape[1] / frame.shape[1]
-        scale_y = original_shape[0] / frame.shape[0]
+        try:
+            session_id = get_session_id(fields)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Check image quality (brightness)
-        avg_brightness = np.mean(gray)
-        if DEBUG_MODE:
-            print(f"\n[DEBUG] ===== Frame Analysis =====")
-            print(f"[DEBUG] Brightness: {avg_brightness:.1f}/255")
+        return jsonify(process_frame(session_id, image_bytes, current_time, client=client_key(session_id)))
         
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mesh = get_face_mesh()
-        results = mesh.process(rgb_frame)
+    except Rejected as e:
+        return jsonify(rejection(e)), e.status, e.headers()
+    except Exception as e:
+        tracer.error('request_failed', route='detect_drowsiness', exc=e)
+        metrics.inc('errors')
+        return jsonify({'error': str(e)}), 500
 
-        if not results.multi_face_landmarks:
-            # Face lost - reset state but keep alert status for grace period
-            if DEBUG_MODE:
-                print(f"[DEBUG] No face detected - resetting detection state")
-            
-            state.reset()
-            
-            # Provide helpful feedback based on brightness
-            if avg_brightness < 50:
-                message = 'No face detected - Too dark, improve lighting'
-            elif avg_brightness > 200:
-                message = 'No face detected - Too bright, reduce lighting'
-            else:
-                message = 'No face detected - Position face in frame'
-            
-            return jsonify({
-                'is_drowsy': state.is_in_alert,  # Keep alert if in grace period
-                'message': message,
-                'brightness': round(avg_brightness, 1),
-                'drowsy_score': 0,
-                'confidence': 0
-            })
-        
-        # Process first detected face
-        face_landmarks = results.multi_face_landmarks[0].landmark
-        height, width = gray.shape
+def parse_batch_frames(frames):
+    """
+    Validate a batch payload's frames list.
+    Returns [(image data URI, timestamp)], raising ValueError on bad input.
+    """
+    if not isinstance(frames, list) or not frames:
+        raise ValueError('frames must be a non-empty list')
+    if len(frames) > MAX_BATCH_FRAMES:
+        raise ValueError(f'At most {MAX_BATCH_FRAMES} frames per batch')
+    
+    parsed = []
+    previous = None
+    for i, item in enumerate(frames):
+        if not isinstance(item, dict) or not item.get('image'):
+            raise ValueError(f'frames[{i}]: No image provided')
+        timestamp = item.get('timestamp')
+        if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)) or not np.isfinite(timestamp):
+            raise ValueError(f'frames[{i}]: timestamp must be a number (seconds)')
+        if previous is not None and timestamp < previous:
+            raise ValueError(f'frames[{i}]: timestamps must be in capture order')
+        previous = timestamp
+        parsed.append((item['image'], float(timestamp)))
+    return parsed
 
-        # Calculate face box on resized image
-        face_box = calc_face_box(face_landmarks, width, height)
-        
-        # Scale face box coordinates back to original image dimensions
-        face_box = {
-            'left': int(face_box['left'] * scale_x),
-            'top': int(face_box['top'] * scale_y),
-            'right': int(face_box['right'] * scale_x),
-            'bottom': int(face_box['bottom'] * scale_y)
-        }
 
-        # Calculate EAR for both eyes
-        left_ear = eye_aspect_ratio_from_landmarks(face_landmarks, width, height, LEFT_EYE_IDX)
-        right_ear = eye_aspect_ratio_from_landmarks(face_landmarks, width, height, RIGHT_EYE_IDX)
-        raw_ear = (left_ear + right_ear) / 2.0
-        
-        # Get temporally smoothed EAR
-        smoothed_ear = get_smoothed_ear(raw_ear)
-        
-        # Detect blinks vs drowsiness
-        is_blink, is_eyes_closed = detect_blink(smoothed_ear, current_time)
-        
-        # Update drowsiness score with intelligent logic
-        drowsy_score, is_confirmed_drowsy = update_drowsy_score(
-            is_eyes_closed, is_blink, smoothed_ear, current_time
-        )
-        
-        # Check grace period
-        in_grace_period = check_grace_period(current_time)
-        
-        if DEBUG_MODE:
-            print(f"[DEBUG] Raw EAR: {raw_ear:.3f} | Smoothed: {smoothed_ear:.3f}")
-            print(f"[DEBUG] Eyes Closed: {is_eyes_closed} | Blink: {is_blink}")
-            print(f"[DEBUG] Drowsy Score: {drowsy_score:.1f}/100 | In Grace: {in_grace_period}")
-        
-        # Determine alert state
-        should_alert = False
-        message = 'Alert'
-        confidence = int(drowsy_score)
-        
-        if is_confirmed_drowsy and not in_grace_period:
-            # Confirmed drowsiness - trigger alert
-            should_alert = True
-            state.is_in_alert = True
-            state.last_alert_time = current_time
-            message = 'Drowsiness detected!'
-            
-            if DEBUG_MODE:
-                print(f"[ALERT] 🚨 DROWSINESS ALERT TRIGGERED! Score: {drowsy_score:.1f}/100")
-        
-        elif state.is_in_alert:
-            # Currently in alert state
-            # Quick recovery detection: If eyes are wide open OR score drops significantly
-            if smoothed_ear >= EAR_ALERT_THRESHOLD or drowsy_score < 40:
-                # Immediate recovery - exit alert
-                state.is_in_alert = False
-                should_alert = False
-                message = 'Recovered!' if drowsy_score < 20 else 'Recovering...'
-                if DEBUG_MODE:
-                    print(f"[DEBUG] ✓ IMMEDIATE RECOVERY - EAR: {smoothed_ear:.3f}, Score: {drowsy_score:.1f}")
+def decode_payload_safely(image_data):
+    """Raw image bytes of one batch frame's data URI, or the exception"""
+    try:
+        with metrics.timed('base64_decode'):
+            return decode_data_uri(image_data)
+    except Exception as e:
+        return e
+
+
+def decode_frame_safely(image_bytes, target_size=None):
+    """Decode one frame's bytes for the batch pool; returns (frame, original_shape) or the exception"""
+    if isinstance(image_bytes, Exception):
+        return image_bytes
+    try:
+        with metrics.timed('imdecode'):
+            return decode_image_bytes(image_bytes, target_size)
+    except Exception as e:
+        return e
+
+
+def process_batch(session_id, frames, arrival_time, admitted=False, client=None):
+    """
+    Decode parsed batch frames in parallel, then analyze them in order for one session.
+    Returns one result dict per frame (with its client timestamp) or a per-frame error.
+    The whole batch takes one admission slot (and one rate-limit token).
+    """
+    with admit(session_id, admitted, client):
+        return analyze_batch(session_id, frames, arrival_time)
+
+
+def analyze_batch(session_id, frames, arrival_time):
+    """process_batch without admission control"""
+    # base64 holds the GIL, so it runs here; the pool only does the image decodes
+    payloads = [decode_payload_safely(image) for image, _ in frames]
+    
+    # Frames already in the cache skip the decode. Repeats within the batch are looked
+    # up only when their turn comes, once the first copy has been analyzed and cached.
+    lookups = [(None, None)] * len(frames)
+    repeats = set()
+    if frame_cache is not None:
+        seen = set()
+        for i, image in enumerate(payloads):
+            if isinstance(image, Exception):
+                continue
+            key = frame_key(session_id, image)
+            if key in seen:
+                lookups[i] = (key, None)
+                repeats.add(i)
             else:
-                # Still in alert - eyes not fully open yet
-                should_alert = True
-                message = 'Wake up! Still drowsy!' if drowsy_score < 50 else 'Drowsiness detected!'
-        
-        elif drowsy_score > 50:
-            # Warning state - getting very drowsy
-            message = 'Getting very drowsy...'
-        
-        elif drowsy_score > 30:
-            # Caution - slight drowsiness building
-            message = 'Eyes getting heavy...'
-        
-        elif smoothed_ear < EAR_PARTIAL_OPEN:
-            # Eyes in sleepy zone (0.21-0.24) but score not high yet
-            message = 'Eyes look sleepy...'
+                seen.add(key)
+                lookups[i] = lookup_frame(session_id, image, key)
+    misses = [i for i, (_, cached) in enumerate(lookups) if cached is None and i not in repeats]
+    # Full resolution only if ROI cropping will use it (the first frame may still be reduced)
+    target_size = decode_target_size(session_id)
+    decoded = dict(zip(misses, get_batch_decode_pool().map(
+        decode_frame_safely, [payloads[i] for i in misses], [target_size] * len(misses)
+    )))
+    clock_offset = arrival_time - frames[-1][1]
+    
+    results = []
+    with sessions.session(session_id) as state, tracer.session(session_id):
+        score_before = session_score(state)
+        for i, (_, timestamp) in enumerate(frames):
+            key, cached = lookups[i]
+            if i in repeats:
+                _, cached = lookup_frame(session_id, payloads[i], key)
+                if cached is None:
+                    # The first copy wasn't cached (it was adaptively skipped)
+                    decoded[i] = decode_frame_safely(payloads[i], target_size)
+            if cached is not None:
+                result = analyze_cached_frame(state, cached, timestamp + clock_offset, session_id)
+                result['timestamp'] = timestamp
+                results.append(result)
+                continue
+            frame = decoded[i]
+            if isinstance(frame, Exception):
+                results.append({'error': str(frame)})
+                continue
+            image, original_shape = frame
+            result = analyze_frame(state, image, original_shape, timestamp + clock_offset, session_id, key)
+            result['timestamp'] = timestamp
+            results.append(result)
+        update_priority(session_id, state, score_before)
+    metrics.set_gauge('active_sessions', active_session_count())
+    return results
+
+
+@app.route('/detect_drowsiness/batch', methods=['POST'])
+def detect_drowsiness_batch():
+    """
+    Analyze several buffered frames of one session in a single round trip.
+    
+    Body: {"session_id": "...", "frames": [{"image": "data:image/jpeg;base64,...",
+           "timestamp": <capture time in seconds>}, ...]} in capture order.
+    Frames are decoded in parallel, then run through face mesh and the temporal
+    logic in order. The client timestamps drive the blink/closure/confirmation
+    timing; they are shifted so the last frame lands on the server's arrival time,
+    which keeps them consistent with single-frame requests for the same session.
+    """
+    try:
+        arrival_time = time.time()
+        data = request.get_json(silent=True) or {}
+        try:
+            session_id = get_session_id(data)
+            frames = parse_batch_frames(data.get('frames'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        elif smoothed_ear < EAR_ALERT_THRESHOLD:
-            # Eyes partially open (0.24-0.28) - could be natural, just monitoring
-            message = 'Monitoring...'
+        results = process_batch(session_id, frames, arrival_time, client=client_key(session_id))
+        return jsonify({'session_id': session_id, 'results': results})
         
-        if DEBUG_MODE:
-            print(f"[DEBUG] Final State: Alert={should_alert} | Message='{message}' | Confidence={confidence}%")
-            print(f"[DEBUG] ========================\n")
+    except Rejected as e:
+        return jsonify(rejection(e)), e.status, e.headers()
+    except Exception as e:
+        tracer.error('request_failed', route='detect_drowsiness_batch', exc=e)
+        metrics.inc('errors')
+        return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# LANDMARK INGESTION - clients that run face mesh locally send only the eye points
+# ============================================================================
+
+def parse_eye_points(value, name):
+    """6 normalized (x, y) pairs in landmark index order, as a list of float pairs"""
+    if not isinstance(value, list) or len(value) != len(LEFT_EYE_IDX):
+        raise ValueError(f'{name} must be a list of {len(LEFT_EYE_IDX)} [x, y] points')
+    points = []
+    for point in value:
+        if (not isinstance(point, list) or len(point) != 2
+                or not all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in point)):
+            raise ValueError(f'{name} points must be [x, y] number pairs')
+        x, y = float(point[0]), float(point[1])
+        if not (LANDMARK_MIN <= x <= LANDMARK_MAX and LANDMARK_MIN <= y <= LANDMARK_MAX):
+            raise ValueError(f'{name} coordinates must be normalized to the frame (0-1)')
+        points.append((x, y))
+    return points
+
+
+def parse_landmark_frame(data):
+    """
+    Validate a landmark payload. Returns (eye landmark array or None for no face,
+    face box or None, brightness or None), raising ValueError on bad input.
+    """
+    left_eye, right_eye = data.get('left_eye'), data.get('right_eye')
+    points = None
+    if left_eye is not None or right_eye is not None:
+        points = eye_points_to_array(parse_eye_points(left_eye, 'left_eye'), parse_eye_points(right_eye, 'right_eye'))
+    
+    face_box = data.get('face_box')
+    if face_box is not None:
+        face_box = parse_face_box(face_box)
+    
+    brightness = data.get('brightness')
+    if brightness is not None:
+        if isinstance(brightness, bool) or not isinstance(brightness, (int, float)) or not 0 <= brightness <= 255:
+            raise ValueError('brightness must be a number from 0 to 255')
+        brightness = float(brightness)
+    return points, face_box, brightness
+
+
+def analyze_landmarks(state, points, face_box, brightness, current_time, session_id=DEFAULT_SESSION_ID):
+    """
+    Temporal drowsiness logic on client-computed eye landmarks; same response as
+    analyze_frame. EAR is computed on the PROCESSING_SIZE grid, like server-side frames.
+    """
+    scoring_start = time.perf_counter()
+    # Image-derived state (skip reference, ROI) is older than this frame: the next upload runs the full mesh
+    state.skip_reference = state.reference_points = state.roi = None
+    state.consecutive_skips = 0
+    state.frames_analyzed += 1
+    skip_rate = round(state.frames_skipped / (state.frames_analyzed + state.frames_skipped), 3)
+    original_shape = (0, 0)  # No image: recorded as a 0x0 frame
+    
+    if points is None:
+        is_drowsy = scoring_engine.no_face(state)
+        metrics.inc('frames_no_face')
+        result = {
+            'is_drowsy': is_drowsy,
+            'message': no_face_message(brightness),
+            'brightness': round(brightness, 1) if brightness is not None else None,
+            'drowsy_score': 0,
+            'confidence': 0,
+            'frame_skipped': False,
+            'skip_rate': skip_rate
+        }
+        metrics.observe('scoring', time.perf_counter() - scoring_start)
+        if recorder is not None:
+            recorder.record(session_id, current_time, None, None, original_shape, result)
+        return result
+    
+    width, height = PROCESSING_SIZE
+    left_ear, right_ear = eye_aspect_ratios(points, width, height)
+    raw_ear = (left_ear + right_ear) / 2.0
+    
+    score = scoring_engine.score_frame(state, raw_ear, current_time)
+    if score.alert_triggered:
+        metrics.inc('alerts')
+    metrics.inc('frames_face')
+    metrics.observe('scoring', time.perf_counter() - scoring_start)
+    
+    result = {
+        'is_drowsy': score.should_alert,
+        'ear': round(score.smoothed_ear, 3),
+        'raw_ear': round(raw_ear, 3),
+        'message': score.message,
+        'face_box': face_box,
+        'drowsy_score': round(score.drowsy_score, 1),
+        'confidence': int(score.drowsy_score),
+        'is_blink': score.is_blink,
+        'in_grace_period': score.in_grace_period,
+        'frame_skipped': False,
+        'skip_rate': skip_rate
+    }
+    if recorder is not None:
+        recorder.record(session_id, current_time, points, raw_ear, original_shape, result)
+    return result
+
+
+def process_landmarks(session_id, points, face_box, brightness, current_time, admitted=False, client=None):
+    """
+    Run one landmark frame through the session's detection state.
+    Raises Rejected if admission control turns the frame away.
+    """
+    with admit(session_id, admitted, client), metrics.timed('frame_total'), sampling.frame():
+        with sessions.session(session_id) as state, tracer.session(session_id):
+            score_before = session_score(state)
+            result = analyze_landmarks(state, points, face_box, brightness, current_time, session_id)
+            finish_frame(session_id, state, result, score_before)
+    metrics.set_gauge('active_sessions', active_session_count())
+    return result
+
+
+@app.route('/detect_drowsiness/landmarks', methods=['POST'])
+def detect_drowsiness_landmarks():
+    """
+    Drowsiness detection from eye landmarks computed by the client - no image.
+    
+    Body: {"session_id": "...", "left_eye": [[x, y] x 6], "right_eye": [[x, y] x 6],
+           "face_box": {"left", "top", "right", "bottom"} (optional, pixels),
+           "brightness": <mean gray level 0-255> (optional)}
+    Eye points are normalized (0-1) face mesh landmarks in LEFT_EYE_IDX / RIGHT_EYE_IDX
+    order. Omit both eyes for a frame without a face. Same response as /detect_drowsiness.
+    """
+    try:
+        current_time = time.time()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        try:
+            session_id = get_session_id(data)
+            points, face_box, brightness = parse_landmark_frame(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'is_drowsy': should_alert,
-            'ear': round(smoothed_ear, 3),
-            'raw_ear': round(raw_ear, 3),
-            'message': message,
-            'face_box': face_box,
-            'drowsy_score': round(drowsy_score, 1),
-            'confidence': confidence,
-            'is_blink': is_blink,
-            'in_grace_period': in_grace_period
-        })
+        return jsonify(process_landmarks(session_id, points, face_box, brightness, current_time,
+                                         client=client_key(session_id)))
         
+    except Rejected as e:
+        return jsonify(rejection(e)), e.status, e.headers()
     except Exception as e:
-        if DEBUG_MODE:
-            import traceback
-            print(f"[ERROR] Exception in detect_drowsiness: {str(e)}")
-            traceback.print_exc()
+        tracer.error('request_failed', route='detect_drowsiness_landmarks', exc=e)
+        metrics.inc('errors')
         return jsonify({'error': str(e)}), 500
 
+
+@sock.route('/ws/detect')
+def detect_drowsiness_stream(ws):
+    """
+    Persistent streaming variant of /detect_drowsiness.
+    
+    The client sends one frame per message - binary JPEG bytes, or a JSON text
+    message {"image": "data:image/jpeg;base64,..."} - and gets back the same JSON
+    result object /detect_drowsiness returns. Detection state is bound to the
+    connection; pass ?session_id=... to keep it across reconnects.
+    """
+    try:
+        session_id = get_session_id()
+    except ValueError as e:
+        ws.send(json.dumps({'error': str(e)}))
+        return
+    client = client_key(session_id)  # Per connection sessions still share their address's rate limit
+    connection_scoped = session_id == DEFAULT_SESSION_ID
+    if connection_scoped:
+        session_id = f'ws-{uuid.uuid4().hex}'
+    
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                continue
+            current_time = time.time()
+            try:
+                if isinstance(message, str):
+                    image_data = json.loads(message).get('image')
+                    image_bytes = None
+                    if image_data:
+                        with metrics.timed('base64_decode'):
+                            image_bytes = decode_data_uri(image_data)
+                else:
+                    image_bytes = message
+                
+                if not image_bytes:
+                    result = {'error': 'No image provided'}
+                else:
+                    result = process_frame(session_id, image_bytes, current_time, client=client)
+            except Rejected as e:
+                result = rejection(e)
+            except Exception as e:
+                tracer.error('request_failed', session_id=session_id, route='detect_drowsiness_stream', exc=e)
+                metrics.inc('errors')
+                result = {'error': str(e)}
+            
+            ws.send(app.json.dumps(result))
+    finally:
+        if connection_scoped:
+            sessions.discard(session_id)
+
+
 @app.route('/', methods=['GET'])
 def index():
     """Root endpoint - API info"""
@@ -511,7 +1360,13 @@ def index():
         'version': '1.0',
         'endpoints': {
             '/health': 'GET - Health check',
-            '/detect_drowsiness': 'POST - Detect drowsiness from image'
+            '/ready': 'GET - Readiness: 200 once the models are built and warmed up, 503 before',
+            '/stats': 'GET - Session registry counters',
+            '/metrics': 'GET - Per-stage latency histograms and counters (Prometheus text format)',
+            '/detect_drowsiness': 'POST - Detect drowsiness from image (JSON base64, raw image/jpeg body or multipart; send X-Session-ID or session_id per client)',
+            '/detect_drowsiness/batch': 'POST - Detect drowsiness on an ordered list of timestamped frames from one session',
+            '/detect_drowsiness/landmarks': 'POST - Detect drowsiness from client-computed eye landmarks (no image)',
+            '/ws/detect': 'WebSocket - Stream binary frames, receive one detection result per frame'
         }
     })
 
@@ -519,6 +1374,57 @@ def index():
 def health():
     return jsonify({'status': 'ok'})
 
+def readiness():
+    """(payload, status): 200 once the models are warmed up (or warm-up is off), else 503"""
+    ready = startup.ready or not WARMUP_ON_BOOT
+    payload = {'status': 'ready' if ready else 'warming_up', 'startup': startup.stats()}
+    return payload, 200 if ready else 503
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: models built and warmed up; /health only says the process is up"""
+    payload, status = readiness()
+    return jsonify(payload), status
+
+def collect_stats():
+    """Session registry, face mesh, frame skipping, frame cache, sampling and admission counters"""
+    sessions.sweep()
+    tracking_meshes.sweep()
+    return {
+        'sessions': sessions.stats(),
+        'state_backend': STATE_BACKEND,
+        'face_mesh_mode': FACE_MESH_MODE,
+        'tracking_meshes': tracking_meshes.stats(),
+        'frame_skip': dict(change_detector.stats(), enabled=FRAME_SKIP),
+        'inference_backend': INFERENCE_BACKEND,
+        'inference_workers': inference_workers.stats() if inference_workers is not None else None,
+        'tracing': tracer.stats(),
+        'recording': recorder.stats() if recorder is not None else None,
+        'frame_cache': frame_cache.stats() if frame_cache is not None else None,
+        'sampling': sampling.stats(),
+        'admission': admission.stats() if admission is not None else None,
+        'startup': startup.stats()
+    }
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Session registry, face mesh and frame skipping counters"""
+    return jsonify(collect_stats())
+
+def render_metrics():
+    """Prometheus text for all processes sharing METRICS_DIR"""
+    sessions.sweep()
+    metrics.set_gauge('active_sessions', active_session_count())
+    return metrics.render()
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-stage latency histograms (with p50/p95/p99) and frame counters, all workers merged"""
+    return app.response_class(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+startup.mark('import_total')
+
 if __name__ == '__main__':
+    start_warm_up()
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=True)
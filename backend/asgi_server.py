@@ -0,0 +1,450 @@
+"""
+Async serving mode - ASGI front end for the detection API
+
+Request bodies are received and parsed, and responses written, on the event loop.
+Only decode + face mesh + temporal logic run in a bounded inference thread pool,
+where every thread owns its own static-image FaceMesh. A slow client uploading or
+reading a frame therefore holds a coroutine, never an inference thread.
+
+Same endpoints and responses as api_server.py (which stays the WSGI entry point):
+
+    uvicorn asgi_server:app --port 5001
+    gunicorn asgi_server:app -k uvicorn.workers.UvicornWorker -c gunicorn_config.py
+"""
+import asyncio
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.wrappers import Request
+
+import api_server
+from api_server import (
+    DEFAULT_SESSION_ID, METRICS_CONTENT_TYPE, Rejected, admit, client_key, collect_stats, decode_data_uri,
+    get_session_id, metrics, parse_batch_frames, parse_landmark_frame, process_batch, process_frame,
+    process_landmarks, read_frame_upload, readiness, rejection, render_metrics, sessions, tracer
+)
+
+# Inference pool: decode + face mesh threads, one FaceMesh each
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', os.cpu_count() or 2))
+# Frames admitted to the pool (running + queued); further requests wait on the event loop
+MAX_PENDING_INFERENCES = int(os.environ.get('MAX_PENDING_INFERENCES', 4 * INFERENCE_THREADS))
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', 10 * 1024 * 1024))
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+    (b'access-control-allow-headers', b'Content-Type, X-Session-ID')
+]
+
+inference_pool = ThreadPoolExecutor(
+    max_workers=INFERENCE_THREADS,
+    thread_name_prefix='inference',
+    initializer=api_server.enable_thread_face_mesh
+)
+inference_slots = None  # asyncio.Semaphore, created on the event loop
+inference_in_flight = 0
+inference_waiting = 0  # Frames handed to run_inference that no inference thread has started yet
+inference_waiting_lock = threading.Lock()
+# Frames waiting for an inference thread count towards the load behind next_capture_ms
+api_server.sampling.add_backlog(lambda: inference_waiting)
+
+# Admission control (api_server.admit) blocks while a frame is queued, so it runs on its
+# own threads: queued frames never hold an inference thread. At most ADMISSION_MAX_QUEUE
+# frames wait at once, the rest return (admitted or rejected) right away.
+admission_pool = None
+if api_server.admission is not None:
+    admission_pool = ThreadPoolExecutor(
+        max_workers=api_server.ADMISSION_MAX_QUEUE + api_server.ADMISSION_MAX_ACTIVE,
+        thread_name_prefix='admission'
+    )
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+def stop_waiting(started):
+    """Take one frame off inference_waiting, once (started: [flag] shared by its callers)"""
+    global inference_waiting
+    with inference_waiting_lock:
+        if not started[0]:
+            started[0] = True
+            inference_waiting -= 1
+
+
+async def run_inference(fn, *args):
+    """Run fn(*args) on the inference pool once a pending slot is free"""
+    global inference_slots, inference_in_flight, inference_waiting
+    if inference_slots is None:
+        inference_slots = asyncio.Semaphore(MAX_PENDING_INFERENCES)
+    started = [False]
+
+    def call():
+        stop_waiting(started)
+        return fn(*args)
+
+    with inference_waiting_lock:
+        inference_waiting += 1
+    try:
+        async with inference_slots:
+            inference_in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(inference_pool, call)
+            finally:
+                inference_in_flight -= 1
+    finally:
+        stop_waiting(started)  # Cancelled or failed before a thread picked it up
+
+
+async def run_in_thread(fn, *args):
+    """Run fn(*args) on the default executor, skipping the inference pool's queue"""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def run_admitted(fn, session_id, *args, client=None, run=run_inference):
+    """
+    run(fn, session_id, *args) in an admission control slot; raises Rejected if the
+    frame is turned away. fn takes admitted=True as its last argument.
+    client: rate-limit key from client_key().
+    """
+    if admission_pool is None:
+        return await run(fn, session_id, *args)
+    slot = admit(session_id, client=client)
+    entering = admission_pool.submit(slot.__enter__)
+    try:
+        await asyncio.wrap_future(entering)
+    except asyncio.CancelledError:
+        # Still give the slot back if it is acquired after the request went away
+        entering.add_done_callback(
+            lambda f: f.cancelled() or f.exception() is not None or slot.__exit__(None, None, None)
+        )
+        raise
+    try:
+        return await run(fn, session_id, *args, True)
+    finally:
+        slot.__exit__(None, None, None)
+
+
+def make_request(scope, body=b''):
+    """Wrap an ASGI scope and its body in a werkzeug Request (headers, args, JSON, multipart)"""
+    environ = {
+        'REQUEST_METHOD': scope.get('method', 'GET'),
+        'SCRIPT_NAME': '',
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': 'asgi',
+        'SERVER_PORT': '0',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': scope.get('scheme', 'http')
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return Request(environ)
+
+
+async def read_body(receive):
+    """Collect the full request body on the event loop"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+def dumps(payload):
+    return api_server.app.json.dumps(payload).encode('utf-8')
+
+
+async def send_body(send, body, content_type, status=200, headers=None):
+    extra = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in (headers or {}).items()]
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('ascii'))
+        ] + extra + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, payload, status=200, headers=None):
+    await send_body(send, dumps(payload) + b'\n', 'application/json', status, headers)
+
+
+# ============================================================================
+# HTTP ROUTES
+# ============================================================================
+
+async def detect_drowsiness(req):
+    current_time = time.time()
+    image_bytes, fields = read_frame_upload(req)
+    if not image_bytes:
+        return {'error': 'No image provided'}, 400
+    try:
+        session_id = get_session_id(fields, req)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    try:
+        return await run_admitted(process_frame, session_id, image_bytes, current_time,
+                                  client=client_key(session_id, req)), 200
+    except Rejected as e:
+        return rejection(e), e.status, e.headers()
+
+
+async def detect_drowsiness_batch(req):
+    arrival_time = time.time()
+    data = req.get_json(silent=True) or {}
+    try:
+        session_id = get_session_id(data, req)
+        frames = parse_batch_frames(data.get('frames'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    try:
+        results = await run_admitted(process_batch, session_id, frames, arrival_time,
+                                     client=client_key(session_id, req))
+    except Rejected as e:
+        return rejection(e), e.status, e.headers()
+    return {'session_id': session_id, 'results': results}, 200
+
+
+async def detect_drowsiness_landmarks(req):
+    current_time = time.time()
+    data = req.get_json(silent=True)
+    if not isinstance(data, dict):
+        return {'error': 'Expected a JSON object'}, 400
+    try:
+        session_id = get_session_id(data, req)
+        points, face_box, brightness = parse_landmark_frame(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    # Arithmetic only, so it skips the inference pool's queue; a thread still, since the
+    # session's lock may be held by an image frame of the same session
+    try:
+        result = await run_admitted(process_landmarks, session_id, points, face_box, brightness, current_time,
+                                    client=client_key(session_id, req), run=run_in_thread)
+    except Rejected as e:
+        return rejection(e), e.status, e.headers()
+    return result, 200
+
+
+async def index(req):
+    return {
+        'api': 'Drowsiness Detection API',
+        'version': '1.0',
+        'serving_mode': 'async',
+        'endpoints': {
+            '/health': 'GET - Health check',
+            '/ready': 'GET - Readiness: 200 once the models are built and warmed up, 503 before',
+            '/stats': 'GET - Session registry and inference pool counters',
+            '/metrics': 'GET - Per-stage latency histograms and counters (Prometheus text format)',
+            '/detect_drowsiness': 'POST - Detect drowsiness from image (JSON base64, raw image/jpeg body or multipart; send X-Session-ID or session_id per client)',
+            '/detect_drowsiness/batch': 'POST - Detect drowsiness on an ordered list of timestamped frames from one session',
+            '/detect_drowsiness/landmarks': 'POST - Detect drowsiness from client-computed eye landmarks (no image)',
+            '/ws/detect': 'WebSocket - Stream binary frames, receive one detection result per frame'
+        }
+    }, 200
+
+
+async def health(req):
+    return {'status': 'ok'}, 200
+
+
+async def ready(req):
+    return readiness()
+
+
+async def stats(req):
+    # Off the loop: sweeping evicts sessions, whose listeners wait on per-session mesh locks
+    payload = await run_in_thread(collect_stats)
+    payload['inference_pool'] = {
+        'threads': INFERENCE_THREADS,
+        'max_pending': MAX_PENDING_INFERENCES,
+        'in_flight': inference_in_flight,
+        'waiting': inference_waiting
+    }
+    return payload, 200
+
+
+ROUTES = {
+    ('POST', '/detect_drowsiness'): detect_drowsiness,
+    ('POST', '/detect_drowsiness/batch'): detect_drowsiness_batch,
+    ('POST', '/detect_drowsiness/landmarks'): detect_drowsiness_landmarks,
+    ('GET', '/'): index,
+    ('GET', '/health'): health,
+    ('GET', '/ready'): ready,
+    ('GET', '/stats'): stats
+}
+
+
+async def handle_http(scope, receive, send):
+    method, path = scope['method'], scope['path']
+    if method == 'OPTIONS':
+        # CORS preflight
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-length', b'0')] + CORS_HEADERS})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if (method, path) == ('GET', '/metrics'):
+        body = await run_in_thread(render_metrics)  # Sweeps sessions and reads every worker's file
+        await send_body(send, body.encode('utf-8'), METRICS_CONTENT_TYPE)
+        return
+
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        status = 405 if any(route_path == path for _, route_path in ROUTES) or path == '/metrics' else 404
+        await send_json(send, {'error': 'Method not allowed' if status == 405 else 'Not found'}, status)
+        return
+
+    try:
+        body = await read_body(receive)
+    except ClientDisconnected:
+        return
+    except BodyTooLarge:
+        await send_json(send, {'error': f'Request body larger than {MAX_BODY_BYTES} bytes'}, 413)
+        return
+
+    headers = None
+    try:
+        payload, status, *headers = await handler(make_request(scope, body))
+    except Exception as e:
+        tracer.error('request_failed', route=handler.__name__, exc=e)
+        metrics.inc('errors')
+        payload, status = {'error': str(e)}, 500
+    await send_json(send, payload, status, headers[0] if headers else None)
+
+
+# ============================================================================
+# WEBSOCKET STREAM
+# ============================================================================
+
+async def detect_drowsiness_stream(scope, receive, send):
+    """
+    Async twin of api_server's /ws/detect: binary JPEG or JSON text frames in,
+    one JSON result per frame out. Each connection has one frame in flight.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    req = make_request(scope)
+    try:
+        session_id = get_session_id(req=req)
+    except ValueError as e:
+        await send({'type': 'websocket.send', 'text': json.dumps({'error': str(e)})})
+        await send({'type': 'websocket.close', 'code': 1008})
+        return
+    client = client_key(session_id, req)  # Per connection sessions still share their address's rate limit
+    connection_scoped = session_id == DEFAULT_SESSION_ID
+    if connection_scoped:
+        session_id = f'ws-{uuid.uuid4().hex}'
+
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            current_time = time.time()
+            try:
+                if message.get('bytes') is not None:
+                    image_bytes = message['bytes']
+                else:
+                    image_data = json.loads(message.get('text') or '{}').get('image')
+                    image_bytes = None
+                    if image_data:
+                        with metrics.timed('base64_decode'):
+                            image_bytes = decode_data_uri(image_data)
+
+                if not image_bytes:
+                    result = {'error': 'No image provided'}
+                else:
+                    result = await run_admitted(process_frame, session_id, image_bytes, current_time, client=client)
+            except Rejected as e:
+                result = rejection(e)
+            except Exception as e:
+                tracer.error('request_failed', session_id=session_id, route='detect_drowsiness_stream', exc=e)
+                metrics.inc('errors')
+                result = {'error': str(e)}
+
+            await send({'type': 'websocket.send', 'text': dumps(result).decode('utf-8')})
+    finally:
+        if connection_scoped:
+            await run_in_thread(sessions.discard, session_id)
+
+
+def warm_up_inference_threads():
+    """Start every inference thread and warm up its own FaceMesh, then the shared models"""
+    barrier = threading.Barrier(INFERENCE_THREADS)
+
+    def warm_up_thread():
+        barrier.wait(timeout=60)  # Holds each thread to one task, so all INFERENCE_THREADS get started
+        api_server.warm_up_face_mesh(api_server.get_thread_face_mesh())
+
+    try:
+        with api_server.startup.phase('warmup_inference_threads'):
+            for future in [inference_pool.submit(warm_up_thread) for _ in range(INFERENCE_THREADS)]:
+                future.result()
+    except Exception as e:
+        tracer.error('warmup_failed', exc=e)  # Not ready; the threads build their meshes on first use
+        return
+    api_server.warm_up()
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if api_server.WARMUP_ON_BOOT:
+                # Before startup completes, so the server only listens once warmed up
+                await asyncio.get_running_loop().run_in_executor(None, warm_up_inference_threads)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            inference_pool.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'http':
+        await handle_http(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        if scope['path'] == '/ws/detect':
+            await detect_drowsiness_stream(scope, receive, send)
+        else:
+            await send({'type': 'websocket.close', 'code': 1000})
+    elif scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))
@@ -0,0 +1,93 @@
+"""
+Benchmark: full JPEG decode + resize vs reduced-resolution (DCT-domain) decode
+
+Both paths produce the PROCESSING_SIZE frame that goes to the face mesh. Frames are
+deterministic synthetic webcam-like images (smooth lighting, a face-like blob, sensor
+noise) encoded at the frontend's JPEG quality.
+
+Usage: python benchmarks/bench_decode.py [--frames 50] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frames import PROCESSING_SIZE, decode_image_bytes, resize_for_processing  # noqa: E402
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+JPEG_QUALITY = 80  # canvas.toBlob / toDataURL quality used by the frontend
+
+
+def make_webcam_frame(width, height, rng):
+    """Webcam-like BGR frame: lit background, skin-toned face ellipse with eyes, noise"""
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    light = 90 + 80 * np.exp(-(((xs - width * 0.3) / width) ** 2 + ((ys - height * 0.2) / height) ** 2) * 3)
+    frame = np.stack([light * 0.8, light * 0.9, light], axis=-1)
+
+    center = (int(width * rng.uniform(0.4, 0.6)), int(height * rng.uniform(0.4, 0.6)))
+    axes = (int(width * 0.14), int(height * 0.26))
+    cv2.ellipse(frame, center, axes, 0, 0, 360, (120, 150, 200), -1)
+    for side in (-1, 1):
+        eye = (center[0] + side * axes[0] // 2, center[1] - axes[1] // 4)
+        cv2.ellipse(frame, eye, (axes[0] // 4, axes[1] // 10), 0, 0, 360, (40, 40, 40), -1)
+
+    frame += rng.normal(0, 6, frame.shape).astype(np.float32)
+    frame = cv2.GaussianBlur(frame, (3, 3), 0)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def make_jpegs(width, height, count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        cv2.imencode('.jpg', make_webcam_frame(width, height, rng), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes()
+        for _ in range(count)
+    ]
+
+
+def full_decode(jpeg):
+    img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    return cv2.resize(img, PROCESSING_SIZE), img.shape
+
+
+def reduced_decode(jpeg):
+    img, original_shape = decode_image_bytes(jpeg, PROCESSING_SIZE)
+    return resize_for_processing(img), original_shape
+
+
+def run(frames, repeat):
+    results = []
+    for width, height in RESOLUTIONS:
+        jpegs = make_jpegs(width, height, frames)
+        row = {'resolution': f'{width}x{height}'}
+        for name, fn in (('full', full_decode), ('reduced', reduced_decode)):
+            timings = timeit.repeat(lambda: [fn(jpeg) for jpeg in jpegs], number=1, repeat=repeat)
+            row[name] = min(timings) / frames * 1e3  # best-of-N, milliseconds per frame
+
+        # Same original_shape (face_box scaling) and near-identical pixels
+        full_img, full_shape = full_decode(jpegs[0])
+        reduced_img, reduced_shape = reduced_decode(jpegs[0])
+        assert full_shape == reduced_shape
+        row['mean_abs_diff'] = float(np.mean(np.abs(full_img.astype(np.int16) - reduced_img.astype(np.int16))))
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'resolution':>10} {'full ms':>8} {'reduced ms':>10} {'speedup':>8} {'pixel diff':>10}")
+    for row in run(args.frames, args.repeat):
+        print(f"{row['resolution']:>10} {row['full']:8.2f} {row['reduced']:10.2f} "
+              f"{row['full'] / row['reduced']:7.2f}x {row['mean_abs_diff']:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
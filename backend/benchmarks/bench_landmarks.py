@@ -0,0 +1,102 @@
+"""
+Microbenchmark: per-frame landmark post-processing (face box + both EARs)
+
+Compares the original list-comprehension / per-point np.linalg.norm code with the
+vectorized landmarks.py path on synthetic 468-point face meshes.
+
+Usage: python benchmarks/bench_landmarks.py [--frames 2000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landmarks import LEFT_EYE_IDX, RIGHT_EYE_IDX, landmarks_to_array, calc_face_box, eye_aspect_ratios  # noqa: E402
+
+WIDTH, HEIGHT = 320, 240
+NUM_LANDMARKS = 468
+
+
+class Landmark:
+    """Same attribute access as MediaPipe's NormalizedLandmark"""
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.z = 0.0
+
+
+def make_faces(count, seed=0):
+    """Deterministic synthetic landmark lists"""
+    rng = np.random.default_rng(seed)
+    faces = []
+    for _ in range(count):
+        points = 0.3 + 0.4 * rng.random((NUM_LANDMARKS, 2))
+        faces.append([Landmark(float(x), float(y)) for x, y in points])
+    return faces
+
+
+# Reference implementation - the per-frame code this replaced
+def reference_metrics(landmark_list, width, height):
+    def euclidean_distance(point1, point2):
+        return np.linalg.norm(np.array(point1) - np.array(point2))
+
+    def eye_aspect_ratio(indices):
+        points = [(int(landmark_list[idx].x * width), int(landmark_list[idx].y * height)) for idx in indices]
+        A = euclidean_distance(points[1], points[5])
+        B = euclidean_distance(points[2], points[4])
+        C = euclidean_distance(points[0], points[3])
+        if C == 0:
+            return 0.0
+        return (A + B) / (2.0 * C)
+
+    xs = [int(lm.x * width) for lm in landmark_list]
+    ys = [int(lm.y * height) for lm in landmark_list]
+    face_box = {
+        'left': max(min(xs), 0),
+        'top': max(min(ys), 0),
+        'right': min(max(xs), width),
+        'bottom': min(max(ys), height)
+    }
+    return face_box, eye_aspect_ratio(LEFT_EYE_IDX), eye_aspect_ratio(RIGHT_EYE_IDX)
+
+
+def vectorized_metrics(landmark_list, width, height):
+    points = landmarks_to_array(landmark_list)
+    left_ear, right_ear = eye_aspect_ratios(points, width, height)
+    return calc_face_box(points, width, height), left_ear, right_ear
+
+
+def run(frames, repeat):
+    faces = make_faces(frames)
+
+    # Same outputs, bit for bit
+    for face in faces:
+        assert reference_metrics(face, WIDTH, HEIGHT) == vectorized_metrics(face, WIDTH, HEIGHT)
+
+    results = {}
+    for name, fn in (('reference', reference_metrics), ('vectorized', vectorized_metrics)):
+        timings = timeit.repeat(lambda: [fn(face, WIDTH, HEIGHT) for face in faces], number=1, repeat=repeat)
+        results[name] = min(timings) / frames * 1e6  # best-of-N, microseconds per frame
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.frames, args.repeat)
+    for name, micros in results.items():
+        print(f"{name:>10}: {micros:8.1f} us/frame")
+    print(f"{'speedup':>10}: {results['reference'] / results['vectorized']:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""
+Benchmark suite: the detection pipeline stage by stage and end to end
+
+Frame sets are deterministic: synthetic webcam-like frames (same generator as
+bench_decode.py) and, with --recorded, real frames from a directory. Every set is
+produced at each resolution and JPEG quality. Benchmarks:
+
+    decode_image   base64 data URI -> processing-size BGR frame (frames.decode_image)
+    landmarks      MediaPipe landmark list -> (2, N) array (landmarks_to_array)
+    ear_face_box   face box + both EARs from the landmark array
+    request        full POST /detect_drowsiness through Flask's test client
+
+Every call is timed on its own; results are throughput plus latency percentiles,
+printed as a table and written as JSON with --output. With --baseline the run is
+compared against an earlier --output from the same host (pinned requirements,
+MediaPipe installed) and exits with status 1 if any p50 latency regressed by more
+than --tolerance.
+
+Usage: python benchmarks/bench_pipeline.py [--frames 30] [--output results.json]
+           [--baseline baseline.json] [--recorded frames_dir] [--only decode_image,request]
+"""
+import argparse
+import base64
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frames import PROCESSING_SIZE, decode_image  # noqa: E402
+from landmarks import landmarks_to_array, calc_face_box, eye_aspect_ratios  # noqa: E402
+from bench_decode import make_webcam_frame  # noqa: E402
+from bench_landmarks import make_faces  # noqa: E402
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+JPEG_QUALITIES = [60, 80, 95]
+BENCHMARKS = ('decode_image', 'landmarks', 'ear_face_box', 'request')
+PERCENTILES = (50, 95, 99)
+WARMUP_CALLS = 3  # Untimed calls per case (face mesh creation, caches)
+SEED = 0
+
+
+# ============================================================================
+# FRAME SETS
+# ============================================================================
+
+def synthetic_frames(count, seed=SEED):
+    """Deterministic full-HD source frames; every case resizes them to its resolution"""
+    rng = np.random.default_rng(seed)
+    return [make_webcam_frame(1920, 1080, rng) for _ in range(count)]
+
+
+def recorded_frames(directory, count):
+    """First count images of directory (sorted by name), decoded to BGR"""
+    paths = sorted(
+        path for pattern in ('*.jpg', '*.jpeg', '*.png')
+        for path in glob.glob(os.path.join(directory, pattern))
+    )[:count]
+    if not paths:
+        raise SystemExit(f'No .jpg/.jpeg/.png frames in {directory}')
+    return [cv2.imread(path, cv2.IMREAD_COLOR) for path in paths]
+
+
+def encode_frames(sources, width, height, quality):
+    """Resize and JPEG-encode source frames; returns raw JPEG bytes"""
+    return [
+        cv2.imencode('.jpg', cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA),
+                     [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+        for frame in sources
+    ]
+
+
+def frame_sets(frames, recorded=None):
+    """{'synthetic-640x480-q80': [jpeg bytes], ...} for every source x resolution x quality"""
+    sources = {'synthetic': synthetic_frames(frames)}
+    if recorded:
+        sources['recorded'] = recorded_frames(recorded, frames)
+    sets = {}
+    for source, images in sources.items():
+        for width, height in RESOLUTIONS:
+            for quality in JPEG_QUALITIES:
+                sets[f'{source}-{width}x{height}-q{quality}'] = encode_frames(images, width, height, quality)
+    return sets
+
+
+def data_uri(jpeg):
+    return 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii')
+
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+def time_calls(fn, inputs, repeat):
+    """Run fn over inputs repeat times after a short warm-up; per-call seconds"""
+    for item in inputs[:WARMUP_CALLS]:
+        fn(item)
+    latencies = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        for item in inputs:
+            start = clock()
+            fn(item)
+            latencies.append(clock() - start)
+    return latencies
+
+
+def summarize(name, case, latencies):
+    latencies = np.asarray(latencies)
+    return {
+        'benchmark': name,
+        'case': case,
+        'calls': int(latencies.size),
+        'throughput_per_s': round(float(latencies.size / latencies.sum()), 2),
+        'latency_ms': {
+            'mean': round(float(latencies.mean() * 1e3), 4),
+            **{f'p{p}': round(float(np.percentile(latencies, p) * 1e3), 4) for p in PERCENTILES}
+        }
+    }
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_decode_image(sets, repeat):
+    for case, jpegs in sets.items():
+        uris = [data_uri(jpeg) for jpeg in jpegs]
+        yield summarize('decode_image', case, time_calls(lambda uri: decode_image(uri, PROCESSING_SIZE), uris, repeat))
+
+
+def bench_landmarks(frames, repeat):
+    faces = make_faces(frames, SEED)
+    yield summarize('landmarks', 'synthetic-468', time_calls(landmarks_to_array, faces, repeat))
+
+
+def bench_ear_face_box(frames, repeat):
+    width, height = PROCESSING_SIZE
+    points = [landmarks_to_array(face) for face in make_faces(frames, SEED)]
+
+    def metrics(p):
+        calc_face_box(p, width, height)
+        eye_aspect_ratios(p, width, height)
+
+    yield summarize('ear_face_box', 'synthetic-468', time_calls(metrics, points, repeat))
+
+
+def bench_request(sets, repeat):
+    # Every repeat posts the same bytes: keep them out of the frame dedupe cache, and
+    # posts go back to back, faster than the per-session rate limit allows
+    os.environ.setdefault('FRAME_CACHE', 'false')
+    os.environ.setdefault('SESSION_RATE_LIMIT', '0')
+    import api_server  # Needs MediaPipe; only imported when this benchmark runs
+
+    client = api_server.app.test_client()
+    for case, jpegs in sets.items():
+        session_id = f'bench-{case}'
+
+        def post(jpeg):
+            response = client.post('/detect_drowsiness', data=jpeg, content_type='image/jpeg',
+                                   headers={'X-Session-ID': session_id})
+            if response.status_code != 200:
+                raise RuntimeError(f'{case}: HTTP {response.status_code} {response.get_data(as_text=True)}')
+
+        yield summarize('request', case, time_calls(post, jpegs, repeat))
+        api_server.sessions.discard(session_id)
+
+
+def run(frames, repeat, recorded=None, only=BENCHMARKS):
+    sets = frame_sets(frames, recorded) if {'decode_image', 'request'} & set(only) else {}
+    runners = {
+        'decode_image': lambda: bench_decode_image(sets, repeat),
+        'landmarks': lambda: bench_landmarks(frames, repeat),
+        'ear_face_box': lambda: bench_ear_face_box(frames, repeat),
+        'request': lambda: bench_request(sets, repeat)
+    }
+    results = []
+    for name in only:
+        for row in runners[name]():
+            results.append(row)
+            print_row(row)
+    return results
+
+
+def environment(args):
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'mediapipe': getattr(sys.modules.get('mediapipe'), '__version__', None),
+        'frames': args.frames,
+        'repeat': args.repeat,
+        'seed': SEED,
+        'recorded': args.recorded
+    }
+    if 'api_server' in sys.modules:
+        api_server = sys.modules['api_server']
+        env['server'] = {
+            'face_mesh_mode': api_server.FACE_MESH_MODE,
+            'reduced_decode': api_server.REDUCED_DECODE,
+            'roi_crop': api_server.ROI_CROP,
+            'frame_skip': api_server.FRAME_SKIP,
+            'inference_backend': api_server.INFERENCE_BACKEND
+        }
+    return env
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def print_row(row):
+    latency = row['latency_ms']
+    print(f"{row['benchmark']:>13} {row['case']:>26} {row['throughput_per_s']:10.1f}/s "
+          f"p50 {latency['p50']:9.3f} ms  p95 {latency['p95']:9.3f} ms  p99 {latency['p99']:9.3f} ms")
+
+
+def compare(results, baseline, tolerance):
+    """
+    (benchmark, case, baseline p50, current p50, ratio, regressed) for every case present
+    in both runs; regressed when current p50 > baseline p50 * (1 + tolerance)
+    """
+    previous = {(row['benchmark'], row['case']): row for row in baseline['results']}
+    rows = []
+    for row in results:
+        old = previous.get((row['benchmark'], row['case']))
+        if old is None:
+            continue
+        old_p50, new_p50 = old['latency_ms']['p50'], row['latency_ms']['p50']
+        ratio = new_p50 / old_p50 if old_p50 else float('inf')
+        rows.append((row['benchmark'], row['case'], old_p50, new_p50, ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=30, help='Frames per set')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over each set')
+    parser.add_argument('--recorded', help='Directory of recorded frames (.jpg/.png) to add as a frame set')
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help='Comma-separated benchmarks to run')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Results JSON from the same host to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed p50 slowdown vs baseline (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    only = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = set(only) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = run(args.frames, args.repeat, args.recorded, only)
+    report = {'environment': environment(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f'Wrote {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance)
+        base_env = baseline.get('environment', {})
+        print(f"\nBaseline {args.baseline}: {base_env.get('platform')}, {base_env.get('cpu_count')} CPUs, "
+              f"Python {base_env.get('python')}")
+        missing = [f"{row['benchmark']} {row['case']}" for row in results
+                   if (row['benchmark'], row['case']) not in {(r[0], r[1]) for r in rows}]
+        if missing:
+            print(f"{len(missing)} cases not in the baseline (not compared): {', '.join(missing)}")
+        print(f"\n{'benchmark':>13} {'case':>26} {'base p50':>10} {'p50':>10} {'ratio':>7}")
+        for name, case, old_p50, new_p50, ratio, regressed in rows:
+            print(f"{name:>13} {case:>26} {old_p50:10.3f} {new_p50:10.3f} {ratio:6.2f}x{'  REGRESSED' if regressed else ''}")
+        regressions = sum(row[-1] for row in rows)
+        print(f'{regressions} of {len(rows)} cases slower than baseline by more than {args.tolerance:.0%}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Change detection - decides when a frame is close enough to the session's last
+analyzed frame to reuse its landmarks instead of running the face mesh again
+
+Two tiny grayscale thumbnails are compared against the reference frame: the
+whole frame (head or camera motion, lighting) and the band around both eyes
+(eyelid movement, which barely changes the whole-frame thumbnail).
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from landmarks import LEFT_EYE_IDX, RIGHT_EYE_IDX
+
+FRAME_THUMBNAIL_SIZE = (32, 24)  # (width, height)
+EYE_THUMBNAIL_SIZE = (32, 12)
+EYE_REGION_PADDING = 0.2  # Pad the eye box by 20% of its width on each side
+
+_EYE_IDX = np.array(LEFT_EYE_IDX + RIGHT_EYE_IDX, dtype=np.intp)
+
+
+def eye_region(points):
+    """Normalized (left, top, right, bottom) box around both eyes of a (2, N) landmark array"""
+    eyes = points[:, _EYE_IDX]
+    (min_x, min_y), (max_x, max_y) = eyes.min(axis=1), eyes.max(axis=1)
+    pad = (max_x - min_x) * EYE_REGION_PADDING
+    return min_x - pad, min_y - pad, max_x + pad, max_y + pad
+
+
+def gray_thumbnail(img, size, region=None):
+    """
+    Area-averaged grayscale thumbnail of img (or of the normalized region of it) as int16,
+    or None if the region falls outside the frame
+    """
+    if region is not None:
+        frame_h, frame_w = img.shape[:2]
+        left, top, right, bottom = region
+        x0, y0 = max(int(left * frame_w), 0), max(int(top * frame_h), 0)
+        x1, y1 = min(int(right * frame_w), frame_w), min(int(bottom * frame_h), frame_h)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        img = img[y0:y1, x0:x1]
+    # Shrink first so the color conversion only touches a few hundred pixels
+    small = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+def mean_abs_diff(a, b):
+    return float(np.mean(np.abs(a - b)))
+
+
+class ChangeDetector:
+    """
+    Scene-change test plus frames analyzed / skipped counters.
+
+    snapshot() captures the reference for a frame that went through the mesh;
+    is_unchanged() checks a new frame against it using the reference landmarks.
+    """
+
+    def __init__(self, max_frame_diff=4.0, max_eye_diff=6.0):
+        self.max_frame_diff = max_frame_diff
+        self.max_eye_diff = max_eye_diff
+        self._lock = threading.Lock()
+        self.analyzed = 0
+        self.skipped = 0
+
+    def snapshot(self, frame, points):
+        """Reference thumbnails for an analyzed frame: (frame thumbnail, eye thumbnail or None)"""
+        return (
+            gray_thumbnail(frame, FRAME_THUMBNAIL_SIZE),
+            gray_thumbnail(frame, EYE_THUMBNAIL_SIZE, eye_region(points))
+        )
+
+    def is_unchanged(self, reference, frame, points):
+        """True if frame differs from the reference by less than both thresholds"""
+        frame_ref, eye_ref = reference
+        if eye_ref is None:
+            return False
+        if mean_abs_diff(gray_thumbnail(frame, FRAME_THUMBNAIL_SIZE), frame_ref) > self.max_frame_diff:
+            return False
+        eye_thumb = gray_thumbnail(frame, EYE_THUMBNAIL_SIZE, eye_region(points))
+        return eye_thumb is not None and mean_abs_diff(eye_thumb, eye_ref) <= self.max_eye_diff
+
+    def record(self, skipped):
+        with self._lock:
+            if skipped:
+                self.skipped += 1
+            else:
+                self.analyzed += 1
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            total = self.analyzed + self.skipped
+            return {
+                'frames_analyzed': self.analyzed,
+                'frames_skipped': self.skipped,
+                'skip_rate': round(self.skipped / total, 3) if total else 0.0,
+                'max_frame_diff': self.max_frame_diff,
+                'max_eye_diff': self.max_eye_diff
+            }
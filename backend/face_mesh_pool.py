@@ -0,0 +1,193 @@
+"""
+Per-session pool of tracking-mode FaceMesh instances
+
+A FaceMesh built with static_image_mode=False runs full face detection only
+until it finds a face, then tracks the landmarks from frame to frame, which
+is much cheaper. Tracking needs frames of one driver in order, so every
+session gets its own instance. Instances are heavy, so the pool is capped. When
+it is full, a new session takes over the least recently used instance only if
+that one has been unused for reclaim_seconds; otherwise the new session's frames
+go to the shared static-image mesh. Handing instances around among more active
+sessions than the cap would rebuild a FaceMesh on almost every frame.
+
+build_face_mesh() builds any of the detector's FaceMesh instances. It needs only
+MediaPipe, so inference worker processes can use it as their factory without
+importing the server.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def build_face_mesh(static_image_mode=True, max_num_faces=1):
+    """A MediaPipe FaceMesh with the detector's standard settings"""
+    import mediapipe as mp  # Here, so the pool itself is usable without MediaPipe
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=max_num_faces,
+        refine_landmarks=False,
+        min_detection_confidence=0.3,
+        min_tracking_confidence=0.3
+    )
+
+
+class _PooledMesh:
+    __slots__ = ('mesh', 'lock', 'last_used')
+
+    def __init__(self, mesh, now):
+        self.mesh = mesh
+        self.lock = threading.Lock()
+        self.last_used = now
+
+
+class FaceMeshPool:
+    """
+    Bounded session id -> FaceMesh map.
+
+    acquire() yields the session's instance while holding its lock, or None
+    when the pool is full of instances that are busy or were used within the
+    last reclaim_seconds - the caller should then fall back to the shared
+    static-image mesh.
+    """
+
+    def __init__(self, mesh_factory, max_instances=16, idle_seconds=120.0, reclaim_seconds=10.0,
+                 clock=time.monotonic):
+        if max_instances < 1:
+            raise ValueError('max_instances must be at least 1')
+        self._mesh_factory = mesh_factory
+        self.max_instances = max_instances
+        self.idle_seconds = idle_seconds
+        self.reclaim_seconds = reclaim_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # Ordered from least to most recently used
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _close(entry):
+        close = getattr(entry.mesh, 'close', None)
+        if close is not None:
+            close()
+
+    def _evict_one(self, now):
+        """
+        Remove the least recently used instance that is not in use and has been
+        unused for reclaim_seconds. Caller must hold self._lock. Returns the
+        removed entry (still locked) or None.
+        """
+        for session_id, entry in list(self._entries.items()):
+            if now - entry.last_used < self.reclaim_seconds:
+                break  # This one and every later one were used too recently
+            if entry.lock.acquire(blocking=False):
+                del self._entries[session_id]
+                self.evicted += 1
+                return entry
+        return None
+
+    def _entry(self, session_id):
+        """Returns (entry or None, evicted entry to close or None, whether entry is new)"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.last_used = now
+                self._entries.move_to_end(session_id)
+                return entry, None, False
+            to_close = None
+            if len(self._entries) >= self.max_instances:
+                to_close = self._evict_one(now)
+                if to_close is None:
+                    self.fallbacks += 1
+                    return None, None, False
+            entry = _PooledMesh(None, now)
+            entry.lock.acquire()  # Nobody may use it before the mesh is built
+            self._entries[session_id] = entry
+            self.created += 1
+        return entry, to_close, True
+
+    def _is_current(self, session_id, entry):
+        with self._lock:
+            return self._entries.get(session_id) is entry
+
+    @contextmanager
+    def acquire(self, session_id):
+        """Yield this session's tracking FaceMesh (locked for the caller), or None if the pool is full"""
+        while True:
+            entry, to_close, fresh = self._entry(session_id)
+            if to_close is not None:
+                try:
+                    self._close(to_close)
+                finally:
+                    to_close.lock.release()
+            if entry is None:
+                yield None
+                return
+            if fresh:
+                # We already hold its lock
+                try:
+                    entry.mesh = self._mesh_factory()
+                except Exception:
+                    with self._lock:
+                        if self._entries.get(session_id) is entry:
+                            del self._entries[session_id]
+                    entry.lock.release()
+                    raise
+                break
+            entry.lock.acquire()
+            if entry.mesh is not None and self._is_current(session_id, entry):
+                break
+            # Evicted (and closed) or failed to build while we waited - try again
+            entry.lock.release()
+        try:
+            yield entry.mesh
+        finally:
+            entry.lock.release()
+
+    def release(self, session_id):
+        """Close and drop a session's instance (e.g. when the session is evicted)"""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        with entry.lock:
+            if entry.mesh is not None:
+                self._close(entry)
+        return True
+
+    def sweep(self):
+        """Close instances idle for idle_seconds or longer; returns the number closed"""
+        now = self._clock()
+        idle = []
+        with self._lock:
+            for session_id, entry in list(self._entries.items()):
+                if now - entry.last_used < self.idle_seconds:
+                    break
+                if entry.lock.acquire(blocking=False):
+                    del self._entries[session_id]
+                    self.evicted += 1
+                    idle.append(entry)
+        for entry in idle:
+            try:
+                self._close(entry)
+            finally:
+                entry.lock.release()
+        return len(idle)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'active_instances': len(self._entries),
+                'max_instances': self.max_instances,
+                'reclaim_seconds': self.reclaim_seconds,
+                'created': self.created,
+                'evicted': self.evicted,
+                'fallbacks': self.fallbacks
+            }
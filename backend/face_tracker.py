@@ -0,0 +1,116 @@
+"""
+Face tracks - stable ids for several faces in one camera stream
+
+Each frame's face boxes are matched to the boxes the session's faces had last
+time, by overlap (intersection over union), greedily from the best-overlapping
+pair down. A matched face keeps its id and its own detection state, an unmatched
+box starts a new face, and a face that goes unmatched for more than max_missed
+frames is dropped together with its state. Every frame a face goes unmatched,
+on_missed(state) runs - the server passes ScoringEngine.no_face, so an unseen face
+is handled like a frame without a face in single-face mode. Boxes are normalized
+(left, top, right, bottom).
+"""
+import numpy as np
+
+MIN_IOU = 0.3  # Less overlap than this with the face's last box = a different face
+MAX_MISSED_FRAMES = 5  # Frames a face may go undetected before its state is dropped
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """(len(a), len(b)) intersection over union of two (N, 4) box arrays"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0.0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0.0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def match_boxes(previous, current, min_iou=MIN_IOU):
+    """
+    Greedy one-to-one matching: [(previous index, current index)] for the pairs with
+    the highest overlap first, ignoring pairs below min_iou
+    """
+    if not len(previous) or not len(current):
+        return []
+    overlap = iou_matrix(previous, current)
+    matches = []
+    used_previous, used_current = set(), set()
+    # Best pairs first; ties broken by index so the result doesn't depend on sort stability
+    for flat in np.argsort(-overlap, axis=None, kind='stable'):
+        i, j = divmod(int(flat), overlap.shape[1])
+        if overlap[i, j] < min_iou:
+            break
+        if i in used_previous or j in used_current:
+            continue
+        matches.append((i, j))
+        used_previous.add(i)
+        used_current.add(j)
+    return matches
+
+
+class _Track:
+    __slots__ = ('box', 'state', 'missed')
+
+    def __init__(self, box, state):
+        self.box = box
+        self.state = state
+        self.missed = 0
+
+
+class FaceTracks:
+    """Face id -> (last box, detection state) for one camera stream"""
+
+    def __init__(self, state_factory, min_iou=MIN_IOU, max_missed=MAX_MISSED_FRAMES, on_missed=None):
+        self._state_factory = state_factory
+        self._on_missed = on_missed
+        self.min_iou = min_iou
+        self.max_missed = max_missed
+        self.tracks = {}  # Face id -> _Track, in creation order
+        self.next_id = 0
+
+    def update(self, boxes):
+        """
+        Assign the boxes of one frame to faces. Returns ([(face id, state)] in the order
+        of boxes, [face ids dropped because they went unseen too long]).
+        """
+        ids = list(self.tracks)
+        matches = match_boxes([self.tracks[face_id].box for face_id in ids], boxes, self.min_iou)
+        assigned = [None] * len(boxes)
+        for i, j in matches:
+            assigned[j] = ids[i]
+
+        for j, box in enumerate(boxes):
+            if assigned[j] is None:
+                assigned[j] = self.next_id
+                self.tracks[self.next_id] = _Track(box, self._state_factory())
+                self.next_id += 1
+            else:
+                track = self.tracks[assigned[j]]
+                track.box = box
+                track.missed = 0
+
+        seen = set(assigned)
+        dropped = []
+        for face_id in ids:
+            if face_id not in seen:
+                track = self.tracks[face_id]
+                track.missed += 1
+                if self._on_missed is not None:
+                    self._on_missed(track.state)
+                if track.missed > self.max_missed:
+                    del self.tracks[face_id]
+                    dropped.append(face_id)
+        return [(face_id, self.tracks[face_id].state) for face_id in assigned], dropped
+
+    def reset(self):
+        """Forget every face; returns the ids dropped"""
+        dropped = list(self.tracks)
+        self.tracks.clear()
+        return dropped
+
+    def __len__(self):
+        return len(self.tracks)
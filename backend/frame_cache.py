@@ -0,0 +1,86 @@
+"""
+Frame dedupe cache - byte-identical uploads reuse the face mesh output
+
+Frozen webcams, throttled tabs and retries send the same JPEG bytes again. The
+raw bytes are hashed (BLAKE2b, much cheaper than a decode) and looked up per
+session; on a hit the cached landmarks go straight to the temporal scoring with
+the new timestamp, skipping decode and inference. Entries are scoped to their
+session (tracking-mode landmarks are per-driver) and dropped with it (discard, a
+registry eviction listener); the least recently used entry is dropped when the
+cache is full.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+DIGEST_SIZE = 16  # Bytes of BLAKE2b digest; collisions are not a practical concern at 128 bits
+
+# faces: list of (2, N) landmark arrays (empty = no face), brightness: mean gray
+# level of the processed frame (no-face frames only), original_shape: upload shape
+CachedFrame = namedtuple('CachedFrame', ['faces', 'brightness', 'original_shape'])
+
+
+def frame_key(session_id, image_bytes):
+    """Cache key of one upload: (session id, content digest)"""
+    return session_id, hashlib.blake2b(image_bytes, digest_size=DIGEST_SIZE).digest()
+
+
+class FrameCache:
+    """Bounded, thread-safe LRU map of frame_key -> CachedFrame"""
+
+    def __init__(self, max_entries=1024):
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # Ordered from least to most recently used
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.discarded = 0
+
+    def get(self, key):
+        """The cached frame for key (now most recently used), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, faces, brightness, original_shape):
+        for points in faces:
+            points.setflags(write=False)  # Shared by every hit from now on
+        with self._lock:
+            self._entries[key] = CachedFrame(faces, brightness, original_shape)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def discard(self, session_id):
+        """Drop every frame of a session (registry eviction listener)"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == session_id]
+            for key in keys:
+                del self._entries[key]
+            self.discarded += len(keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evicted': self.evicted,
+                'discarded': self.discarded
+            }
@@ -0,0 +1,105 @@
+"""
+Frame decoding - turns uploaded JPEG/PNG bytes into OpenCV images
+"""
+import base64
+
+import cv2
+import numpy as np
+
+# Frames are resized to this (width, height) before face mesh processing
+PROCESSING_SIZE = (320, 240)
+
+
+# DCT-domain downscaling: libjpeg decodes straight to 1/2, 1/4 or 1/8 size
+_REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2
+}
+
+# JPEG start-of-frame markers (SOF0-SOF15 minus DHT, JPG and DAC)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(image_bytes):
+    """Read (width, height) from a JPEG's SOF header without decoding; None if not a JPEG"""
+    data = memoryview(image_bytes)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:  # Standalone markers have no length
+            i += 2
+            continue
+        if marker in _SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return (width, height) if width and height else None
+        if marker == 0xDA:  # Start of scan - no SOF found before the image data
+            return None
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+def reduced_decode_factor(source_size, target_size):
+    """Largest 1/2, 1/4 or 1/8 reduction that still covers target_size, or 1"""
+    width, height = source_size
+    target_w, target_h = target_size
+    for factor in _REDUCED_DECODE_FLAGS:  # Largest first
+        # libjpeg rounds reduced dimensions up
+        if -(-width // factor) >= target_w and -(-height // factor) >= target_h:
+            return factor
+    return 1
+
+
+def decode_image_bytes(image_bytes, target_size=None):
+    """
+    Decode encoded image bytes (JPEG/PNG) straight from the request buffer.
+    Returns (img, original_shape). original_shape is always the full source size,
+    so coordinates computed on img scale back correctly.
+    
+    With target_size=(width, height), JPEGs are decoded at the smallest 1/2, 1/4 or
+    1/8 scale that still covers it (DCT-domain downscaling) instead of decoding every
+    pixel and throwing most of them away in the resize. Without it the full image is
+    decoded, e.g. for region-of-interest crops.
+    """
+    # np.frombuffer wraps the bytes without copying them
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    
+    source_size = jpeg_size(image_bytes) if target_size is not None else None
+    factor = reduced_decode_factor(source_size, target_size) if source_size else 1
+    if factor > 1:
+        img = cv2.imdecode(nparr, _REDUCED_DECODE_FLAGS[factor])
+        if img is not None:
+            width, height = source_size
+            if img.shape[:2] != (-(-height // factor), -(-width // factor)):
+                width, height = height, width  # EXIF orientation rotated the decoded image
+            return img, (height, width, img.shape[2])
+    
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError('Could not decode image')
+    return img, img.shape
+
+
+def resize_for_processing(img):
+    """Resize a decoded frame to PROCESSING_SIZE (no-op if it already is)"""
+    if (img.shape[1], img.shape[0]) == PROCESSING_SIZE:
+        return img
+    return cv2.resize(img, PROCESSING_SIZE)
+
+
+def decode_data_uri(base64_string):
+    """Extract the raw image bytes from a data:image/...;base64,... string"""
+    return base64.b64decode(base64_string.split(',')[1])
+
+
+def decode_image(base64_string, target_size=None):
+    """Decode base64 string to OpenCV image"""
+    return decode_image_bytes(decode_data_uri(base64_string), target_size)
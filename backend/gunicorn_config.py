@@ -1,5 +1,8 @@
 import multiprocessing
 import os
+import tempfile
+
+from metrics import clear_directory
 
 # Bind to the PORT environment variable (Render provides this)
 port = os.environ.get('PORT', '10000')
@@ -7,7 +10,12 @@ bind = f"0.0.0.0:{port}"
 
 # Worker configuration
 workers = 2
-worker_class = "sync"
+# Threaded workers: each open /ws/detect stream holds a thread, so a plain
+# sync worker would serve a single camera
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+# Async serving mode: gunicorn asgi_server:app -k uvicorn.workers.UvicornWorker -c gunicorn_config.py
+# (-k overrides worker_class; inference threads come from INFERENCE_THREADS instead of threads)
 worker_connections = 1000
 timeout = 120  # Increased timeout to 120 seconds for MediaPipe processing
 keepalive = 5
@@ -20,3 +28,28 @@ loglevel = "info"
 # Reload on code changes (disable in production)
 reload = False
 
+# Metrics: each worker writes its own file here and /metrics merges them, so a scrape
+# of any worker covers the whole server. Set in the master before workers fork.
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'drowsiness-metrics-{os.getpid()}'))
+
+# Session state: with several workers a client's frames land on any of them, so the
+# scoring state of every session lives in one memory-mapped table they all share
+os.environ.setdefault('STATE_BACKEND', 'shared')
+os.environ.setdefault('STATE_FILE', os.path.join(tempfile.gettempdir(), f'drowsiness-sessions-{os.getpid()}.bin'))
+
+
+def on_starting(server):
+    """Start every server run with empty metrics and no sessions"""
+    clear_directory(os.environ['METRICS_DIR'])
+    if os.path.exists(os.environ['STATE_FILE']):
+        os.remove(os.environ['STATE_FILE'])
+
+
+def post_worker_init(worker):
+    """
+    Build and warm up the face mesh before this worker accepts requests (the app has
+    just been imported; post_fork would run before that). WARMUP_ON_BOOT=false skips it.
+    """
+    import api_server
+    if api_server.WARMUP_ON_BOOT:
+        api_server.warm_up()
@@ -0,0 +1,289 @@
+"""
+Process-pool inference - FaceMesh in worker processes, frames passed through shared memory
+
+Each worker process holds its own FaceMesh, so inference scales past the GIL.
+Frames and landmarks never get pickled: the front process copies a frame into a
+slot of a shared-memory ring buffer and only sends the slot number through the
+worker's task pipe, the worker writes the landmarks back into the same slot.
+Temporal state stays in the front process - workers only turn pixels into landmarks.
+
+Every worker has its own pipes, so the front process knows which worker holds a
+slot. A worker that dies takes only its own pipes down: the front process fails
+its in-flight frames, frees their slots and starts a replacement.
+
+Slot layout (64-byte aligned):
+    [frame: max_frame_bytes of BGR uint8][landmarks: (max_faces, 2, MAX_LANDMARKS) float64]
+"""
+import multiprocessing
+import queue
+import threading
+from concurrent import futures
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+
+import cv2
+import numpy as np
+
+MAX_LANDMARKS = 478  # 468 face mesh points + 10 iris points with refine_landmarks
+_LANDMARKS_BYTES = 2 * MAX_LANDMARKS * 8
+_ALIGN = 64
+WORKER_CHECK_SECONDS = 0.5  # How often the front process looks for dead workers
+
+
+def _align(size):
+    return -(-size // _ALIGN) * _ALIGN
+
+
+class _Layout:
+    """Byte offsets of every slot in the ring buffer"""
+    __slots__ = ('slots', 'max_frame_bytes', 'max_faces', 'slot_bytes')
+
+    def __init__(self, slots, max_frame_bytes, max_faces=1):
+        self.slots = slots
+        self.max_frame_bytes = max_frame_bytes
+        self.max_faces = max_faces
+        self.slot_bytes = _align(max_frame_bytes) + max_faces * _LANDMARKS_BYTES
+
+    @property
+    def total_bytes(self):
+        return self.slots * self.slot_bytes
+
+    def frame(self, buf, slot, height, width):
+        return np.ndarray((height, width, 3), dtype=np.uint8, buffer=buf, offset=slot * self.slot_bytes)
+
+    def landmarks(self, buf, slot, face=0):
+        offset = slot * self.slot_bytes + _align(self.max_frame_bytes) + face * _LANDMARKS_BYTES
+        return np.ndarray((2, MAX_LANDMARKS), dtype=np.float64, buffer=buf, offset=offset)
+
+
+def _worker_main(shm_name, layout, tasks, results, mesh_factory):
+    """Worker process loop: (slot, height, width) in, (slot, landmark count per face or None, error) out"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frame = points = None
+    try:
+        mesh = mesh_factory()
+        while True:
+            try:
+                task = tasks.recv()
+            except EOFError:
+                break  # Front process gone
+            if task is None:
+                break
+            slot, height, width = task
+            try:
+                frame = layout.frame(shm.buf, slot, height, width)
+                output = mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                counts = []
+                for face, face_landmarks in enumerate((output.multi_face_landmarks or [])[:layout.max_faces]):
+                    landmark_list = face_landmarks.landmark
+                    count = min(len(landmark_list), MAX_LANDMARKS)
+                    points = layout.landmarks(shm.buf, slot, face)
+                    points[0, :count] = [lm.x for lm in landmark_list[:count]]
+                    points[1, :count] = [lm.y for lm in landmark_list[:count]]
+                    counts.append(count)
+                results.send((slot, counts, None))
+            except Exception as e:
+                results.send((slot, None, f'{type(e).__name__}: {e}'))
+            finally:
+                frame = points = None  # Views into shm.buf must be gone before close()
+    finally:
+        frame = points = None
+        shm.close()
+
+
+class _Worker:
+    """One worker process and the front process's ends of its pipes"""
+    __slots__ = ('index', 'process', 'tasks', 'results', 'send_lock', 'in_flight')
+
+    def __init__(self, index, process, tasks, results):
+        self.index = index
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.send_lock = threading.Lock()
+        self.in_flight = 0
+
+
+class InferenceWorkerPool:
+    """
+    N FaceMesh worker processes fed through a shared-memory ring buffer.
+
+    process(frame) blocks until a slot is free and the landmarks are back; it is
+    safe to call from many threads. mesh_factory must be picklable (a module-level
+    function or a partial of one) since workers are started with the spawn method;
+    each worker imports its module, so keep that module light. Up to max_faces
+    faces per frame are returned (process_faces). Dead workers are replaced.
+    """
+
+    def __init__(self, mesh_factory, processes, max_frame_bytes, slots_per_process=2, max_faces=1):
+        if processes < 1:
+            raise ValueError('processes must be at least 1')
+        self.processes = processes
+        self._layout = _Layout(processes * slots_per_process, max_frame_bytes, max_faces)
+        self._shm = shared_memory.SharedMemory(create=True, size=self._layout.total_bytes)
+        self._mesh_factory = mesh_factory
+        # spawn: workers don't inherit the front process's threads or MediaPipe graphs
+        self._context = multiprocessing.get_context('spawn')
+        self._free_slots = queue.Queue()
+        for slot in range(self._layout.slots):
+            self._free_slots.put(slot)
+        self._pending = [None] * self._layout.slots  # slot -> (Future, _Worker)
+        self._lock = threading.Lock()
+        self._closing = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+        self._workers = [self._start_worker(i) for i in range(processes)]
+        self._collector = threading.Thread(target=self._collect, name='inference-results', daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index):
+        task_reader, task_writer = self._context.Pipe(duplex=False)
+        result_reader, result_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self._shm.name, self._layout, task_reader, result_writer, self._mesh_factory),
+            name=f'inference-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        # Only the worker holds these ends now, so its death shows up as EOF
+        task_reader.close()
+        result_writer.close()
+        return _Worker(index, process, task_writer, result_reader)
+
+    def _collect(self):
+        """Front-process thread: copy landmarks out of finished slots and free them, replace dead workers"""
+        while not self._closing:
+            with self._lock:
+                readers = {worker.results: worker for worker in self._workers}
+            for reader in connection.wait(list(readers), timeout=WORKER_CHECK_SECONDS):
+                try:
+                    slot, counts, error = reader.recv()
+                except (EOFError, OSError):
+                    continue  # Worker died; handled below
+                self._finish(slot, counts, error)
+            self._check_workers()
+
+    def _check_workers(self):
+        """Fail the frames of workers that died, free their slots and start replacements"""
+        for index, worker in enumerate(list(self._workers)):
+            if worker.process.is_alive() or self._closing:
+                continue
+            try:
+                while worker.results.poll():  # Results it sent before dying still count
+                    self._finish(*worker.results.recv())
+            except (EOFError, OSError):
+                pass
+            replacement = self._start_worker(index)
+            with self._lock:
+                self._workers[index] = replacement
+                self.restarts += 1
+            error = f'worker {index} exited with code {worker.process.exitcode}'
+            for slot, pending in enumerate(list(self._pending)):
+                if pending is not None and pending[1] is worker:
+                    self._finish(slot, None, error)
+            worker.tasks.close()
+            worker.results.close()
+
+    def _finish(self, slot, counts, error):
+        """Resolve the future waiting on a slot and free the slot"""
+        with self._lock:
+            pending = self._pending[slot]
+            self._pending[slot] = None
+            if pending is None:
+                return
+            future, worker = pending
+            worker.in_flight -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if error is not None:
+            future.set_exception(RuntimeError(f'Inference worker failed: {error}'))
+        else:
+            future.set_result([self._layout.landmarks(self._shm.buf, slot, face)[:, :count].copy()
+                               for face, count in enumerate(counts)])
+        self._free_slots.put(slot)
+
+    def submit(self, frame, timeout=None):
+        """
+        Queue a BGR uint8 frame; the Future resolves to a list of (2, N) landmark arrays,
+        one per face. Raises TimeoutError if no slot frees up within timeout seconds.
+        """
+        if frame.dtype != np.uint8 or frame.ndim != 3 or frame.shape[2] != 3:
+            raise ValueError('Expected a BGR uint8 frame')
+        if frame.nbytes > self._layout.max_frame_bytes:
+            raise ValueError(f'Frame of {frame.nbytes} bytes exceeds the {self._layout.max_frame_bytes} byte slot')
+        height, width = frame.shape[:2]
+        try:
+            slot = self._free_slots.get(timeout=timeout)  # Backpressure: wait for a free slot
+        except queue.Empty:
+            raise TimeoutError(f'No free inference slot within {timeout}s') from None
+        future = Future()
+        self._layout.frame(self._shm.buf, slot, height, width)[...] = frame
+        with self._lock:
+            worker = min(self._workers, key=lambda w: w.in_flight)  # Least busy worker
+            worker.in_flight += 1
+            self._pending[slot] = (future, worker)
+            self.submitted += 1
+        try:
+            with worker.send_lock:
+                worker.tasks.send((slot, height, width))
+        except OSError:
+            pass  # Worker just died: the collector fails the frame and frees the slot
+        return future
+
+    def process(self, frame, timeout=None):
+        """Run face mesh on frame in a worker; returns the first face's (2, N) landmarks or None"""
+        faces = self.process_faces(frame, timeout)
+        return faces[0] if faces else None
+
+    def process_faces(self, frame, timeout=None):
+        """
+        Run face mesh on frame in a worker; returns a list of (2, N) landmark arrays, one per face.
+        timeout bounds both the wait for a free slot and the wait for the result.
+        """
+        if not any(worker.process.is_alive() for worker in self._workers):
+            raise RuntimeError('No inference worker process is running')
+        future = self.submit(frame, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except futures.TimeoutError:
+            # The slot is freed whenever the worker answers or is found dead
+            raise TimeoutError(f'No inference result within {timeout}s') from None
+
+    def close(self):
+        self._closing = True
+        self._collector.join(timeout=5)
+        for worker in self._workers:
+            try:
+                with worker.send_lock:
+                    worker.tasks.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.tasks.close()
+            worker.results.close()
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'alive': sum(worker.process.is_alive() for worker in self._workers),
+                'pids': [worker.process.pid for worker in self._workers],
+                'restarts': self.restarts,
+                'slots': self._layout.slots,
+                'free_slots': self._free_slots.qsize(),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed
+            }
@@ -0,0 +1,93 @@
+"""
+Landmark geometry - face box and Eye Aspect Ratio from MediaPipe face mesh landmarks
+
+The landmark list is converted to one contiguous NumPy array per frame and every
+metric is computed with vectorized gathers over precomputed index arrays.
+"""
+import math
+
+import numpy as np
+
+# Landmark indices for MediaPipe face mesh
+LEFT_EYE_IDX = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE_IDX = [362, 385, 387, 263, 373, 380]
+EYE_LANDMARK_COUNT = max(LEFT_EYE_IDX + RIGHT_EYE_IDX) + 1  # Shortest landmark array that holds both eyes
+FACE_BOX_KEYS = ('left', 'top', 'right', 'bottom')
+
+# Gather indices for EAR = (|p1-p5| + |p2-p4|) / (2 * |p0-p3|), both eyes at once:
+# column k of EAR_FROM_IDX/EAR_TO_IDX is the k-th distance (A, B, C), row 0/1 is left/right eye
+EAR_FROM_IDX = np.array([[eye[1], eye[2], eye[0]] for eye in (LEFT_EYE_IDX, RIGHT_EYE_IDX)], dtype=np.intp)
+EAR_TO_IDX = np.array([[eye[5], eye[4], eye[3]] for eye in (LEFT_EYE_IDX, RIGHT_EYE_IDX)], dtype=np.intp)
+
+
+def landmarks_to_array(landmark_list):
+    """
+    Copy normalized MediaPipe landmarks into one contiguous (2, N) float64 array:
+    row 0 = x, row 1 = y
+    """
+    points = np.empty((2, len(landmark_list)), dtype=np.float64)
+    # One attribute pass per axis; cheaper than building a tuple per landmark
+    points[0] = [lm.x for lm in landmark_list]
+    points[1] = [lm.y for lm in landmark_list]
+    return points
+
+
+def eye_points_to_array(left_eye, right_eye):
+    """
+    Scatter the 6 (x, y) points of each eye, in LEFT_EYE_IDX / RIGHT_EYE_IDX order, into a
+    (2, EYE_LANDMARK_COUNT) landmark array (NaN elsewhere) for the same EAR code as full meshes
+    """
+    points = np.full((2, EYE_LANDMARK_COUNT), np.nan)
+    points[:, LEFT_EYE_IDX] = np.asarray(left_eye, dtype=np.float64).T
+    points[:, RIGHT_EYE_IDX] = np.asarray(right_eye, dtype=np.float64).T
+    return points
+
+
+def calc_face_box(points, width, height):
+    """Bounding box of all landmarks in pixel coordinates, clamped to the frame"""
+    # int() truncation is monotonic, so min/max can be taken on the normalized values
+    min_x, min_y = points.min(axis=1)
+    max_x, max_y = points.max(axis=1)
+    return {
+        'left': max(int(min_x * width), 0),
+        'top': max(int(min_y * height), 0),
+        'right': min(int(max_x * width), width),
+        'bottom': min(int(max_y * height), height)
+    }
+
+
+def parse_face_box(value):
+    """
+    Validate a client-sent face box {left, top, right, bottom} in pixels; returns it
+    with int values, raising ValueError unless every side is a finite number (not a
+    bool or string) and 0 <= left <= right, 0 <= top <= bottom
+    """
+    if not isinstance(value, dict) or not all(key in value for key in FACE_BOX_KEYS):
+        raise ValueError('face_box must have numeric left, top, right and bottom')
+    box = {}
+    for key in FACE_BOX_KEYS:
+        side = value[key]
+        if (isinstance(side, bool) or not isinstance(side, (int, float))
+                or (isinstance(side, float) and not math.isfinite(side))):
+            raise ValueError('face_box must have numeric left, top, right and bottom')
+        box[key] = int(side)
+    if not (0 <= box['left'] <= box['right'] and 0 <= box['top'] <= box['bottom']):
+        raise ValueError('face_box must satisfy 0 <= left <= right and 0 <= top <= bottom')
+    return box
+
+
+def eye_aspect_ratios(points, width, height):
+    """Return (left_ear, right_ear) for a (2, N) landmark array"""
+    scale = np.array((width, height), dtype=np.float64).reshape(2, 1, 1)
+    # Pixel coordinates truncated like int(), as float for the distance math
+    src = np.trunc(points[:, EAR_FROM_IDX] * scale)  # (2 axes, 2 eyes, 3 distances)
+    dst = np.trunc(points[:, EAR_TO_IDX] * scale)
+    diff = src - dst
+    distances = np.sqrt(diff[0] * diff[0] + diff[1] * diff[1])  # (2 eyes, 3): A, B, C
+    vertical = distances[:, 0] + distances[:, 1]
+    horizontal = 2.0 * distances[:, 2]
+    if horizontal.all():
+        left_ear, right_ear = vertical / horizontal
+        return left_ear, right_ear
+    left_ear, right_ear = np.divide(vertical, horizontal, out=np.zeros(2), where=horizontal != 0)
+    return left_ear, right_ear
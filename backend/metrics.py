@@ -0,0 +1,255 @@
+"""
+Latency and throughput metrics in Prometheus text format
+
+Each process keeps its numbers in one fixed-layout float64 array: per-stage
+histogram buckets, sum and count, then counters, then gauges. With a metrics
+directory the array is a memory-mapped file named after the pid, so every
+gunicorn worker writes only its own file and a scrape of any worker merges all
+of them. Counters and histograms of workers that have exited are kept (they
+stay monotonic across restarts); gauges only count live workers, summed, or
+for shared gauges (a value every worker reads from the same shared state) the
+largest one. Without a directory the array is anonymous memory and only this
+process is reported.
+"""
+import bisect
+import glob
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+
+# Processing stages timed per frame
+STAGES = (
+    'base64_decode', 'imdecode', 'resize', 'color_convert', 'face_mesh',
+    'change_detect', 'scoring', 'frame_total', 'admission_wait'
+)
+# Histogram bucket upper bounds, in seconds (+Inf is implicit)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# key -> (metric name, labels, help)
+COUNTERS = {
+    'frames_face': ('drowsiness_frames_total', {'face': 'true'}, 'Frames analyzed'),
+    'frames_no_face': ('drowsiness_frames_total', {'face': 'false'}, 'Frames analyzed'),
+    'frames_skipped': ('drowsiness_frames_skipped_total', {}, 'Frames that reused earlier landmarks'),
+    'frame_cache_hits': ('drowsiness_frame_cache_total', {'result': 'hit'}, 'Frame dedupe cache lookups'),
+    'frame_cache_misses': ('drowsiness_frame_cache_total', {'result': 'miss'}, 'Frame dedupe cache lookups'),
+    'alerts': ('drowsiness_alerts_total', {}, 'Drowsiness alerts fired'),
+    'rejected_rate_limited': ('drowsiness_rejected_total', {'reason': 'rate_limited'}, 'Frames turned away by admission control'),
+    'rejected_queue_full': ('drowsiness_rejected_total', {'reason': 'queue_full'}, 'Frames turned away by admission control'),
+    'rejected_shed': ('drowsiness_rejected_total', {'reason': 'shed'}, 'Frames turned away by admission control'),
+    'rejected_timeout': ('drowsiness_rejected_total', {'reason': 'timeout'}, 'Frames turned away by admission control'),
+    'errors': ('drowsiness_request_errors_total', {}, 'Requests or stream messages that failed')
+}
+GAUGES = {
+    'active_sessions': ('drowsiness_active_sessions', {}, 'Live detection sessions')
+}
+
+STAGE_METRIC = 'drowsiness_stage_duration_seconds'
+_FILE_PATTERN = 'metrics_*.bin'
+
+
+def estimate_quantile(q, bucket_counts, bounds=BUCKETS):
+    """
+    Quantile from cumulative-free bucket counts (last entry = +Inf bucket), linearly
+    interpolated inside the bucket like Prometheus' histogram_quantile. None if empty.
+    """
+    total = sum(bucket_counts)
+    if total == 0:
+        return None
+    rank = q * total
+    cumulative = 0.0
+    for i, count in enumerate(bucket_counts):
+        if count and cumulative + count >= rank:
+            if i >= len(bounds):
+                return bounds[-1]  # +Inf bucket: the best we can say is "above the last bound"
+            lower = bounds[i - 1] if i > 0 else 0.0
+            return lower + (bounds[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Timer:
+    __slots__ = ('_metrics', '_stage', '_start')
+
+    def __init__(self, metrics, stage):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._stage, time.perf_counter() - self._start)
+        return False
+
+
+class Metrics:
+    """Per-process metric store; see the module docstring for the cross-process layout"""
+
+    def __init__(self, directory=None, shared_gauges=()):
+        self.directory = directory
+        self.shared_gauges = frozenset(shared_gauges)  # Merged with max instead of summed
+        self._stage_index = {stage: i for i, stage in enumerate(STAGES)}
+        self._stage_width = len(BUCKETS) + 3  # buckets incl. +Inf, sum, count
+        self._counter_offset = len(STAGES) * self._stage_width
+        self._counter_index = {key: self._counter_offset + i for i, key in enumerate(COUNTERS)}
+        self._gauge_offset = self._counter_offset + len(COUNTERS)
+        self._gauge_index = {key: self._gauge_offset + i for i, key in enumerate(GAUGES)}
+        self._size = self._gauge_offset + len(GAUGES)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._values = None
+
+    # ---- writer side (this process) ------------------------------------------
+
+    def _array(self):
+        """This process's value array, (re)opened after a fork"""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    nbytes = self._size * 8
+                    if self.directory:
+                        os.makedirs(self.directory, exist_ok=True)
+                        path = os.path.join(self.directory, f'metrics_{pid}.bin')
+                        with open(path, 'wb+') as f:
+                            f.truncate(nbytes)
+                            buffer = mmap.mmap(f.fileno(), nbytes)
+                    else:
+                        buffer = mmap.mmap(-1, nbytes)
+                    self._values = np.ndarray((self._size,), dtype=np.float64, buffer=buffer)
+                    self._pid = pid
+        return self._values
+
+    def observe(self, stage, seconds):
+        values = self._array()
+        base = self._stage_index[stage] * self._stage_width
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            values[base + bucket] += 1
+            values[base + len(BUCKETS) + 1] += seconds
+            values[base + len(BUCKETS) + 2] += 1
+
+    def timed(self, stage):
+        """with metrics.timed('imdecode'): ... - records the block's duration"""
+        return _Timer(self, stage)
+
+    def inc(self, counter, amount=1):
+        values = self._array()
+        with self._lock:
+            values[self._counter_index[counter]] += amount
+
+    def set_gauge(self, gauge, value):
+        self._array()[self._gauge_index[gauge]] = value
+
+    # ---- reader side (any process) -------------------------------------------
+
+    def _load_all(self):
+        """[(pid, values)] for every process that has written metrics"""
+        own = self._array().copy()
+        if not self.directory:
+            return [(self._pid, own)]
+        loaded = [(self._pid, own)]
+        for path in glob.glob(os.path.join(self.directory, _FILE_PATTERN)):
+            try:
+                pid = int(os.path.basename(path)[len('metrics_'):-len('.bin')])
+            except ValueError:
+                continue
+            if pid == self._pid:
+                continue
+            values = np.fromfile(path, dtype=np.float64)
+            if values.shape == (self._size,):
+                loaded.append((pid, values))
+        return loaded
+
+    def collect(self):
+        """Merged snapshot: {'stages': {stage: (bucket_counts, sum, count)}, 'counters': {...}, 'gauges': {...}, 'processes': n}"""
+        loaded = self._load_all()
+        total = np.sum([values for _, values in loaded], axis=0)
+        live = [values for pid, values in loaded if pid == self._pid or _pid_alive(pid)]
+
+        stages = {}
+        for stage, i in self._stage_index.items():
+            base = i * self._stage_width
+            block = total[base:base + self._stage_width]
+            stages[stage] = (block[:len(BUCKETS) + 1].tolist(), float(block[-2]), int(block[-1]))
+        return {
+            'stages': stages,
+            'counters': {key: int(total[index]) for key, index in self._counter_index.items()},
+            'gauges': {key: float((max if key in self.shared_gauges else sum)(values[index] for values in live))
+                       for key, index in self._gauge_index.items()},
+            'processes': len(live)
+        }
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        snapshot = self.collect()
+        lines = [
+            f'# HELP {STAGE_METRIC} Time spent in each frame processing stage',
+            f'# TYPE {STAGE_METRIC} histogram'
+        ]
+        for stage, (buckets, total_seconds, count) in snapshot['stages'].items():
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += bucket_count
+                le = bound if isinstance(bound, str) else repr(bound)
+                lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="{le}"}} {_number(cumulative)}')
+            lines.append(f'{STAGE_METRIC}_sum{{stage="{stage}"}} {repr(total_seconds)}')
+            lines.append(f'{STAGE_METRIC}_count{{stage="{stage}"}} {count}')
+
+        lines += [
+            f'# HELP {STAGE_METRIC}_quantile Stage latency quantiles estimated from the histogram buckets',
+            f'# TYPE {STAGE_METRIC}_quantile gauge'
+        ]
+        for stage, (buckets, _, _) in snapshot['stages'].items():
+            for q in QUANTILES:
+                value = estimate_quantile(q, buckets)
+                lines.append(f'{STAGE_METRIC}_quantile{{stage="{stage}",quantile="{q}"}} '
+                             f'{"NaN" if value is None else repr(value)}')
+
+        for kind, definitions, values in (('counter', COUNTERS, snapshot['counters']),
+                                          ('gauge', GAUGES, snapshot['gauges'])):
+            seen = set()
+            for key, (name, labels, help_text) in definitions.items():
+                if name not in seen:
+                    seen.add(name)
+                    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                lines.append(f'{name}{_labels(labels)} {_number(values[key])}')
+
+        lines += [
+            '# HELP drowsiness_metrics_processes Live processes whose metrics are merged here',
+            '# TYPE drowsiness_metrics_processes gauge',
+            f'drowsiness_metrics_processes {snapshot["processes"]}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def clear_directory(directory):
+    """Remove metric files left by a previous server run (call from the gunicorn master)"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, _FILE_PATTERN)):
+        os.remove(path)
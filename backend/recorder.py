@@ -0,0 +1,211 @@
+"""
+Session recording - what a session saw, frame by frame, in a memory-mapped file
+
+One file per session (and per process, since each process has its own state for
+it). The file is a 256-byte header followed by fixed-size records, so a recording
+opens as a NumPy structured array without parsing:
+
+    header:  magic, version, record size, landmark capacity, record count, created, session id
+    record:  t, raw_ear, ear, score (float64), frame width/height (uint16), flags (uint8),
+             landmark count (uint16), landmarks (2, MAX_LANDMARKS) float32
+
+raw_ear is kept at full precision so replays drive the scoring functions with
+exactly the values the live session used; ear and score are the emitted
+(rounded) results. Landmarks are float32 - plenty for normalized coordinates and
+half the size.
+
+The file grows in blocks and the header's record count is updated after each
+record is written, so a reader (or a crash) only ever sees complete records.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from inference_workers import MAX_LANDMARKS
+
+MAGIC = b'DRWSREC1'
+VERSION = 1
+HEADER_BYTES = 256
+GROW_RECORDS = 512  # File grows by this many records at a time
+FILE_SUFFIX = '.rec'
+FACE_SEPARATOR = '#'  # Multi-face sessions record each face as '<session id>#<face id>'
+
+# Record flags
+FACE = 1
+SKIPPED = 2
+DROWSY = 4
+BLINK = 8
+GRACE = 16
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4'), ('max_landmarks', '<u4'),
+    ('count', '<u8'), ('created', '<f8'), ('session_id', 'S128')
+])
+RECORD_DTYPE = np.dtype([
+    ('t', '<f8'), ('raw_ear', '<f8'), ('ear', '<f8'), ('score', '<f8'),
+    ('width', '<u2'), ('height', '<u2'), ('flags', 'u1'), ('n_points', '<u2'),
+    ('points', '<f4', (2, MAX_LANDMARKS))
+])
+
+
+def face_recording_id(session_id, face_id):
+    """Recording id of one face of a multi-face session"""
+    return f'{session_id}{FACE_SEPARATOR}{face_id}'
+
+
+def recording_filename(session_id):
+    """Filesystem-safe, unique name for a new recording of session_id"""
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', session_id)[:48]
+    digest = zlib.crc32(session_id.encode('utf-8'))
+    return f'{safe}-{digest:08x}-{os.getpid()}-{int(time.time() * 1000)}{FILE_SUFFIX}'
+
+
+class Recording:
+    """Append-only writer for one session's recording file"""
+
+    def __init__(self, path, session_id):
+        self.path = path
+        self.session_id = session_id
+        self.count = 0
+        self._capacity = 0
+        self._file = open(path, 'w+b')
+        self._lock = threading.Lock()
+        self._header = None
+        self._records = None
+        self._grow()
+        header = self._header
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['record_size'] = RECORD_DTYPE.itemsize
+        header['max_landmarks'] = MAX_LANDMARKS
+        header['created'] = time.time()
+        header['session_id'] = session_id.encode('utf-8')[:HEADER_DTYPE['session_id'].itemsize]
+
+    def _grow(self):
+        self._capacity += GROW_RECORDS
+        self._header = self._records = None  # Drop the old maps before resizing
+        self._file.truncate(HEADER_BYTES + self._capacity * RECORD_DTYPE.itemsize)
+        self._header = np.memmap(self._file, dtype=HEADER_DTYPE, mode='r+', shape=())
+        self._records = np.memmap(self._file, dtype=RECORD_DTYPE, mode='r+', offset=HEADER_BYTES,
+                                  shape=(self._capacity,))
+
+    def append(self, t, points, raw_ear, original_shape, result):
+        """Write one frame: landmarks actually scored (None if no face) and the emitted result"""
+        with self._lock:
+            if not self._file.closed:
+                self._append(t, points, raw_ear, original_shape, result)
+
+    def _append(self, t, points, raw_ear, original_shape, result):
+        if self.count == self._capacity:
+            self._grow()
+        record = self._records[self.count]
+        flags = 0
+        if points is not None:
+            flags |= FACE
+            n_points = min(points.shape[1], MAX_LANDMARKS)
+            record['points'][:, :n_points] = points[:, :n_points]
+            record['n_points'] = n_points
+        else:
+            record['n_points'] = 0
+        for flag, key in ((SKIPPED, 'frame_skipped'), (DROWSY, 'is_drowsy'), (BLINK, 'is_blink'),
+                          (GRACE, 'in_grace_period')):
+            if result.get(key):
+                flags |= flag
+        record['flags'] = flags
+        record['t'] = t
+        record['raw_ear'] = raw_ear if raw_ear is not None else np.nan
+        record['ear'] = result.get('ear', np.nan)
+        record['score'] = result['drowsy_score']
+        record['height'], record['width'] = original_shape[:2]
+        self.count += 1
+        self._header['count'] = self.count  # Publish the record
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._records.flush()
+            self._header = self._records = None
+            self._file.truncate(HEADER_BYTES + self.count * RECORD_DTYPE.itemsize)
+            self._file.close()
+
+
+def read_recording(path):
+    """
+    (header dict, records) of a recording file. records is a read-only memory-mapped
+    structured array of the complete records (RECORD_DTYPE fields).
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if header.size == 0 or header['magic'][0] != MAGIC:
+        raise ValueError(f'Not a session recording: {path}')
+    header = header[0]
+    if header['version'] != VERSION or header['record_size'] != RECORD_DTYPE.itemsize:
+        raise ValueError(f'Unsupported recording version {header["version"]}: {path}')
+    count = int(header['count'])
+    records = (np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_BYTES, shape=(count,))
+               if count else np.empty(0, dtype=RECORD_DTYPE))
+    info = {
+        'session_id': header['session_id'].decode('utf-8', 'replace'),
+        'created': float(header['created']),
+        'count': count
+    }
+    return info, records
+
+
+class SessionRecorder:
+    """
+    (Session id, face id) -> open Recording. A session's files are closed when the
+    session is evicted; a returning session starts a new file (its detection state
+    started over too). Single-face sessions use face id None.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._recordings = {}
+        self._lock = threading.Lock()
+        self.frames_recorded = 0
+        self.files_created = 0
+
+    def record(self, session_id, t, points, raw_ear, original_shape, result, face_id=None):
+        """Append one frame; face_id separates the faces of a multi-face session"""
+        key = (session_id, face_id)
+        with self._lock:
+            recording = self._recordings.get(key)
+            if recording is None:
+                recording_id = session_id if face_id is None else face_recording_id(session_id, face_id)
+                path = os.path.join(self.directory, recording_filename(recording_id))
+                recording = self._recordings[key] = Recording(path, recording_id)
+                self.files_created += 1
+            self.frames_recorded += 1
+        recording.append(t, points, raw_ear, original_shape, result)
+
+    def close_session(self, session_id, face_id=None):
+        """Close a recording; without face_id, the session's and all of its faces'"""
+        with self._lock:
+            keys = [key for key in self._recordings
+                    if key[0] == session_id and (face_id is None or key[1] == face_id)]
+            recordings = [self._recordings.pop(key) for key in keys]
+        for recording in recordings:
+            recording.close()
+
+    def close(self):
+        with self._lock:
+            recordings = list(self._recordings.values())
+            self._recordings.clear()
+        for recording in recordings:
+            recording.close()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'open_recordings': len(self._recordings),
+                'files_created': self.files_created,
+                'frames_recorded': self.frames_recorded
+            }
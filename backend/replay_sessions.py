@@ -0,0 +1,159 @@
+"""
+Replay recorded sessions through the scoring engine - no images, no face mesh
+
+The recordings (see recorder.py) are turned into (timestamp, raw EAR) arrays and
+scored in bulk with scoring.score_batch(), many sessions at once, then compared
+with what the live sessions emitted. Scoring parameters can be overridden to see
+what a threshold change would have done:
+
+    python replay_sessions.py recordings/ --set score_threshold=40 --set ear_threshold=0.22
+
+By default the recorded full-precision raw EAR is replayed (bit-exact with the
+live run); --from-landmarks recomputes it from the stored landmarks instead, for
+changes to the EAR geometry.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from frames import PROCESSING_SIZE
+from landmarks import eye_aspect_ratios
+from recorder import DROWSY, FACE, FILE_SUFFIX, read_recording
+from scoring import ScoringParams, score_batch
+
+BATCH_SESSIONS = 512  # Sessions scored together (rows of one score_batch call)
+
+
+def parse_override(text):
+    """'name=value' -> (name, float value)"""
+    name, sep, value = text.partition('=')
+    if not sep or not name.isidentifier():
+        raise argparse.ArgumentTypeError(f'Expected name=value, got {text!r}')
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{name}: {value!r} is not a number') from None
+
+
+def find_recordings(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, f'*{FILE_SUFFIX}'))))
+        else:
+            files.append(path)
+    return files
+
+
+def alert_onsets(drowsy):
+    """Number of runs of drowsy frames"""
+    drowsy = np.asarray(drowsy, dtype=bool)
+    if not drowsy.size:
+        return 0
+    return int(drowsy[0]) + int(np.count_nonzero(drowsy[1:] & ~drowsy[:-1]))
+
+
+def recorded_ears(records, from_landmarks):
+    """Raw EAR per record (NaN without a face), as recorded or recomputed from the landmarks"""
+    if not from_landmarks:
+        return np.array(records['raw_ear'], dtype=np.float64)
+    width, height = PROCESSING_SIZE
+    ears = np.full(len(records), np.nan)
+    for i, (flags, n_points, points) in enumerate(zip(records['flags'], records['n_points'], records['points'])):
+        if flags & FACE:
+            left_ear, right_ear = eye_aspect_ratios(points[:, :n_points].astype(np.float64), width, height)
+            ears[i] = (left_ear + right_ear) / 2.0
+    return ears
+
+
+def replay(paths, overrides=None, from_landmarks=False):
+    """Replay a group of recordings in one batch; returns one comparison per recording"""
+    params = ScoringParams(**(overrides or {}))
+    loaded = [(path,) + read_recording(path) for path in paths]
+    frames = max((info['count'] for _, info, _ in loaded), default=0)
+
+    timestamps = np.full((len(loaded), frames), np.nan)  # NaN = padding after a shorter session
+    ears = np.full((len(loaded), frames), np.nan)
+    for row, (_, info, records) in enumerate(loaded):
+        timestamps[row, :info['count']] = records['t']
+        ears[row, :info['count']] = recorded_ears(records, from_landmarks)
+    scores, alerts, _ = score_batch(timestamps, ears, params)
+
+    results = []
+    for row, (path, info, records) in enumerate(loaded):
+        count = info['count']
+        replayed = alerts[row, :count]
+        recorded = (records['flags'] & DROWSY).astype(bool)
+        # Emitted scores are rounded with round(); compare the same way
+        replayed_scores = np.array([round(score, 1) for score in scores[row, :count].tolist()])
+        results.append({
+            'file': path,
+            'session_id': info['session_id'],
+            'frames': count,
+            'duration_seconds': round(float(records['t'][-1] - records['t'][0]), 3) if count else 0.0,
+            'recorded_alerts': alert_onsets(recorded),
+            'replayed_alerts': alert_onsets(replayed),
+            'recorded_drowsy_frames': int(recorded.sum()),
+            'replayed_drowsy_frames': int(replayed.sum()),
+            'changed_frames': int(np.count_nonzero(replayed != recorded)),
+            'changed_scores': int(np.count_nonzero(replayed_scores != records['score']))
+        })
+    return results
+
+
+def _replay_job(job):
+    return replay(*job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='Recording files or directories of them')
+    parser.add_argument('--set', dest='overrides', action='append', type=parse_override, default=[],
+                        metavar='NAME=VALUE', help='Override a ScoringParams field (repeatable)')
+    parser.add_argument('--from-landmarks', action='store_true', help='Recompute raw EAR from the stored landmarks')
+    parser.add_argument('--processes', type=int, default=1, help='Replay batches in parallel processes')
+    parser.add_argument('-o', '--output', help='Write the per-session results as JSON')
+    args = parser.parse_args()
+
+    overrides = dict(args.overrides)
+    try:
+        ScoringParams(**overrides)
+    except TypeError as e:
+        parser.error(str(e))
+
+    # Similar lengths in one batch keep the padding small
+    files = sorted(find_recordings(args.paths), key=os.path.getsize)
+    jobs = [(files[i:i + BATCH_SESSIONS], overrides, args.from_landmarks)
+            for i in range(0, len(files), BATCH_SESSIONS)]
+    started = time.perf_counter()
+    if args.processes > 1 and len(jobs) > 1:
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            batches = pool.map(_replay_job, jobs)
+    else:
+        batches = [_replay_job(job) for job in jobs]
+    results = [row for batch in batches for row in batch]
+    elapsed = time.perf_counter() - started
+
+    print(f"{'session':>24} {'frames':>7} {'alerts':>13} {'changed frames':>15} {'changed scores':>15}")
+    for row in results:
+        print(f"{row['session_id'][:24]:>24} {row['frames']:7d} "
+              f"{row['recorded_alerts']:5d} -> {row['replayed_alerts']:<5d} "
+              f"{row['changed_frames']:15d} {row['changed_scores']:15d}")
+    frames = sum(row['frames'] for row in results)
+    print(f"{len(results)} sessions, {frames} frames replayed in {elapsed:.2f}s "
+          f"({frames / elapsed if elapsed else 0:.0f} frames/s); "
+          f"{sum(row['changed_frames'] > 0 for row in results)} sessions changed")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'overrides': overrides, 'from_landmarks': args.from_landmarks, 'sessions': results}, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Adaptive sampling - how soon the client should capture its next frame
+
+An alert driver with eyes open doesn't need to be sampled as often as one whose
+eyes are closing. Each single-frame response carries next_capture_ms:
+
+- fast_ms while the eyes are closed, an alert is active or the drowsy score has
+  reached urgent_score
+- between slow_ms (score 0) and fast_ms (urgent_score), linearly, for an awake driver
+- default_ms while no face is found
+
+The load is the frames in flight plus the frames queued in front of them (every
+add_backlog() source: admission queue, inference thread pool), per unit of capacity.
+In-flight frames alone can't exceed the number of processing threads, so only the
+queues show overload. Above a load of 1, awake drivers' intervals are stretched by
+the load, up to overload_ms. Urgent intervals are never stretched.
+"""
+import threading
+from contextlib import contextmanager
+
+FAST_INTERVAL_MS = 250  # Eyes closing or alert active
+DEFAULT_INTERVAL_MS = 1000  # Searching for a face (the client's own default)
+SLOW_INTERVAL_MS = 1500  # Clearly awake (drowsy score 0)
+OVERLOAD_INTERVAL_MS = 3000  # Longest interval an awake driver gets while the server is overloaded
+
+
+class SamplingPolicy:
+    """Recommended capture intervals plus this process's in-flight frame count"""
+
+    def __init__(self, urgent_score, capacity, fast_ms=FAST_INTERVAL_MS, default_ms=DEFAULT_INTERVAL_MS,
+                 slow_ms=SLOW_INTERVAL_MS, overload_ms=OVERLOAD_INTERVAL_MS):
+        self.urgent_score = urgent_score
+        self.capacity = max(capacity, 1)
+        self.fast_ms = fast_ms
+        self.default_ms = default_ms
+        self.slow_ms = slow_ms
+        self.overload_ms = max(overload_ms, slow_ms)
+        self._in_flight = 0
+        self._backlog_sources = []
+        self._lock = threading.Lock()
+        self.recommended = {'fast': 0, 'awake': 0, 'no_face': 0}
+        self.recommended_ms_total = 0
+
+    @contextmanager
+    def frame(self):
+        """with sampling.frame(): ... - counts the frame as in flight (the load signal)"""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def add_backlog(self, source):
+        """Count source() - frames waiting to be processed, not yet in flight - in the load"""
+        self._backlog_sources.append(source)
+
+    @property
+    def backlog(self):
+        return sum(source() for source in self._backlog_sources)
+
+    @property
+    def load(self):
+        """Frames in flight or waiting per unit of capacity (above 1 = overloaded)"""
+        return (self._in_flight + self.backlog) / self.capacity
+
+    def face_interval(self, drowsy_score, eyes_closing, alerting, load=None):
+        """Interval in ms for one tracked face"""
+        if eyes_closing or alerting or drowsy_score >= self.urgent_score:
+            return self.fast_ms
+        share = max(drowsy_score, 0.0) / self.urgent_score
+        interval = self.slow_ms - (self.slow_ms - self.fast_ms) * share
+        load = self.load if load is None else load
+        if load > 1.0:
+            interval = min(interval * load, self.overload_ms)
+        return interval
+
+    def next_interval(self, faces):
+        """
+        Recommended interval in whole ms for a frame's faces, given as
+        [(drowsy score, eyes closing, alerting)]: the most urgent face wins
+        """
+        if faces:
+            load = self.load
+            interval = int(round(min(self.face_interval(*face, load=load) for face in faces)))
+            band = 'fast' if interval <= self.fast_ms else 'awake'
+        else:
+            interval, band = self.default_ms, 'no_face'
+        with self._lock:
+            self.recommended[band] += 1
+            self.recommended_ms_total += interval
+        return interval
+
+    def stats(self):
+        backlog = self.backlog
+        with self._lock:
+            count = sum(self.recommended.values())
+            return {
+                'in_flight': self._in_flight,
+                'backlog': backlog,
+                'capacity': self.capacity,
+                'recommended': dict(self.recommended),
+                'mean_interval_ms': round(self.recommended_ms_total / count, 1) if count else None
+            }
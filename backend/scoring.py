@@ -0,0 +1,478 @@
+"""
+Scoring engine - the temporal drowsiness logic, from one frame's raw EAR to the alert decision
+
+Pure and clock-injected: everything it reads is a ScoringParams and a ScoringState
+passed in, and the time of each frame is an argument (clock() is only the
+fallback for live callers). Two entry points:
+
+    ScoringEngine.score_frame(state, raw_ear, now)   one frame of one session
+    score_batch(timestamps, ears, params)            whole EAR time series of many
+                                                     sessions at once, as arrays
+
+score_batch() runs the same state machine over all sessions in lockstep with
+NumPy, one frame column at a time, and matches the per-frame path bit for bit.
+"""
+import time
+from collections import deque
+
+import numpy as np
+
+from tracing import Tracer, parse_level
+
+# ============================================================================
+# INTELLIGENT DROWSINESS DETECTION PARAMETERS (defaults of ScoringParams)
+# ============================================================================
+
+# Eye Aspect Ratio thresholds - ADJUSTED FOR REAL DROWSINESS DETECTION
+# Lower thresholds = only trigger on genuinely closed/very sleepy eyes
+EAR_THRESHOLD = 0.24  # Below this = eyes truly closed/very sleepy (was 0.27)
+EAR_ALERT_THRESHOLD = 0.28  # Above this = definitely alert (was 0.32)
+EAR_PARTIAL_OPEN = 0.24  # Between closed and open = slightly open, don't count as drowsy
+
+# Blink detection - to ignore normal blinks
+BLINK_DURATION_MAX = 0.4  # Max duration (seconds) for normal blink
+BLINK_EAR_THRESHOLD = 0.18  # Very low EAR indicates full eye closure (was 0.22)
+
+# Drowsiness detection parameters - IMMEDIATE RESPONSE
+DROWSY_SCORE_THRESHOLD = 35.0  # Score above this triggers alert (lower = faster response)
+DROWSY_CONFIRMATION_TIME = 0.3  # Must maintain high score for this long (0.3s = immediate after blink filter)
+GRACE_PERIOD_AFTER_ALERT = 2.0  # Recovery time after opening eyes (seconds)
+
+# Temporal smoothing
+EAR_HISTORY_SIZE = 10  # Keep last 10 EAR readings for smoothing
+DROWSY_SCORE_DECAY = 0.85  # Score decay when eyes are open (0.85 = 15% decay per frame)
+DROWSY_SCORE_INCREMENT = 40.0  # Score increase when eyes closed (DOUBLED for immediate detection)
+
+
+class ScoringParams:
+    """Every threshold and rate of the scoring logic; keyword arguments override the defaults"""
+    __slots__ = (
+        'ear_threshold', 'ear_alert_threshold', 'ear_partial_open', 'blink_duration_max',
+        'blink_ear_threshold', 'score_threshold', 'confirmation_time', 'grace_period',
+        'history_size', 'smoothing_weights', 'sleepy_decay', 'partial_open_decay',
+        'wide_open_decay', 'alert_decay', 'score_increment', 'deep_closure_factor',
+        'max_score', 'alert_exit_score', 'recovery_score', 'warning_score', 'caution_score'
+    )
+
+    def __init__(self, **overrides):
+        self.ear_threshold = EAR_THRESHOLD
+        self.ear_alert_threshold = EAR_ALERT_THRESHOLD
+        self.ear_partial_open = EAR_PARTIAL_OPEN
+        self.blink_duration_max = BLINK_DURATION_MAX
+        self.blink_ear_threshold = BLINK_EAR_THRESHOLD
+        self.score_threshold = DROWSY_SCORE_THRESHOLD
+        self.confirmation_time = DROWSY_CONFIRMATION_TIME
+        self.grace_period = GRACE_PERIOD_AFTER_ALERT
+        self.history_size = EAR_HISTORY_SIZE
+        self.smoothing_weights = (0.5, 0.3, 0.2)  # Newest first, over the last 3 EARs
+        self.sleepy_decay = DROWSY_SCORE_DECAY  # Per frame, EAR below ear_partial_open but not closed
+        self.partial_open_decay = 0.75  # Per frame, EAR between ear_partial_open and ear_alert_threshold
+        self.wide_open_decay = 0.75  # Per frame, EAR >= ear_alert_threshold
+        self.alert_decay = 0.50  # ...while an alert is active
+        self.score_increment = DROWSY_SCORE_INCREMENT  # Per closed-eye frame
+        self.deep_closure_factor = 2.0  # Increment multiplier below blink_ear_threshold
+        self.max_score = 100.0
+        self.alert_exit_score = 20.0  # Alert state ends below this once the grace period is over
+        self.recovery_score = 40.0  # An active alert recovers below this (or when eyes are wide open)
+        self.warning_score = 50.0  # 'Getting very drowsy...'
+        self.caution_score = 30.0  # 'Eyes getting heavy...'
+        for name, value in overrides.items():
+            if name not in self.__slots__:
+                raise TypeError(f'Unknown scoring parameter: {name}')
+            setattr(self, name, value)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ScoringState:
+    """Temporal state of one session's scoring"""
+    __slots__ = (
+        'ear_history', 'drowsy_score', 'eyes_closed_start', 'last_alert_time',
+        'is_in_alert', 'blink_detected', 'confirmation_start'
+    )
+
+    def __init__(self, history_size=EAR_HISTORY_SIZE):
+        self.ear_history = deque(maxlen=history_size)
+        self.drowsy_score = 0.0  # Current drowsiness score (0-100)
+        self.eyes_closed_start = None  # Timestamp when eyes closed
+        self.last_alert_time = None  # Last time alert was triggered
+        self.is_in_alert = False  # Currently in alert state
+        self.blink_detected = False  # Was last closure a blink?
+        self.confirmation_start = None  # When did score exceed threshold?
+
+    def reset(self):
+        """Reset state (e.g., when face is lost)"""
+        self.ear_history.clear()
+        self.drowsy_score = 0.0
+        self.eyes_closed_start = None
+        self.blink_detected = False
+        self.confirmation_start = None
+        # Keep last_alert_time and is_in_alert for grace period
+
+
+class FrameScore:
+    """Scoring result of one frame"""
+    __slots__ = (
+        'smoothed_ear', 'drowsy_score', 'is_blink', 'is_eyes_closed', 'in_grace_period',
+        'should_alert', 'alert_triggered', 'message'
+    )
+
+    def __init__(self, smoothed_ear, drowsy_score, is_blink, is_eyes_closed, in_grace_period,
+                 should_alert, alert_triggered, message):
+        self.smoothed_ear = smoothed_ear
+        self.drowsy_score = drowsy_score
+        self.is_blink = is_blink
+        self.is_eyes_closed = is_eyes_closed
+        self.in_grace_period = in_grace_period
+        self.should_alert = should_alert
+        self.alert_triggered = alert_triggered  # The alert started on this frame
+        self.message = message
+
+
+class ScoringEngine:
+    """
+    Per-frame scoring over a ScoringState. tracer receives the debug/info events
+    (default: a disabled one); clock is only used when a caller passes no time.
+    """
+    __slots__ = ('params', 'tracer', 'clock')
+
+    def __init__(self, params=None, tracer=None, clock=time.time):
+        self.params = params or ScoringParams()
+        self.tracer = tracer or Tracer(level=parse_level('off'))
+        self.clock = clock
+
+    def new_state(self):
+        return ScoringState(self.params.history_size)
+
+    def smoothed_ear(self, state, current_ear):
+        """
+        Get temporally smoothed EAR value using rolling average
+        This reduces noise and prevents false alerts from momentary fluctuations
+        """
+        state.ear_history.append(current_ear)
+
+        if len(state.ear_history) < 3:
+            # Not enough history yet, return current value
+            return current_ear
+
+        # Use weighted average: recent values matter more. Added left to right on purpose:
+        # sum() compensates float rounding on Python 3.12+, which score_batch() can't mirror
+        w0, w1, w2 = self.params.smoothing_weights
+        history = state.ear_history
+        return history[-1] * w0 + history[-2] * w1 + history[-3] * w2
+
+    def detect_blink(self, state, smoothed_ear, current_time):
+        """
+        Detect if current eye closure is a normal blink or potential drowsiness
+        Uses SMOOTHED EAR to prevent false classifications from noise
+
+        EAR Ranges (defaults):
+        - >= 0.28: Eyes fully open/alert (normal state)
+        - 0.24-0.28: Eyes slightly smaller (OK, not drowsy - could be natural)
+        - < 0.24: Eyes closed/very sleepy
+
+        Returns: (is_blink, is_eyes_closed)
+        """
+        params = self.params
+        tracer = self.tracer
+        is_eyes_closed = smoothed_ear < params.ear_threshold
+
+        # Safety check: If EAR is alert or even partially open, force eyes_open state
+        if smoothed_ear >= params.ear_alert_threshold:
+            # Eyes are definitely open - clear any closure tracking
+            if state.eyes_closed_start is not None:
+                tracer.debug('eyes_open', ear=smoothed_ear, closed_for=current_time - state.eyes_closed_start)
+                state.eyes_closed_start = None
+                state.blink_detected = False
+            return False, False  # Not blink, eyes are open
+
+        # Partial open check: Eyes smaller than normal but NOT drowsy (0.24-0.28 range)
+        if smoothed_ear >= params.ear_partial_open:
+            # Eyes are partially open - this is OK, could be natural eye size
+            if state.eyes_closed_start is not None:
+                tracer.debug('eyes_partially_open', ear=smoothed_ear)
+                state.eyes_closed_start = None
+                state.blink_detected = False
+            return False, False  # Not drowsy, just natural smaller eyes
+
+        # Track eye closure duration (only for truly closed/very sleepy eyes)
+        if is_eyes_closed:
+            if state.eyes_closed_start is None:
+                state.eyes_closed_start = current_time
+                tracer.debug('eyes_closed', ear=smoothed_ear)
+
+            closure_duration = current_time - state.eyes_closed_start
+
+            # Very low EAR and quick closure/opening = blink
+            if smoothed_ear < params.blink_ear_threshold and closure_duration < params.blink_duration_max:
+                state.blink_detected = True
+                return True, True  # is_blink=True, is_eyes_closed=True
+        elif state.eyes_closed_start is not None:
+            # Sleepy zone but not fully closed - just opened from closure
+            closure_duration = current_time - state.eyes_closed_start
+            tracer.debug('eyes_reopened', closed_for=closure_duration,
+                         blink=closure_duration < params.blink_duration_max)
+            state.eyes_closed_start = None
+            state.blink_detected = False
+
+        return False, is_eyes_closed
+
+    def update_score(self, state, is_eyes_closed, is_blink, smoothed_ear, current_time):
+        """
+        Update drowsiness score based on current eye state
+        Uses exponential decay for gradual recovery and intelligent increment for closures
+        Returns: (drowsy_score, is_confirmed_drowsy)
+        """
+        params = self.params
+        tracer = self.tracer
+
+        # SAFETY CHECK: If eyes are clearly wide open, score should NEVER increase
+        if smoothed_ear >= params.ear_alert_threshold:
+            old_score = state.drowsy_score
+            # In alert - decay very fast, otherwise normal decay
+            decay_rate = params.alert_decay if state.is_in_alert else params.wide_open_decay
+            state.drowsy_score = max(0.0, state.drowsy_score * decay_rate)
+
+            if old_score > 5:
+                tracer.debug('score_decay', ear=smoothed_ear, score_from=old_score, score_to=state.drowsy_score,
+                             eyes='wide_open')
+
+            # Reset confirmation if score drops
+            if state.drowsy_score < params.score_threshold and state.confirmation_start is not None:
+                state.confirmation_start = None
+
+            return state.drowsy_score, False
+
+        # If it's just a blink, don't increase score
+        if is_blink:
+            tracer.debug('blink', score=state.drowsy_score)
+            return state.drowsy_score, False
+
+        old_score = state.drowsy_score
+        if is_eyes_closed:
+            # Eyes truly closed or very sleepy - increase score, more if deeply closed
+            increment = params.score_increment
+            deeply_closed = smoothed_ear < params.blink_ear_threshold
+            if deeply_closed:
+                increment *= params.deep_closure_factor
+            state.drowsy_score = min(params.max_score, state.drowsy_score + increment)
+
+            tracer.debug('score_increase', ear=smoothed_ear, score_from=old_score, score_to=state.drowsy_score,
+                         deeply_closed=deeply_closed)
+        else:
+            # Eyes open but below the alert threshold - decay by how open they are
+            if smoothed_ear >= params.ear_partial_open:
+                decay_rate = params.partial_open_decay  # Not drowsy, just smaller eyes
+            else:
+                decay_rate = params.sleepy_decay  # Sleepy zone but not closed - slow decay
+            state.drowsy_score = max(0.0, state.drowsy_score * decay_rate)
+
+            if old_score > 10:
+                tracer.debug('score_decay', ear=smoothed_ear, score_from=old_score, score_to=state.drowsy_score,
+                             eyes='open')
+
+        # Check if score is high enough for drowsiness detection
+        if state.drowsy_score >= params.score_threshold:
+            if state.confirmation_start is None:
+                state.confirmation_start = current_time
+                tracer.debug('confirmation_started', score=state.drowsy_score)
+
+            confirmation_duration = current_time - state.confirmation_start
+
+            # Must maintain high score for confirmation period
+            if confirmation_duration >= params.confirmation_time:
+                tracer.debug('drowsiness_confirmed', after=confirmation_duration, score=state.drowsy_score)
+                return state.drowsy_score, True
+        elif state.confirmation_start is not None:
+            # Score dropped below threshold - reset confirmation
+            tracer.debug('confirmation_reset', score=state.drowsy_score)
+            state.confirmation_start = None
+
+        return state.drowsy_score, False
+
+    def check_grace_period(self, state, current_time):
+        """
+        Check if we're in grace period after an alert
+        This prevents rapid re-alerting when user is recovering
+        """
+        if state.last_alert_time is None:
+            return False
+
+        in_grace = current_time - state.last_alert_time < self.params.grace_period
+
+        # Exit alert state if drowsy score is very low and grace period over
+        if not in_grace and state.drowsy_score < self.params.alert_exit_score:
+            state.is_in_alert = False
+
+        return in_grace
+
+    def score_frame(self, state, raw_ear, current_time=None):
+        """One frame with a face: smoothing, blink filter, score, grace period and alert state"""
+        if current_time is None:
+            current_time = self.clock()
+        params = self.params
+
+        smoothed_ear = self.smoothed_ear(state, raw_ear)
+        is_blink, is_eyes_closed = self.detect_blink(state, smoothed_ear, current_time)
+        drowsy_score, is_confirmed_drowsy = self.update_score(
+            state, is_eyes_closed, is_blink, smoothed_ear, current_time
+        )
+        in_grace_period = self.check_grace_period(state, current_time)
+
+        # Determine alert state
+        should_alert = False
+        alert_triggered = False
+        message = 'Alert'
+
+        if is_confirmed_drowsy and not in_grace_period:
+            # Confirmed drowsiness - trigger alert
+            should_alert = alert_triggered = True
+            state.is_in_alert = True
+            state.last_alert_time = current_time
+            message = 'Drowsiness detected!'
+            self.tracer.info('alert_triggered', score=drowsy_score, ear=smoothed_ear)
+
+        elif state.is_in_alert:
+            # Quick recovery detection: If eyes are wide open OR score drops significantly
+            if smoothed_ear >= params.ear_alert_threshold or drowsy_score < params.recovery_score:
+                state.is_in_alert = False
+                message = 'Recovered!' if drowsy_score < params.alert_exit_score else 'Recovering...'
+                self.tracer.info('alert_recovered', score=drowsy_score, ear=smoothed_ear)
+            else:
+                # Still in alert - eyes not fully open yet
+                should_alert = True
+                message = 'Wake up! Still drowsy!' if drowsy_score < params.warning_score else 'Drowsiness detected!'
+
+        elif drowsy_score > params.warning_score:
+            message = 'Getting very drowsy...'
+
+        elif drowsy_score > params.caution_score:
+            message = 'Eyes getting heavy...'
+
+        elif smoothed_ear < params.ear_partial_open:
+            message = 'Eyes look sleepy...'
+
+        elif smoothed_ear < params.ear_alert_threshold:
+            message = 'Monitoring...'
+
+        self.tracer.debug('frame', raw_ear=raw_ear, ear=smoothed_ear, eyes_closed=is_eyes_closed, blink=is_blink,
+                          score=drowsy_score, grace=in_grace_period, alert=should_alert, message=message)
+
+        return FrameScore(smoothed_ear, drowsy_score, is_blink, is_eyes_closed, in_grace_period,
+                          should_alert, alert_triggered, message)
+
+    def no_face(self, state):
+        """Frame without a face: the state resets, an active alert carries over. Returns is_drowsy."""
+        state.reset()
+        return state.is_in_alert
+
+
+def score_batch(timestamps, ears, params=None):
+    """
+    Score EAR time series of many sessions at once.
+
+    timestamps, ears: (sessions, frames) float arrays (1-D for a single session). Each
+    row is one session in time order, starting from a fresh state. ear NaN = frame
+    without a face; timestamp NaN = no frame (padding for shorter sessions).
+    Returns (scores, alerts, smoothed_ears) of the same shape: the unrounded drowsy
+    score (0 without a face, NaN for padding), the is_drowsy flag, and the smoothed
+    EAR (NaN without a face). Identical to calling score_frame()/no_face() per frame.
+    """
+    p = params or ScoringParams()
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    ears = np.asarray(ears, dtype=np.float64)
+    if timestamps.shape != ears.shape:
+        raise ValueError('timestamps and ears must have the same shape')
+    single = timestamps.ndim == 1
+    if single:
+        timestamps, ears = timestamps[None, :], ears[None, :]
+    sessions, frames = timestamps.shape
+    w0, w1, w2 = p.smoothing_weights
+
+    # State columns: None timestamps are NaN
+    history_len = np.zeros(sessions, dtype=np.int64)  # Capped at 3 - all the smoothing looks at
+    previous_ear = np.zeros(sessions)  # ear_history[-1]
+    older_ear = np.zeros(sessions)  # ear_history[-2]
+    score = np.zeros(sessions)
+    eyes_closed_start = np.full(sessions, np.nan)
+    confirmation_start = np.full(sessions, np.nan)
+    last_alert_time = np.full(sessions, np.nan)
+    in_alert = np.zeros(sessions, dtype=bool)
+
+    scores = np.full((sessions, frames), np.nan)
+    alerts = np.zeros((sessions, frames), dtype=bool)
+    smoothed_ears = np.full((sessions, frames), np.nan)
+
+    with np.errstate(invalid='ignore'):
+        for k in range(frames):
+            t = timestamps[:, k]
+            ear = ears[:, k]
+            active = ~np.isnan(t)
+            face = active & ~np.isnan(ear)
+            lost = active & ~face
+
+            # No face: reset, keep the alert
+            history_len[lost] = 0
+            score[lost] = 0.0
+            eyes_closed_start[lost] = np.nan
+            confirmation_start[lost] = np.nan
+            scores[lost, k] = 0.0
+            alerts[lost, k] = in_alert[lost]
+
+            # Smoothing: weighted EARs added newest first, as in ScoringEngine.smoothed_ear
+            history_len[face] = np.minimum(history_len[face] + 1, 3)
+            smoothed = np.where(history_len >= 3, ear * w0 + previous_ear * w1 + older_ear * w2, ear)
+            older_ear = np.where(face, previous_ear, older_ear)
+            previous_ear = np.where(face, ear, previous_ear)
+
+            # Blink detection
+            wide_open = smoothed >= p.ear_alert_threshold
+            partial = ~wide_open & (smoothed >= p.ear_partial_open)
+            closed = face & ~wide_open & ~partial & (smoothed < p.ear_threshold)
+            eyes_closed_start[face & (wide_open | partial)] = np.nan
+            starting = closed & np.isnan(eyes_closed_start)
+            eyes_closed_start[starting] = t[starting]
+            blink = closed & (smoothed < p.blink_ear_threshold) & (t - eyes_closed_start < p.blink_duration_max)
+            eyes_closed_start[face & ~wide_open & ~partial & ~closed] = np.nan
+
+            # Score update
+            open_rows = face & wide_open
+            score[open_rows] = np.maximum(0.0, score[open_rows] * np.where(in_alert[open_rows], p.alert_decay,
+                                                                            p.wide_open_decay))
+            confirmation_start[open_rows & (score < p.score_threshold)] = np.nan
+
+            increase = closed & ~blink
+            increment = np.where(smoothed[increase] < p.blink_ear_threshold,
+                                 p.score_increment * p.deep_closure_factor, p.score_increment)
+            score[increase] = np.minimum(p.max_score, score[increase] + increment)
+
+            decay = face & ~wide_open & ~closed
+            score[decay] = np.maximum(0.0, score[decay] * np.where(smoothed[decay] >= p.ear_partial_open,
+                                                                   p.partial_open_decay, p.sleepy_decay))
+
+            counted = increase | decay
+            high = counted & (score >= p.score_threshold)
+            starting = high & np.isnan(confirmation_start)
+            confirmation_start[starting] = t[starting]
+            confirmed = high & (t - confirmation_start >= p.confirmation_time)
+            confirmation_start[counted & ~high] = np.nan
+
+            # Grace period
+            in_grace = face & (t - last_alert_time < p.grace_period)  # False while no alert yet (NaN)
+            in_alert[face & ~np.isnan(last_alert_time) & ~in_grace & (score < p.alert_exit_score)] = False
+
+            # Alert state
+            triggered = confirmed & ~in_grace
+            recovered = (smoothed >= p.ear_alert_threshold) | (score < p.recovery_score)
+            should_alert = triggered | (face & in_alert & ~recovered)
+            in_alert[face] = should_alert[face]
+            last_alert_time[triggered] = t[triggered]
+
+            scores[face, k] = score[face]
+            alerts[face, k] = should_alert[face]
+            smoothed_ears[face, k] = smoothed[face]
+
+    if single:
+        return scores[0], alerts[0], smoothed_ears[0]
+    return scores, alerts, smoothed_ears
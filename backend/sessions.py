@@ -0,0 +1,137 @@
+"""
+Session registry - keeps one detection state per client session
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class _SessionEntry:
+    """Registry slot: the session's state plus its lock and last access time"""
+    __slots__ = ('state', 'lock', 'last_seen')
+
+    def __init__(self, state, now):
+        self.state = state
+        self.lock = threading.Lock()
+        self.last_seen = now
+
+
+class SessionRegistry:
+    """
+    Thread-safe map of session id -> detection state
+
+    Memory is bounded by max_sessions. Sessions idle for longer than
+    ttl_seconds are evicted on the next access, and when the registry is
+    full the least recently used session is evicted to make room.
+    """
+
+    def __init__(self, state_factory, max_sessions=1000, ttl_seconds=300.0, clock=time.monotonic):
+        if max_sessions < 1:
+            raise ValueError('max_sessions must be at least 1')
+        self._state_factory = state_factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # Ordered from least to most recently used
+        self._lock = threading.Lock()
+        self._eviction_listeners = []
+        self.created = 0
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    def add_eviction_listener(self, listener):
+        """Register listener(session_id) to be called when a session is evicted or discarded"""
+        self._eviction_listeners.append(listener)
+
+    def _notify(self, session_ids):
+        for session_id in session_ids:
+            for listener in self._eviction_listeners:
+                listener(session_id)
+
+    def _expire(self, now):
+        """Pop idle sessions from the LRU end. Caller must hold self._lock."""
+        expired = []
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if now - entry.last_seen < self.ttl_seconds:
+                break
+            self._entries.popitem(last=False)
+            expired.append(session_id)
+        self.evicted_ttl += len(expired)
+        return expired
+
+    def _entry(self, session_id):
+        now = self._clock()
+        evicted = []
+        with self._lock:
+            evicted.extend(self._expire(now))
+            entry = self._entries.get(session_id)
+            if entry is None:
+                while len(self._entries) >= self.max_sessions:
+                    lru_id, _ = self._entries.popitem(last=False)
+                    evicted.append(lru_id)
+                    self.evicted_lru += 1
+                entry = _SessionEntry(self._state_factory(), now)
+                self._entries[session_id] = entry
+                self.created += 1
+            else:
+                entry.last_seen = now
+                self._entries.move_to_end(session_id)
+        if evicted:
+            self._notify(evicted)
+        return entry
+
+    def get(self, session_id):
+        """Return the state for session_id, creating it if needed"""
+        return self._entry(session_id).state
+
+    def peek(self, session_id):
+        """Return the state for session_id if it is live, without creating or touching it"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+        return entry.state if entry is not None else None
+
+    @contextmanager
+    def session(self, session_id):
+        """Yield the state for session_id while holding that session's lock"""
+        entry = self._entry(session_id)
+        with entry.lock:
+            yield entry.state
+
+    def discard(self, session_id):
+        """Drop a session (e.g. when its client disconnects)"""
+        with self._lock:
+            removed = self._entries.pop(session_id, None) is not None
+        if removed:
+            self._notify([session_id])
+        return removed
+
+    def sweep(self):
+        """Evict idle sessions without touching any session; returns the number evicted"""
+        with self._lock:
+            expired = self._expire(self._clock())
+        if expired:
+            self._notify(expired)
+        return len(expired)
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'active_sessions': len(self._entries),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl_seconds,
+                'created': self.created,
+                'evicted_ttl': self.evicted_ttl,
+                'evicted_lru': self.evicted_lru,
+                'evicted_total': self.evicted_ttl + self.evicted_lru
+            }
@@ -0,0 +1,245 @@
+"""
+Shared session state - one scoring state per session across worker processes
+
+With several gunicorn workers, successive frames of one client land on different
+processes. SharedSessionRegistry keeps each session's scoring state (EAR history,
+drowsy score, closure/alert/confirmation timestamps) in one fixed-size slot of a
+memory-mapped file that every worker maps. Using a session loads its slot into the
+process's state object and writes it back afterwards, all while holding that slot's
+lock: an fcntl byte-range lock on the slot (between processes) plus a thread lock
+(fcntl locks don't exclude threads of one process). Claiming a slot for a new
+session takes the header lock; a session then keeps its slot until it is idle
+for ttl_seconds or, with every slot taken, is the least recently used one.
+
+Image-derived state (ROI, frame-skip reference, multi-face tracks) stays in each
+process, in the SessionRegistry this class extends.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from sessions import SessionRegistry
+
+MAGIC = b'DRWSSES1'
+HEADER = np.dtype([('magic', 'S8'), ('slots', '<u4'), ('history_size', '<u4'), ('slot_size', '<u4')])
+HEADER_SIZE = 64  # Bytes before the first slot; also the range locked while claiming slots
+
+
+def slot_dtype(history_size):
+    """Layout of one session slot; NaN stands for an unset timestamp"""
+    return np.dtype([
+        ('key', '<u8', (2,)),  # 128-bit hash of the session id; zero = free
+        ('last_seen', '<f8'),  # Wall-clock seconds
+        ('drowsy_score', '<f8'),
+        ('eyes_closed_start', '<f8'),
+        ('last_alert_time', '<f8'),
+        ('confirmation_start', '<f8'),
+        ('is_in_alert', 'u1'),
+        ('blink_detected', 'u1'),
+        ('history_len', '<u2'),
+        ('needs_reset', 'u1'),  # Claimed for a new session; cleared under the slot lock
+        ('ear_history', '<f8', (history_size,))
+    ], align=True)
+
+
+def session_key(session_id):
+    """Slot key of a session id: its 128-bit BLAKE2b hash as two integers (never zero in practice)"""
+    digest = hashlib.blake2b(session_id.encode('utf-8'), digest_size=16).digest()
+    return np.frombuffer(digest, dtype='<u8')
+
+
+def _time(value):
+    return float('nan') if value is None else value
+
+
+def _optional(value):
+    value = float(value)
+    return None if value != value else value
+
+
+class SharedSessionRegistry(SessionRegistry):
+    """SessionRegistry whose scoring state is shared by every process mapping path"""
+
+    def __init__(self, state_factory, path, history_size, max_sessions=1000, ttl_seconds=300.0,
+                 clock=time.monotonic, wall_clock=time.time):
+        super().__init__(state_factory, max_sessions=max_sessions, ttl_seconds=ttl_seconds, clock=clock)
+        self.path = path
+        self.history_size = history_size
+        self._dtype = slot_dtype(history_size)
+        self._wall_clock = wall_clock
+        self._pid = None
+        self._fd = None
+        self._table = None
+        self._open_lock = threading.Lock()
+        self._table_lock = threading.Lock()
+        self._slot_locks = [threading.Lock() for _ in range(max_sessions)]
+        self.slots_claimed = 0
+        self.slots_evicted = 0
+
+    # ---- table file ------------------------------------------------------------
+
+    def _open(self):
+        """This process's view of the table, (re)opened after a fork"""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._open_lock:
+                if self._pid != pid:
+                    # One descriptor per process for its lifetime: closing any descriptor of
+                    # the file would drop every fcntl lock this process holds on it
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                    size = HEADER_SIZE + self.max_sessions * self._dtype.itemsize
+                    fcntl.lockf(fd, fcntl.LOCK_EX, HEADER_SIZE, 0)
+                    try:
+                        if os.fstat(fd).st_size == 0:
+                            os.ftruncate(fd, size)
+                            header = np.zeros((), HEADER)
+                            header['magic'] = MAGIC
+                            header['slots'] = self.max_sessions
+                            header['history_size'] = self.history_size
+                            header['slot_size'] = self._dtype.itemsize
+                            os.pwrite(fd, header.tobytes(), 0)
+                        header = np.frombuffer(os.pread(fd, HEADER.itemsize, 0), HEADER)[0]
+                        layout = (header['magic'], int(header['slots']), int(header['history_size']),
+                                  int(header['slot_size']))
+                        if layout != (MAGIC, self.max_sessions, self.history_size, self._dtype.itemsize):
+                            raise ValueError(f'{self.path} holds a different session table layout; '
+                                             'remove it or point STATE_FILE elsewhere')
+                    finally:
+                        fcntl.lockf(fd, fcntl.LOCK_UN, HEADER_SIZE, 0)
+                    buffer = mmap.mmap(fd, size)
+                    self._table = np.ndarray((self.max_sessions,), dtype=self._dtype, buffer=buffer,
+                                             offset=HEADER_SIZE)
+                    self._fd = fd
+                    self._pid = pid
+        return self._table
+
+    @contextmanager
+    def _locked(self, lock, start, length):
+        with lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    def _slot_range(self, index):
+        return HEADER_SIZE + index * self._dtype.itemsize, self._dtype.itemsize
+
+    # ---- slots -----------------------------------------------------------------
+
+    def _claim(self, key):
+        """Index of the session's slot, claiming one (free, expired or LRU) if it has none"""
+        table = self._open()
+        now = self._wall_clock()
+        with self._locked(self._table_lock, 0, HEADER_SIZE):
+            found = np.flatnonzero((table['key'] == key).all(axis=1))
+            if found.size:
+                index = int(found[0])
+            else:
+                reusable = ~table['key'].any(axis=1) | (now - table['last_seen'] >= self.ttl_seconds)
+                candidates = np.flatnonzero(reusable)
+                if candidates.size:
+                    index = int(candidates[0])
+                else:
+                    index = int(np.argmin(table['last_seen']))
+                    self.slots_evicted += 1
+                # Its previous session may still be using it: the fields are reset by
+                # whoever takes the slot lock next
+                table['key'][index] = key
+                table['needs_reset'][index] = 1
+                self.slots_claimed += 1
+            table['last_seen'][index] = now
+        return index
+
+    def _reset_slot(self, index):
+        table = self._table
+        table['drowsy_score'][index] = 0.0
+        for name in ('eyes_closed_start', 'last_alert_time', 'confirmation_start'):
+            table[name][index] = np.nan
+        table['is_in_alert'][index] = 0
+        table['blink_detected'][index] = 0
+        table['history_len'][index] = 0
+        table['needs_reset'][index] = 0
+
+    @contextmanager
+    def _slot(self, session_id):
+        """Yield the session's slot index while holding its lock"""
+        key = session_key(session_id)
+        while True:
+            index = self._claim(key)
+            start, length = self._slot_range(index)
+            with self._locked(self._slot_locks[index], start, length):
+                # Another process may have reclaimed the slot between the claim and the lock
+                if (self._table['key'][index] == key).all():
+                    if self._table['needs_reset'][index]:
+                        self._reset_slot(index)
+                    yield index
+                    return
+
+    def _load(self, index, state):
+        table = self._table
+        state.drowsy_score = float(table['drowsy_score'][index])
+        state.eyes_closed_start = _optional(table['eyes_closed_start'][index])
+        state.last_alert_time = _optional(table['last_alert_time'][index])
+        state.confirmation_start = _optional(table['confirmation_start'][index])
+        state.is_in_alert = bool(table['is_in_alert'][index])
+        state.blink_detected = bool(table['blink_detected'][index])
+        state.ear_history.clear()
+        state.ear_history.extend(table['ear_history'][index, :table['history_len'][index]].tolist())
+
+    def _store(self, index, state):
+        table = self._table
+        table['drowsy_score'][index] = state.drowsy_score
+        table['eyes_closed_start'][index] = _time(state.eyes_closed_start)
+        table['last_alert_time'][index] = _time(state.last_alert_time)
+        table['confirmation_start'][index] = _time(state.confirmation_start)
+        table['is_in_alert'][index] = state.is_in_alert
+        table['blink_detected'][index] = state.blink_detected
+        history = list(state.ear_history)[-self.history_size:]
+        table['ear_history'][index, :len(history)] = history
+        table['history_len'][index] = len(history)
+
+    # ---- SessionRegistry interface ---------------------------------------------
+
+    @contextmanager
+    def session(self, session_id):
+        """Yield the state for session_id, synchronized with every process, while holding its locks"""
+        with super().session(session_id) as state, self._slot(session_id) as index:
+            self._load(index, state)
+            try:
+                yield state
+            finally:
+                self._store(index, state)
+
+    def discard(self, session_id):
+        """Drop a session here and free its shared slot"""
+        removed = super().discard(session_id)
+        table = self._open()
+        key = session_key(session_id)
+        with self._locked(self._table_lock, 0, HEADER_SIZE):
+            for index in np.flatnonzero((table['key'] == key).all(axis=1)):
+                table['key'][index] = 0
+        return removed
+
+    @property
+    def slots_used(self):
+        """Sessions in the shared table - the same count in every worker"""
+        return int(self._open()['key'].any(axis=1).sum())
+
+    def stats(self):
+        """Counters for monitoring, plus the shared table's"""
+        stats = super().stats()
+        stats['shared'] = {
+            'path': self.path,
+            'slots': self.max_sessions,
+            'slots_used': self.slots_used,
+            'slots_claimed': self.slots_claimed,
+            'slots_evicted': self.slots_evicted
+        }
+        return stats
@@ -0,0 +1,53 @@
+"""
+Startup timing and readiness
+
+A worker's cold start is mostly imports (Flask, OpenCV, MediaPipe) and building
+the FaceMesh graphs. StartupTimer records each of those as a named phase, in
+order, from the moment it is created (the top of api_server), and holds the
+readiness flag that /ready reports: set once the models are built and warmed up.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Named startup phases (seconds, in the order they ran) and the readiness flag"""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.started = clock()
+        self.phases = {}
+        self.ready_after = None  # Seconds from start to ready
+        self._ready = threading.Event()
+
+    @contextmanager
+    def phase(self, name):
+        """with startup.phase('import_cv2'): ... - records the block's duration"""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(self._clock() - start, 4)
+
+    def mark(self, name):
+        """Record the time since start as phase name (e.g. the whole module import)"""
+        self.phases[name] = round(self._clock() - self.started, 4)
+
+    def mark_ready(self):
+        if not self._ready.is_set():
+            self.ready_after = round(self._clock() - self.started, 4)
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'ready': self.ready,
+            'ready_after_seconds': self.ready_after,
+            'phases': dict(self.phases)
+        }
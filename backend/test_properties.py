@@ -646,3 +646,1157 @@ def test_cors_header_presence(request_data):
             f"Status code should be an integer, got {type(response.status_code)}"
         assert 200 <= response.status_code < 600, \
             f"Status code should be a valid HTTP status code, got {response.status_code}"
+
+
+@st.composite
+def session_access_sequences(draw):
+    """
+    Generate a sequence of (session_id, seconds_elapsed) accesses for the session registry.
+    """
+    return draw(st.lists(
+        st.tuples(
+            st.sampled_from(['s0', 's1', 's2', 's3', 's4', 's5']),
+            st.floats(min_value=0.0, max_value=20.0, allow_nan=False, allow_infinity=False)
+        ),
+        min_size=1,
+        max_size=40
+    ))
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    accesses=session_access_sequences(),
+    max_sessions=st.integers(min_value=1, max_value=4),
+    ttl_seconds=st.floats(min_value=1.0, max_value=30.0)
+)
+def test_session_registry_bounds_and_isolation(accesses, max_sessions, ttl_seconds):
+    """
+    **Feature: drowsiness-detector, Property 13: Per-Session State Isolation**
+
+    For any sequence of session accesses, the registry should never hold more than
+    max_sessions states, should never keep a session idle for ttl_seconds or longer,
+    should hand back the same state object while a session stays live, and its
+    counters should account for every session it created.
+    """
+    from sessions import SessionRegistry
+
+    now = [0.0]
+    registry = SessionRegistry(dict, max_sessions=max_sessions, ttl_seconds=ttl_seconds,
+                               clock=lambda: now[0])
+    evicted = []
+    registry.add_eviction_listener(evicted.append)
+    last_seen = {}
+    live_states = {}
+
+    for session_id, elapsed in accesses:
+        now[0] += elapsed
+        was_live = session_id in registry and now[0] - last_seen[session_id] < ttl_seconds
+        with registry.session(session_id) as session_state:
+            if was_live:
+                assert session_state is live_states[session_id], \
+                    "A live session should keep its own state object"
+            session_state[session_id] = now[0]
+            assert set(session_state) == {session_id}, "States must not be shared between sessions"
+        live_states[session_id] = session_state
+        last_seen[session_id] = now[0]
+
+        assert len(registry) <= max_sessions, \
+            f"Registry holds {len(registry)} sessions, cap is {max_sessions}"
+
+    stats = registry.stats()
+    assert stats['active_sessions'] == len(registry)
+    assert stats['created'] == stats['active_sessions'] + stats['evicted_total'], \
+        "Every created session is either live or counted as evicted"
+    assert len(evicted) == stats['evicted_total']
+
+    now[0] += 2 * ttl_seconds
+    registry.sweep()
+    assert len(registry) == 0, "All sessions should expire once idle for ttl_seconds"
+
+
+class MockTrackingMesh:
+    """Stand-in for a tracking-mode FaceMesh that records whether it was closed"""
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    session_ids=st.lists(st.sampled_from(['s0', 's1', 's2', 's3', 's4']), min_size=1, max_size=40),
+    max_instances=st.integers(min_value=1, max_value=4)
+)
+def test_face_mesh_pool_cap_and_reuse(session_ids, max_instances):
+    """
+    **Feature: drowsiness-detector, Property 14: Tracking Face Mesh Pool Bounds**
+
+    For any sequence of session frames, the tracking mesh pool should never hold
+    more than max_instances meshes, should hand the same mesh to a session's
+    consecutive frames while it stays pooled, and should close every mesh it evicts.
+    """
+    from face_mesh_pool import FaceMeshPool
+
+    built = []
+
+    def factory():
+        mesh = MockTrackingMesh()
+        built.append(mesh)
+        return mesh
+
+    # reclaim_seconds=0: any idle instance may be taken over by a new session
+    pool = FaceMeshPool(factory, max_instances=max_instances, reclaim_seconds=0.0)
+    previous = {}
+
+    for session_id in session_ids:
+        with pool.acquire(session_id) as mesh:
+            assert mesh is not None, "Idle instances should always be evictable"
+            assert not mesh.closed, "A closed mesh must never be handed out"
+            if session_id in previous and not previous[session_id].closed:
+                assert mesh is previous[session_id], "A pooled session should keep its mesh"
+        previous[session_id] = mesh
+        assert len(pool) <= max_instances
+
+    stats = pool.stats()
+    assert stats['created'] == len(built)
+    assert stats['created'] == stats['active_instances'] + stats['evicted']
+    assert sum(mesh.closed for mesh in built) == stats['evicted']
+
+
+@st.composite
+def face_mesh_landmarks(draw):
+    """Generate 468 normalized face mesh landmarks (as MockLandmarkPoint objects)"""
+    # Draw a seed rather than 936 floats to stay within Hypothesis buffer limits
+    seed = draw(st.integers(min_value=0, max_value=2**32 - 1))
+    spread = draw(st.sampled_from([0.0, 0.01, 0.2, 1.2]))  # 0.0 = degenerate (all points equal)
+    rng = np.random.default_rng(seed)
+    coords = 0.5 + spread * (rng.random((468, 2)).astype(np.float32) - 0.5)
+    return [MockLandmarkPoint(float(x), float(y)) for x, y in coords]
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    landmark_list=face_mesh_landmarks(),
+    width=st.integers(min_value=1, max_value=640),
+    height=st.integers(min_value=1, max_value=480)
+)
+def test_vectorized_landmark_metrics_match_reference(landmark_list, width, height):
+    """
+    **Feature: drowsiness-detector, Property 15: Vectorized Landmark Metrics Equivalence**
+    **Validates: Requirements 3.2, 4.1**
+
+    For any set of face mesh landmarks, the vectorized face box and EAR computation
+    should return exactly the same values as the per-point reference implementation.
+    """
+    from landmarks import LEFT_EYE_IDX, RIGHT_EYE_IDX, landmarks_to_array, calc_face_box, eye_aspect_ratios
+
+    def reference_ear(indices):
+        points = [(int(landmark_list[idx].x * width), int(landmark_list[idx].y * height)) for idx in indices]
+        A = np.linalg.norm(np.array(points[1]) - np.array(points[5]))
+        B = np.linalg.norm(np.array(points[2]) - np.array(points[4]))
+        C = np.linalg.norm(np.array(points[0]) - np.array(points[3]))
+        if C == 0:
+            return 0.0
+        return (A + B) / (2.0 * C)
+
+    xs = [int(lm.x * width) for lm in landmark_list]
+    ys = [int(lm.y * height) for lm in landmark_list]
+    expected_box = {
+        'left': max(min(xs), 0),
+        'top': max(min(ys), 0),
+        'right': min(max(xs), width),
+        'bottom': min(max(ys), height)
+    }
+
+    points = landmarks_to_array(landmark_list)
+    left_ear, right_ear = eye_aspect_ratios(points, width, height)
+
+    assert calc_face_box(points, width, height) == expected_box
+    assert left_ear == reference_ear(LEFT_EYE_IDX), "Left EAR must match the reference bit for bit"
+    assert right_ear == reference_ear(RIGHT_EYE_IDX), "Right EAR must match the reference bit for bit"
+
+
+@settings(max_examples=50, deadline=None)
+@given(
+    width=st.integers(min_value=8, max_value=1280),
+    height=st.integers(min_value=8, max_value=960),
+    seed=st.integers(min_value=0, max_value=2**32 - 1)
+)
+def test_reduced_decode_covers_target_and_keeps_source_shape(width, height, seed):
+    """
+    **Feature: drowsiness-detector, Property 16: Reduced-Resolution Decode**
+    **Validates: Requirements 2.1**
+
+    For any JPEG, decoding with a target size should return an image at least as large
+    as the target (unless the source is smaller) and report the full source shape.
+    """
+    from frames import PROCESSING_SIZE, jpeg_size, decode_image_bytes
+
+    img = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    jpeg = cv2.imencode('.jpg', img)[1].tobytes()
+
+    assert jpeg_size(jpeg) == (width, height)
+
+    decoded, original_shape = decode_image_bytes(jpeg, PROCESSING_SIZE)
+    assert original_shape == (height, width, 3), "original_shape must be the full source size"
+    target_w, target_h = PROCESSING_SIZE
+    assert decoded.shape[1] >= min(width, target_w)
+    assert decoded.shape[0] >= min(height, target_h)
+    if width >= 2 * target_w and height >= 2 * target_h:
+        assert decoded.shape[1] < width, "Large JPEGs should not be decoded at full size"
+
+
+@settings(max_examples=50, deadline=None)
+@given(
+    landmark_list=face_mesh_landmarks(),
+    seed=st.integers(min_value=0, max_value=2**32 - 1)
+)
+def test_change_detector_skips_only_unchanged_eyes(landmark_list, seed):
+    """
+    **Feature: drowsiness-detector, Property 17: Frame Skipping Change Detection**
+    **Validates: Requirements 3.2, 4.1**
+
+    For any frame and landmarks, the frame itself should count as unchanged against
+    its own snapshot, and inverting the eye band should always force a fresh inference.
+    """
+    from landmarks import landmarks_to_array
+    from change_detector import ChangeDetector, eye_region
+
+    # Blocky random scene - uniform noise would average out in the thumbnails
+    blocks = np.random.default_rng(seed).integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    frame = cv2.resize(blocks, (320, 240), interpolation=cv2.INTER_NEAREST)
+    points = landmarks_to_array(landmark_list)
+    detector = ChangeDetector()
+    reference = detector.snapshot(frame, points)
+
+    if reference[1] is None:
+        # Eye band outside the frame or too small - never skip
+        assert not detector.is_unchanged(reference, frame, points)
+        return
+
+    assert detector.is_unchanged(reference, frame.copy(), points)
+
+    left, top, right, bottom = eye_region(points)
+    x0, y0 = max(int(left * 320), 0), max(int(top * 240), 0)
+    x1, y1 = min(int(right * 320), 320), min(int(bottom * 240), 240)
+    changed = frame.copy()
+    changed[y0:y1, x0:x1] = 255 - changed[y0:y1, x0:x1]
+    assert not detector.is_unchanged(reference, changed, points), "Eyelid-sized changes must not be skipped"
+
+
+class MockPixelMesh:
+    """FaceMesh stand-in whose landmarks encode the frame's pixels (module level so worker processes can import it)"""
+    def process(self, rgb_frame):
+        flat = rgb_frame.reshape(-1).astype(np.float64) / 255.0
+        if not flat.any():
+            return type('Results', (), {'multi_face_landmarks': None})()
+        xs, ys = np.resize(flat, 468), np.resize(flat[::-1], 468)
+        face = type('Face', (), {'landmark': [MockLandmarkPoint(float(x), float(y)) for x, y in zip(xs, ys)]})()
+        return type('Results', (), {'multi_face_landmarks': [face]})()
+
+
+class MockStuckMesh:
+    """FaceMesh stand-in that never returns (a hung or crashing worker)"""
+    def process(self, rgb_frame):
+        import time
+        time.sleep(3600)
+
+
+_inference_worker_pool = None
+
+
+@settings(max_examples=25, deadline=None)
+@given(
+    width=st.integers(min_value=1, max_value=64),
+    height=st.integers(min_value=1, max_value=48),
+    seed=st.integers(min_value=0, max_value=2**32 - 1),
+    blank=st.booleans()
+)
+def test_inference_workers_match_in_process_landmarks(width, height, seed, blank):
+    """
+    **Feature: drowsiness-detector, Property 18: Shared-Memory Inference Round Trip**
+    **Validates: Requirements 3.1, 3.2**
+
+    For any frame, landmarks computed in a worker process and returned through the
+    shared-memory ring buffer should equal the in-process landmarks bit for bit.
+    """
+    global _inference_worker_pool
+    from inference_workers import InferenceWorkerPool
+    from landmarks import landmarks_to_array
+
+    if _inference_worker_pool is None:
+        import atexit
+        _inference_worker_pool = InferenceWorkerPool(MockPixelMesh, 1, max_frame_bytes=64 * 48 * 3)
+        atexit.register(_inference_worker_pool.close)
+
+    frame = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    if blank:
+        frame[...] = 0
+
+    expected = MockPixelMesh().process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    points = _inference_worker_pool.process(frame, timeout=30)
+
+    if expected.multi_face_landmarks is None:
+        assert points is None
+    else:
+        assert np.array_equal(points, landmarks_to_array(expected.multi_face_landmarks[0].landmark))
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    events=st.lists(
+        st.tuples(st.sampled_from(['debug', 'info', 'warning', 'error']), st.sampled_from(['a', 'b', 'c', 'd', None])),
+        max_size=60
+    ),
+    level=st.sampled_from(['debug', 'info', 'warning', 'error', 'off']),
+    sample_rate=st.sampled_from([0.0, 0.5, 1.0]),
+    capacity=st.integers(min_value=1, max_value=50)
+)
+def test_tracer_levels_sampling_and_ring_buffer(events, level, sample_rate, capacity):
+    """
+    **Feature: drowsiness-detector, Property 19: Structured Trace Filtering**
+    **Validates: Requirements 6.1**
+
+    For any sequence of trace events, only events at or above the level are kept,
+    debug/info events are kept exactly for sampled sessions, the buffer holds the
+    most recent `capacity` of them in order, and flushing writes one line each.
+    """
+    import io
+    from tracing import Tracer, LEVELS, WARNING, parse_level
+
+    stream = io.StringIO()
+    tracer = Tracer(level=parse_level(level), capacity=capacity, sample_rate=sample_rate,
+                    flush_interval=3600, stream=stream)
+
+    expected = []
+    for i, (event_level, session_id) in enumerate(events):
+        getattr(tracer, event_level)(f'event{i}', session_id=session_id, index=i)
+        numeric = LEVELS[event_level]
+        if numeric >= tracer.level and (numeric >= WARNING or tracer.is_sampled(session_id)):
+            expected.append(f'event{i}')
+
+    kept = expected[-capacity:]
+    assert tracer.stats()['dropped'] == len(expected) - len(kept)
+    assert tracer.flush() == len(kept)
+    lines = stream.getvalue().splitlines()
+    assert [line.split()[2] for line in lines] == kept
+    tracer.close()
+
+
+@settings(max_examples=100, deadline=None)
+@given(durations=st.lists(st.floats(min_value=0.0, max_value=5.0, allow_nan=False), min_size=1, max_size=200))
+def test_stage_histogram_quantiles_stay_in_bucket(durations):
+    """
+    **Feature: drowsiness-detector, Property 20: Stage Latency Histograms**
+    **Validates: Requirements 6.1**
+
+    For any set of stage durations, the histogram should count every observation and
+    sum them, and each estimated p50/p95/p99 should fall inside the bucket that holds
+    the true quantile, with p50 <= p95 <= p99.
+    """
+    import bisect
+    from metrics import Metrics, BUCKETS, QUANTILES, estimate_quantile
+
+    registry = Metrics()
+    for seconds in durations:
+        registry.observe('face_mesh', seconds)
+    buckets, total_seconds, count = registry.collect()['stages']['face_mesh']
+
+    assert count == len(durations) and sum(buckets) == len(durations)
+    assert total_seconds == pytest.approx(sum(durations))
+
+    ordered = sorted(durations)
+    estimates = []
+    for q in QUANTILES:
+        estimate = estimate_quantile(q, buckets)
+        true_value = ordered[max(int(np.ceil(q * len(ordered))) - 1, 0)]
+        i = bisect.bisect_left(BUCKETS, true_value)
+        lower = BUCKETS[i - 1] if i > 0 else 0.0
+        upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+        assert min(lower, upper) <= estimate <= upper
+        estimates.append(estimate)
+    assert estimates == sorted(estimates)
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    frame_count=st.integers(min_value=1, max_value=5000),
+    step=st.integers(min_value=1, max_value=12),
+    chunk_frames=st.integers(min_value=1, max_value=2000),
+    warmup_frames=st.integers(min_value=0, max_value=600),
+    drowsy=st.lists(st.booleans(), min_size=1, max_size=100)
+)
+def test_video_chunks_cover_every_sampled_frame_once(frame_count, step, chunk_frames, warmup_frames, drowsy):
+    """
+    **Feature: drowsiness-detector, Property 21: Chunked Video Analysis Coverage**
+    **Validates: Requirements 5.1**
+
+    For any video length, sampling step, chunk size and warm-up, every sampled frame
+    should be reported by exactly one chunk, in order, with every chunk's warm-up
+    starting on the sampling grid at least warmup_frames before it. Alert intervals
+    should cover exactly the drowsy frames.
+    """
+    from analyze_video import plan_chunks, alert_intervals
+
+    chunks = plan_chunks(frame_count, step, chunk_frames, warmup_frames)
+    reported = [i for chunk in chunks for i in range(chunk.start, chunk.stop) if i % step == 0]
+    assert reported == list(range(0, frame_count, step))
+    for chunk in chunks:
+        assert chunk.start % step == 0 and chunk.warmup_start % step == 0
+        assert chunk.warmup_start == 0 or chunk.start - chunk.warmup_start >= warmup_frames
+
+    times = [float(i) for i in range(len(drowsy))]
+    intervals = alert_intervals(times, drowsy, 1.0)
+    covered = [any(start <= t < end for start, end in intervals) for t in times]
+    assert covered == drowsy
+    assert all(end <= next_start for (_, end), (next_start, _) in zip(intervals, intervals[1:]))
+
+
+@settings(max_examples=50, deadline=None)
+@given(
+    frames=st.lists(
+        st.tuples(
+            st.floats(min_value=0.0, max_value=1e6, allow_nan=False),
+            st.one_of(st.none(), st.floats(min_value=0.0, max_value=1.0, allow_nan=False)),
+            st.booleans(),
+            st.integers(min_value=1, max_value=478)
+        ),
+        min_size=1, max_size=600
+    ),
+    seed=st.integers(min_value=0, max_value=2**32 - 1)
+)
+def test_session_recording_round_trip(tmp_path_factory, frames, seed):
+    """
+    **Feature: drowsiness-detector, Property 22: Session Recording Round Trip**
+    **Validates: Requirements 5.1**
+
+    For any sequence of frames, a session recording read back through its memory map
+    should hold every frame in order: timestamps and raw EAR bit for bit, landmarks to
+    float32 precision, and the face / drowsy flags.
+    """
+    from recorder import Recording, read_recording, FACE, DROWSY
+
+    rng = np.random.default_rng(seed)
+    path = str(tmp_path_factory.mktemp('recordings') / 'session.rec')
+    recording = Recording(path, 'driver-1')
+    written = []
+    for t, raw_ear, is_drowsy, n_points in frames:
+        points = rng.random((2, n_points)) if raw_ear is not None else None
+        result = {'is_drowsy': is_drowsy, 'drowsy_score': 12.5, 'ear': raw_ear or 0.0}
+        recording.append(t, points, raw_ear, (480, 640, 3), result)
+        written.append((t, raw_ear, is_drowsy, points))
+    recording.close()
+
+    info, records = read_recording(path)
+    assert info['session_id'] == 'driver-1' and info['count'] == len(frames)
+    for record, (t, raw_ear, is_drowsy, points) in zip(records, written):
+        assert record['t'] == t
+        assert bool(record['flags'] & DROWSY) == is_drowsy
+        assert (record['width'], record['height']) == (640, 480)
+        if points is None:
+            assert not record['flags'] & FACE and np.isnan(record['raw_ear'])
+        else:
+            assert record['flags'] & FACE and record['raw_ear'] == raw_ear
+            assert np.array_equal(record['points'][:, :record['n_points']], points.astype(np.float32))
+
+
+@st.composite
+def ear_time_series(draw):
+    """(timestamps, ears) of one session: irregular frame gaps, EAR NaN = no face"""
+    length = draw(st.integers(min_value=1, max_value=120))
+    gaps = draw(st.lists(st.floats(min_value=0.01, max_value=1.5, allow_nan=False), min_size=length, max_size=length))
+    ears = draw(st.lists(
+        st.one_of(st.floats(min_value=0.0, max_value=0.45, allow_nan=False), st.just(float('nan'))),
+        min_size=length, max_size=length
+    ))
+    return np.cumsum(gaps) + 1000.0, np.array(ears)
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    series=st.lists(ear_time_series(), min_size=1, max_size=6),
+    score_threshold=st.sampled_from([20.0, 35.0, 60.0]),
+    grace_period=st.sampled_from([0.5, 2.0])
+)
+def test_batch_scoring_matches_per_frame_engine(series, score_threshold, grace_period):
+    """
+    **Feature: drowsiness-detector, Property 23: Batch Scoring Equivalence**
+    **Validates: Requirements 5.1, 5.2, 5.3**
+
+    For any set of EAR time series (with face losses and uneven lengths), scoring them
+    together as padded arrays should give exactly the scores and alert flags of
+    running each one frame by frame through the scoring engine.
+    """
+    from scoring import ScoringEngine, ScoringParams, score_batch
+
+    params = ScoringParams(score_threshold=score_threshold, grace_period=grace_period)
+    frames = max(len(ts) for ts, _ in series)
+    timestamps = np.full((len(series), frames), np.nan)
+    ears = np.full((len(series), frames), np.nan)
+    for row, (ts, es) in enumerate(series):
+        timestamps[row, :len(ts)] = ts
+        ears[row, :len(es)] = es
+    scores, alerts, smoothed = score_batch(timestamps, ears, params)
+
+    engine = ScoringEngine(params)
+    for row, (ts, es) in enumerate(series):
+        state = engine.new_state()
+        for k, (t, ear) in enumerate(zip(ts.tolist(), es.tolist())):
+            if np.isnan(ear):
+                assert alerts[row, k] == engine.no_face(state)
+                assert scores[row, k] == 0.0 and np.isnan(smoothed[row, k])
+            else:
+                frame = engine.score_frame(state, ear, t)
+                assert scores[row, k] == frame.drowsy_score
+                assert alerts[row, k] == frame.should_alert
+                assert smoothed[row, k] == frame.smoothed_ear
+        assert np.isnan(scores[row, len(ts):]).all() and not alerts[row, len(ts):].any()
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    labels=st.lists(st.lists(st.booleans(), min_size=1, max_size=80), min_size=1, max_size=5),
+    delay=st.integers(min_value=0, max_value=3),
+    slack=st.sampled_from([0.0, 3.0]),
+    noise=st.lists(st.integers(min_value=0, max_value=79), max_size=10)
+)
+def test_threshold_sweep_episode_metrics(labels, delay, slack, noise):
+    """
+    **Feature: drowsiness-detector, Property 24: Threshold Sweep Metrics**
+    **Validates: Requirements 5.1, 5.2**
+
+    For any labeled traces, alerts that follow every drowsy episode by a fixed delay
+    within the slack should give no missed episodes, that delay as the latency and no
+    false alerts; alerts outside every episode (+ slack) should count as false alerts,
+    and every episode is either detected or missed.
+    """
+    from tune_thresholds import TraceSet, evaluate
+
+    traces = [(f's{i}', np.arange(len(row), dtype=np.float64), np.full(len(row), 0.3), np.array(row))
+              for i, row in enumerate(labels)]
+    trace_set = TraceSet(traces, slack_seconds=slack)
+    episodes = sum(int(row[0]) + sum(b and not a for a, b in zip(row, row[1:])) for row in labels)
+    assert len(trace_set.episodes) == episodes
+
+    # Every episode alerted `delay` frames after it starts, until it ends
+    alerts = np.zeros_like(trace_set.labels)
+    for row, start, last in trace_set.episodes:
+        if start + delay <= last:
+            alerts[row, start + delay:last + 1] = True
+    metrics = evaluate(trace_set, alerts)
+    assert metrics['episodes'] == episodes and metrics['false_alerts'] == 0
+    missed = sum(start + delay > last for _, start, last in trace_set.episodes)
+    assert metrics['missed'] == missed
+    if missed < episodes:
+        assert metrics['latency_mean'] == delay
+
+    # Isolated alerts outside every allowed window are false, and detection is unchanged
+    noisy = alerts.copy()
+    false_alerts = 0
+    for column in sorted(set(noise)):
+        if column < noisy.shape[1] and trace_set.timestamps[0, column] == column and \
+                not trace_set.allowed[0, max(column - 1, 0):column + 2].any() and \
+                not noisy[0, max(column - 1, 0)]:
+            noisy[0, column] = True
+            false_alerts += 1
+    metrics = evaluate(trace_set, noisy)
+    assert metrics['false_alerts'] == false_alerts and metrics['missed'] == missed
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    phases=st.lists(
+        st.tuples(st.sampled_from(['import_flask', 'import_cv2', 'import_mediapipe', 'warmup_face_mesh']),
+                  st.floats(min_value=0.0, max_value=30.0, allow_nan=False)),
+        max_size=8
+    ),
+    ready_calls=st.integers(min_value=0, max_value=3)
+)
+def test_startup_timer_phases_and_readiness(phases, ready_calls):
+    """
+    **Feature: drowsiness-detector, Property 25: Startup Readiness**
+    **Validates: Requirements 1.1**
+
+    For any sequence of startup phases, each phase should record its own duration
+    (the last run of a repeated name wins), and the process should report ready only
+    after mark_ready(), with the time to ready fixed by the first call.
+    """
+    from startup import StartupTimer
+
+    now = [100.0]
+    timer = StartupTimer(clock=lambda: now[0])
+    for name, seconds in phases:
+        with timer.phase(name):
+            now[0] += seconds
+    expected = {}
+    for name, seconds in phases:
+        expected[name] = round(seconds, 4)
+    assert timer.phases == pytest.approx(expected, abs=1e-4)
+    assert not timer.ready and timer.stats()['ready_after_seconds'] is None
+
+    elapsed = now[0] - 100.0
+    for _ in range(ready_calls):
+        timer.mark_ready()
+        now[0] += 1.0
+    stats = timer.stats()
+    assert stats['ready'] == (ready_calls > 0)
+    if ready_calls:
+        assert stats['ready_after_seconds'] == pytest.approx(elapsed, abs=1e-4)
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    landmark_list=face_mesh_landmarks(),
+    width=st.integers(min_value=1, max_value=640),
+    height=st.integers(min_value=1, max_value=480)
+)
+def test_eye_only_landmarks_match_full_mesh_ear(landmark_list, width, height):
+    """
+    **Feature: drowsiness-detector, Property 26: Landmark Ingestion Equivalence**
+    **Validates: Requirements 3.2, 4.1**
+
+    For any face mesh, sending only the eye points (LEFT_EYE_IDX / RIGHT_EYE_IDX order)
+    should give exactly the EAR the server computes from the full landmark set.
+    """
+    from landmarks import LEFT_EYE_IDX, RIGHT_EYE_IDX, landmarks_to_array, eye_points_to_array, eye_aspect_ratios
+
+    full = landmarks_to_array(landmark_list)
+    left_eye = [[landmark_list[i].x, landmark_list[i].y] for i in LEFT_EYE_IDX]
+    right_eye = [[landmark_list[i].x, landmark_list[i].y] for i in RIGHT_EYE_IDX]
+    eyes = eye_points_to_array(left_eye, right_eye)
+
+    assert np.isfinite(eyes).sum() == 2 * (len(LEFT_EYE_IDX) + len(RIGHT_EYE_IDX))
+    assert eye_aspect_ratios(eyes, width, height) == eye_aspect_ratios(full, width, height)
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    face_count=st.integers(min_value=1, max_value=4),
+    frames=st.lists(
+        st.tuples(st.randoms(use_true_random=False), st.lists(st.booleans(), min_size=4, max_size=4)),
+        min_size=1, max_size=30
+    ),
+    max_missed=st.integers(min_value=0, max_value=3)
+)
+def test_face_tracks_keep_stable_ids(face_count, frames, max_missed):
+    """
+    **Feature: drowsiness-detector, Property 27: Multi-Face Tracking**
+    **Validates: Requirements 3.2, 5.1**
+
+    For any sequence of frames showing a subset of separate, slowly moving faces in
+    any order, every face should keep one id and one state for as long as it is never
+    unseen for more than max_missed frames in a row, and should get a fresh id after that.
+    """
+    from face_tracker import FaceTracks
+
+    tracks = FaceTracks(object, max_missed=max_missed)
+    ids = {}  # True face -> id it is tracked under
+    missed = [0] * face_count
+    for step, (rng, visible) in enumerate(frames):
+        shown = [face for face in range(face_count) if visible[face]]
+        rng.shuffle(shown)
+        # Face k sits in its own column and drifts a little every frame
+        boxes = [(0.25 * face + 0.002 * step, 0.3, 0.25 * face + 0.2 + 0.002 * step, 0.6) for face in shown]
+        assigned, dropped = tracks.update(boxes)
+
+        assert len(assigned) == len(shown) and len({face_id for face_id, _ in assigned}) == len(shown)
+        for face, (face_id, state) in zip(shown, assigned):
+            if face in ids:
+                assert face_id == ids[face][0] and state is ids[face][1]
+            else:
+                assert all(face_id != known for known, _ in ids.values())
+            ids[face] = (face_id, state)
+            missed[face] = 0
+        for face in range(face_count):
+            if face not in shown and face in ids:
+                missed[face] += 1
+                if missed[face] > max_missed:
+                    assert ids.pop(face)[0] in dropped
+        assert len(tracks) == len(ids)
+
+
+@settings(max_examples=100)
+@given(
+    max_entries=st.integers(min_value=1, max_value=8),
+    uploads=st.lists(
+        st.tuples(st.sampled_from(['a', 'b']), st.integers(min_value=0, max_value=11)),
+        min_size=1, max_size=60
+    )
+)
+def test_frame_cache_lru_per_session(max_entries, uploads):
+    """
+    **Feature: drowsiness-detector, Property 28: Frame Dedupe Cache**
+    **Validates: Requirements 2.4, 2.5**
+
+    For any sequence of uploads, the frame cache should hit exactly when the same
+    session sent the same bytes and they are still among the max_entries most recently
+    used keys, return that upload's landmarks unchanged, and never hold more than
+    max_entries frames. Discarding a session should drop its frames only.
+    """
+    from frame_cache import FrameCache, frame_key
+
+    cache = FrameCache(max_entries)
+    recent = []  # Model: keys from least to most recently used
+    for session_id, image in uploads:
+        image_bytes = bytes([image]) * 64
+        key = frame_key(session_id, image_bytes)
+        cached = cache.get(key)
+        if key in recent:
+            recent.remove(key)
+            assert cached is not None
+            # Landmarks and shape are the ones stored for these bytes in this session
+            assert cached.faces[0][0, 0] == image and cached.original_shape == (image, ord(session_id))
+            assert not cached.faces[0].flags.writeable
+        else:
+            assert cached is None
+            cache.put(key, [np.full((2, 468), float(image))], None, (image, ord(session_id)))
+        recent.append(key)
+        del recent[:-max_entries]
+        assert len(cache) == len(recent) <= max_entries
+
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == len(uploads)
+    assert stats['evicted'] == stats['misses'] - len(cache)
+
+    cache.discard('a')
+    assert len(cache) == sum(key[0] == 'b' for key in recent)
+    assert cache.stats()['discarded'] == sum(key[0] == 'a' for key in recent)
+    assert all(cache.get(key) is None for key in recent if key[0] == 'a')
+
+
+@settings(max_examples=200)
+@given(
+    faces=st.lists(
+        st.tuples(st.floats(min_value=0, max_value=100), st.booleans(), st.booleans()),
+        max_size=4
+    ),
+    in_flight=st.integers(min_value=0, max_value=16),
+    waiting=st.integers(min_value=0, max_value=16),
+    capacity=st.integers(min_value=1, max_value=8)
+)
+def test_sampling_interval_follows_urgency_and_load(faces, in_flight, waiting, capacity):
+    """
+    **Feature: drowsiness-detector, Property 29: Adaptive Sampling Interval**
+    **Validates: Requirements 2.1, 5.2**
+
+    For any faces and server load, the recommended capture interval should be the
+    fast interval whenever some face's eyes are closing, it is alerting or its score
+    is urgent; otherwise it should lie between fast and slow (stretched only under
+    overload, never beyond the overload cap) and never grow as the score rises.
+    Frames queued in front of the policy count towards the load like frames in
+    flight. With no face it should be the default interval.
+    """
+    from sampling import SamplingPolicy
+
+    policy = SamplingPolicy(urgent_score=30.0, capacity=capacity)
+    policy._in_flight = in_flight  # Frames other requests have in flight
+    policy.add_backlog(lambda: waiting)  # And frames queued for a processing thread
+    interval = policy.next_interval(faces)
+
+    if not faces:
+        assert interval == policy.default_ms
+    elif any(closing or alerting or score >= 30.0 for score, closing, alerting in faces):
+        assert interval == policy.fast_ms
+    else:
+        upper = policy.overload_ms if in_flight + waiting > capacity else policy.slow_ms
+        assert policy.fast_ms <= interval <= upper
+        if in_flight + waiting > capacity and all(score == 0 for score, _, _ in faces):
+            assert interval > policy.slow_ms
+        score = min(score for score, _, _ in faces)
+        assert policy.face_interval(score + 1.0, False, False) <= policy.face_interval(score, False, False)
+    assert policy.stats()['recommended'] == {
+        'fast': int(bool(faces) and interval == policy.fast_ms),
+        'awake': int(bool(faces) and interval != policy.fast_ms),
+        'no_face': int(not faces)
+    }
+
+
+@settings(max_examples=100)
+@given(
+    gaps=st.lists(st.floats(min_value=0, max_value=1.0), min_size=1, max_size=40),
+    rate=st.floats(min_value=0.5, max_value=10.0),
+    burst=st.integers(min_value=1, max_value=8),
+    max_active=st.integers(min_value=1, max_value=3)
+)
+def test_admission_rate_limit_and_queue_bound(gaps, rate, burst, max_active):
+    """
+    **Feature: drowsiness-detector, Property 30: Admission Control**
+    **Validates: Requirements 2.5**
+
+    For any arrival times, a session should never be admitted more than burst frames
+    plus rate per second of elapsed time, rate-limited frames should get 429 with a
+    retry time after which a frame is admitted again, and with every slot busy and
+    no queue a frame should get 503 at once.
+    """
+    from admission import AdmissionController, Rejected
+
+    now = [0.0]
+    controller = AdmissionController(max_active=max_active, max_queue=0, max_wait=1.0,
+                                     rate=rate, burst=burst, clock=lambda: now[0])
+    admitted = 0
+    for gap in gaps:
+        now[0] += gap
+        try:
+            with controller.admit('driver'):
+                admitted += 1
+        except Rejected as e:
+            assert e.reason == 'rate_limited' and e.status == 429 and e.retry_after > 0
+            assert int(e.headers()['Retry-After']) >= 1
+            now[0] += e.retry_after + 1e-9
+            with controller.admit('driver'):
+                admitted += 1
+        assert admitted <= burst + rate * now[0] + 1e-6
+
+    # Fill every slot from separate sessions, then one more frame has nowhere to wait
+    slots = [controller.admit(f'busy-{i}') for i in range(max_active)]
+    for slot in slots:
+        slot.__enter__()
+    with pytest.raises(Rejected) as rejected:
+        with controller.admit('late'):
+            pass
+    assert rejected.value.reason == 'queue_full' and rejected.value.status == 503
+    for slot in slots:
+        slot.__exit__(None, None, None)
+    assert controller.stats()['active'] == 0
+
+
+@settings(max_examples=50, deadline=None)
+@given(
+    steps=st.lists(
+        st.tuples(
+            st.sampled_from(['s1', 's2', 's3']),
+            st.integers(min_value=0, max_value=1),
+            st.floats(min_value=0.0, max_value=0.5),
+            st.one_of(st.none(), st.floats(min_value=0, max_value=1e9)),
+            st.booleans()
+        ),
+        min_size=1, max_size=30
+    )
+)
+def test_shared_sessions_agree_across_registries(tmp_path_factory, steps):
+    """
+    **Feature: drowsiness-detector, Property 31: Shared Session State**
+    **Validates: Requirements 5.1, 5.2, 5.3**
+
+    For any interleaving of frames of several sessions over two registries mapping
+    the same table (two workers), each registry should see exactly the scoring state
+    the other one left: EAR history, score, timestamps and alert flags.
+    """
+    from shared_sessions import SharedSessionRegistry
+    from scoring import ScoringState
+
+    path = str(tmp_path_factory.mktemp('state') / 'sessions.bin')
+    workers = [SharedSessionRegistry(lambda: ScoringState(5), path, history_size=5, max_sessions=4)
+               for _ in range(2)]
+    expected = {}  # Session -> what its state should hold
+    for session_id, worker, ear, closed_start, in_alert in steps:
+        with workers[worker].session(session_id) as state:
+            history, score, closed, alert = expected.get(session_id, ([], 0.0, None, False))
+            assert list(state.ear_history) == history and state.drowsy_score == score
+            assert state.eyes_closed_start == closed and state.is_in_alert == alert
+            state.ear_history.append(ear)
+            state.drowsy_score = score + ear
+            state.eyes_closed_start = closed_start
+            state.is_in_alert = in_alert
+        expected[session_id] = ((history + [ear])[-5:], score + ear, closed_start, in_alert)
+
+    assert workers[0].slots_used == workers[1].slots_used == len(expected)
+
+    workers[0].discard('s1')
+    assert workers[1].slots_used == len(expected) - ('s1' in expected)
+    with workers[1].session('s1') as state:
+        assert not state.ear_history and state.drowsy_score == 0.0 and state.eyes_closed_start is None
+
+
+@settings(max_examples=50, deadline=None)
+@given(
+    max_instances=st.integers(min_value=1, max_value=4),
+    rounds=st.integers(min_value=1, max_value=20),
+    frame_gap=st.floats(min_value=0.01, max_value=0.9)  # x (4 + 1) sessions < reclaim_seconds
+)
+def test_face_mesh_pool_full_rotation_falls_back(max_instances, rounds, frame_gap):
+    """
+    **Feature: drowsiness-detector, Property 32: Tracking Pool Under Rotation**
+
+    For any number of sessions one beyond the pool's cap sending frames in rotation
+    faster than reclaim_seconds, the pool should build exactly max_instances meshes,
+    never take one away from an active session, and send the extra session's frames
+    to the static mesh; once an instance is idle for reclaim_seconds it can be reused.
+    """
+    from face_mesh_pool import FaceMeshPool
+
+    now = [0.0]
+    built = []
+
+    def factory():
+        built.append(MockTrackingMesh())
+        return built[-1]
+
+    pool = FaceMeshPool(factory, max_instances=max_instances, reclaim_seconds=5.0, clock=lambda: now[0])
+    sessions = [f's{i}' for i in range(max_instances + 1)]
+    for _ in range(rounds):
+        for session_id in sessions:
+            with pool.acquire(session_id) as mesh:
+                assert mesh is None or not mesh.closed
+            now[0] += frame_gap
+
+    stats = pool.stats()
+    assert stats['created'] == len(built) == max_instances
+    assert stats['evicted'] == 0 and not any(mesh.closed for mesh in built)
+    assert stats['fallbacks'] == rounds
+
+    # Every instance idle past reclaim_seconds: a new session takes over the LRU one
+    now[0] += 5.0
+    with pool.acquire('late') as mesh:
+        assert mesh is not None
+    assert pool.stats()['created'] == max_instances + 1 and built[0].closed
+
+
+@settings(max_examples=3, deadline=None)
+@given(busy=st.integers(min_value=1, max_value=2))
+def test_inference_worker_death_fails_frames_and_frees_slots(busy):
+    """
+    **Feature: drowsiness-detector, Property 33: Inference Worker Failure**
+    **Validates: Requirements 2.5**
+
+    For any number of frames held by an inference worker that dies, their futures
+    should fail, their slots should be freed and the worker replaced, and process_faces
+    should raise within its timeout instead of waiting for a slot forever.
+    """
+    import os
+    import signal
+    import time
+    from inference_workers import InferenceWorkerPool
+
+    pool = InferenceWorkerPool(MockStuckMesh, 1, max_frame_bytes=8 * 8 * 3, slots_per_process=2)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    try:
+        held = [pool.submit(frame) for _ in range(busy)]
+        dead_pid = pool.stats()['pids'][0]
+        os.kill(dead_pid, signal.SIGKILL)
+        for future in held:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=10)
+        stats = pool.stats()
+        assert stats['free_slots'] == 2 and stats['failed'] == busy
+        assert stats['restarts'] == 1 and stats['pids'][0] != dead_pid
+
+        # The replacement hangs too: both slots fill up, then callers time out
+        start = time.monotonic()
+        for _ in range(3):
+            with pytest.raises(TimeoutError):
+                pool.process_faces(frame, timeout=0.2)
+        assert time.monotonic() - start < 5
+        assert pool.stats()['free_slots'] == 0
+    finally:
+        for pid in pool.stats()['pids']:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        pool.close()
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    sides=st.lists(st.integers(min_value=0, max_value=2000), min_size=4, max_size=4),
+    as_float=st.booleans(),
+    bad_key=st.sampled_from(['left', 'top', 'right', 'bottom']),
+    bad_value=st.one_of(
+        st.text(max_size=4), st.booleans(), st.none(),
+        st.sampled_from([float('nan'), float('inf'), float('-inf')]),
+        st.lists(st.integers(), max_size=2)
+    )
+)
+def test_landmark_face_box_validation(sides, as_float, bad_key, bad_value):
+    """
+    **Feature: drowsiness-detector, Property 34: Landmark Face Box Validation**
+    **Validates: Requirements 9.1**
+
+    For any well-ordered face box of finite numbers the landmark endpoint should accept
+    it (as ints); replacing any side with a string, bool, null, NaN, infinity or a
+    non-number, or dropping it, should be rejected (a 400) instead of being scored.
+    """
+    from landmarks import parse_face_box
+
+    left, right = sorted(sides[:2])
+    top, bottom = sorted(sides[2:])
+    box = {'left': left, 'top': top, 'right': right, 'bottom': bottom}
+    if as_float:
+        box = {key: value + 0.5 for key, value in box.items()}
+    assert parse_face_box(box) == {'left': left, 'top': top, 'right': right, 'bottom': bottom}
+
+    with pytest.raises(ValueError):
+        parse_face_box(dict(box, **{bad_key: bad_value}))
+    with pytest.raises(ValueError):
+        parse_face_box({key: value for key, value in box.items() if key != bad_key})
+    with pytest.raises(ValueError):
+        parse_face_box([left, top, right, bottom])
+
+
+@settings(max_examples=100, deadline=None)
+@given(
+    frames=st.lists(
+        st.tuples(st.booleans(), st.floats(min_value=0.05, max_value=0.35)),
+        min_size=1, max_size=120
+    ),
+    max_missed=st.integers(min_value=0, max_value=6)
+)
+def test_unseen_faces_follow_single_face_no_face_handling(frames, max_missed):
+    """
+    **Feature: drowsiness-detector, Property 35: Multi-Face No-Face Handling**
+    **Validates: Requirements 3.3, 5.3**
+
+    For any sequence of frames in which a tracked face is seen (with some EAR) or
+    unseen, its state should match a single-face session that gets the same frames
+    with unseen = no face: closure and confirmation state reset on every unseen frame
+    (so a returning face never alerts on a stale closure start) and an active alert
+    carries over. A face dropped after max_missed unseen frames comes back fresh.
+    """
+    from face_tracker import FaceTracks
+    from scoring import ScoringEngine
+
+    engine = ScoringEngine()
+    tracks = FaceTracks(engine.new_state, max_missed=max_missed, on_missed=engine.no_face)
+    reference = engine.new_state()
+    box = (0.3, 0.3, 0.6, 0.7)
+    tracked = False
+    unseen = 0
+    for step, (visible, ear) in enumerate(frames):
+        now = 100.0 + 0.2 * step
+        assigned, dropped = tracks.update([box] if visible else [])
+        if visible:
+            if not tracked:
+                reference = engine.new_state()  # First seen, or back after being dropped: a new face
+            tracked, unseen = True, 0
+            (_, state), = assigned
+            expected = engine.score_frame(reference, ear, now)
+            assert engine.score_frame(state, ear, now).should_alert == expected.should_alert
+        else:
+            unseen += 1
+            alerting = engine.no_face(reference)
+            tracked = tracked and unseen <= max_missed
+            if not tracked:
+                assert len(tracks) == 0
+                continue
+            (track,) = tracks.tracks.values()
+            state = track.state
+            assert state.eyes_closed_start is None and state.confirmation_start is None
+            assert state.is_in_alert == alerting
+        assert (list(state.ear_history), state.drowsy_score, state.eyes_closed_start, state.confirmation_start,
+                state.is_in_alert, state.last_alert_time) == \
+               (list(reference.ear_history), reference.drowsy_score, reference.eyes_closed_start,
+                reference.confirmation_start, reference.is_in_alert, reference.last_alert_time)
+
+
+@settings(max_examples=20, deadline=None)
+@given(
+    max_active=st.integers(min_value=1, max_value=3),
+    waiting=st.integers(min_value=1, max_value=4)
+)
+def test_admission_queue_stretches_sampling_interval(max_active, waiting):
+    """
+    **Feature: drowsiness-detector, Property 36: Admission Backlog Drives Sampling**
+    **Validates: Requirements 2.1, 2.5**
+
+    For any number of processing slots, with admission and sampling wired as in the
+    server (sampling counts a frame only once it is admitted), a full set of slots
+    alone should leave an awake driver at the slow interval, and any frame queued
+    for a slot should stretch it beyond that until the queue drains.
+    """
+    import threading
+    import time
+    from admission import AdmissionController
+    from sampling import SamplingPolicy
+
+    controller = AdmissionController(max_active=max_active, max_queue=waiting, max_wait=10.0,
+                                     rate=0, burst=1)
+    policy = SamplingPolicy(urgent_score=30.0, capacity=max_active)
+    policy.add_backlog(lambda: controller.queue_length)
+    release = threading.Event()
+
+    def frame(session_id):
+        with controller.admit(session_id), policy.frame():
+            release.wait(10.0)
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 5.0
+        while not condition():
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=frame, args=(f'busy-{i}',)) for i in range(max_active)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: policy._in_flight == max_active)
+    assert policy.next_interval([(0.0, False, False)]) == policy.slow_ms
+
+    queued = [threading.Thread(target=frame, args=(f'queued-{i}',)) for i in range(waiting)]
+    for thread in queued:
+        thread.start()
+    wait_for(lambda: controller.queue_length == waiting)
+    assert policy.next_interval([(0.0, False, False)]) > policy.slow_ms
+    assert policy.next_interval([(0.0, True, False)]) == policy.fast_ms
+
+    release.set()
+    for thread in threads + queued:
+        thread.join(timeout=10.0)
+    assert controller.stats()['active'] == 0 and controller.queue_length == 0
+    assert policy.next_interval([(0.0, False, False)]) == policy.slow_ms
+
+
+@settings(max_examples=50)
+@given(
+    clients=st.integers(min_value=2, max_value=5),
+    burst=st.integers(min_value=1, max_value=4)
+)
+def test_admission_buckets_anonymous_clients_apart(clients, burst):
+    """
+    **Feature: drowsiness-detector, Property 37: Anonymous Client Rate Limits**
+    **Validates: Requirements 2.5**
+
+    For any number of clients sharing one session under their own client keys, each
+    should get a full burst of its own, and exhausting one key's bucket should not
+    rate-limit another key of the same session.
+    """
+    from admission import AdmissionController, Rejected
+
+    controller = AdmissionController(max_active=1, max_queue=0, max_wait=1.0, rate=0.001, burst=burst,
+                                     clock=lambda: 0.0)
+    for client in range(clients):
+        for _ in range(burst):
+            with controller.admit('default', f'default@10.0.0.{client}'):
+                pass
+        with pytest.raises(Rejected) as rejected:
+            with controller.admit('default', f'default@10.0.0.{client}'):
+                pass
+        assert rejected.value.reason == 'rate_limited'
+
+
+@settings(max_examples=50, deadline=None)
+@given(
+    own=st.integers(min_value=0, max_value=1000),
+    other=st.integers(min_value=0, max_value=1000)
+)
+def test_shared_gauges_merge_without_summing(tmp_path_factory, own, other):
+    """
+    **Feature: drowsiness-detector, Property 38: Shared Gauge Merge**
+    **Validates: Requirements 6.1**
+
+    For any gauge values of two live workers, a per-process gauge should be reported
+    as their sum and a shared gauge (the same table seen by every worker) as the
+    larger one, never multiplied by the number of workers.
+    """
+    import os
+    from metrics import Metrics
+
+    directory = str(tmp_path_factory.mktemp('metrics'))
+    for shared_gauges, expected in (((), own + other), (('active_sessions',), max(own, other))):
+        registry = Metrics(directory, shared_gauges=shared_gauges)
+        registry.set_gauge('active_sessions', own)
+        # Another live worker's file (the parent process stands in for it)
+        values = registry._array().copy()
+        values[registry._gauge_index['active_sessions']] = other
+        values.tofile(os.path.join(directory, f'metrics_{os.getppid()}.bin'))
+        assert registry.collect()['gauges']['active_sessions'] == expected
@@ -0,0 +1,199 @@
+"""
+Structured tracing - diagnostic events recorded off the request path
+
+Call sites record an event name plus raw field values. Nothing is formatted and
+nothing is written on the request thread: events are appended to a bounded
+collections.deque (append/popleft are atomic, so producers never take a lock)
+and a background thread formats and writes them in batches. A disabled level
+returns before touching its arguments. Debug/info events can be sampled per
+session, so a busy server can keep full traces for a fixed share of drivers.
+"""
+import atexit
+import contextvars
+import json
+import sys
+import threading
+import time
+import traceback
+import zlib
+from collections import deque
+from contextlib import contextmanager
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+LEVELS = {name.lower(): level for level, name in LEVEL_NAMES.items()}
+
+# (session_id, sampled) of the frame being analyzed on this thread/task
+_current_session = contextvars.ContextVar('trace_session', default=(None, True))
+
+
+def parse_level(name):
+    """'debug' / 'info' / 'warning' / 'error' (or 'off') -> numeric level"""
+    name = name.lower()
+    if name == 'off':
+        return ERROR + 10
+    if name not in LEVELS:
+        raise ValueError(f'Unknown trace level: {name}')
+    return LEVELS[name]
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f'{value:.3f}'
+    if isinstance(value, str) and (not value or ' ' in value or '=' in value):
+        return json.dumps(value)
+    return str(value)
+
+
+def _json_default(value):
+    if hasattr(value, 'item'):  # NumPy scalars
+        return value.item()
+    return str(value)
+
+
+class Tracer:
+    """
+    Buffered event recorder.
+
+    level: events below it are dropped at the call site.
+    capacity: ring buffer size; when the flusher falls behind, the oldest events are dropped.
+    sample_rate: share of sessions (0-1) whose debug/info events are kept; warnings and
+    errors are always kept.
+    """
+
+    def __init__(self, level=INFO, capacity=10000, sample_rate=1.0, flush_interval=0.5,
+                 stream=None, fmt='text'):
+        if fmt not in ('text', 'json'):
+            raise ValueError("fmt must be 'text' or 'json'")
+        self.level = level
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.fmt = fmt
+        self._stream = stream
+        self._events = deque(maxlen=capacity)
+        self.recorded = 0  # Unlocked counter: may undercount slightly under heavy contention
+        self.written = 0
+        self._flush_lock = threading.Lock()  # Only the flusher side ever takes it
+        self._start_lock = threading.Lock()
+        self._flusher = None
+        self._stopped = threading.Event()
+
+    def is_sampled(self, session_id):
+        """Deterministic per-session sampling decision"""
+        if session_id is None or self.sample_rate >= 1.0:
+            return True
+        return zlib.crc32(session_id.encode('utf-8')) % 10000 < self.sample_rate * 10000
+
+    @contextmanager
+    def session(self, session_id):
+        """Attribute (and sample) the events recorded inside the block to session_id"""
+        token = _current_session.set((session_id, self.is_sampled(session_id)))
+        try:
+            yield
+        finally:
+            _current_session.reset(token)
+
+    def _record(self, level, event, session_id, fields):
+        if session_id is None:
+            session_id, sampled = _current_session.get()
+        else:
+            sampled = self.is_sampled(session_id)
+        if level < WARNING and not sampled:
+            return
+        self._events.append((time.time(), level, event, session_id, fields))
+        self.recorded += 1
+        if self._flusher is None:
+            self._start()
+
+    def debug(self, event, session_id=None, **fields):
+        if DEBUG >= self.level:
+            self._record(DEBUG, event, session_id, fields)
+
+    def info(self, event, session_id=None, **fields):
+        if INFO >= self.level:
+            self._record(INFO, event, session_id, fields)
+
+    def warning(self, event, session_id=None, **fields):
+        if WARNING >= self.level:
+            self._record(WARNING, event, session_id, fields)
+
+    def error(self, event, session_id=None, **fields):
+        if ERROR >= self.level:
+            self._record(ERROR, event, session_id, fields)
+
+    def enabled(self, level):
+        return level >= self.level
+
+    # ---- flusher side -------------------------------------------------------
+
+    def _start(self):
+        with self._start_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='trace-flush', daemon=True)
+                self._flusher.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def drain(self):
+        """Pop every buffered event (oldest first)"""
+        events = []
+        pop = self._events.popleft
+        try:
+            while True:
+                events.append(pop())
+        except IndexError:
+            return events
+
+    def format(self, event):
+        timestamp, level, name, session_id, fields = event
+        if self.fmt == 'json':
+            record = {'ts': round(timestamp, 6), 'level': LEVEL_NAMES[level].lower(), 'event': name}
+            if session_id is not None:
+                record['session'] = session_id
+            for key, value in fields.items():
+                record[key] = ''.join(traceback.format_exception(value)) if isinstance(value, BaseException) else value
+            return json.dumps(record, default=_json_default)
+
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(timestamp)) + f'.{int(timestamp % 1 * 1000):03d}Z'
+        parts = [stamp, LEVEL_NAMES[level], name]
+        if session_id is not None:
+            parts.append(f'session={_format_value(session_id)}')
+        tracebacks = []
+        for key, value in fields.items():
+            if isinstance(value, BaseException):
+                parts.append(f'{key}={_format_value(f"{type(value).__name__}: {value}")}')
+                tracebacks.append(''.join(traceback.format_exception(value)).rstrip())
+            else:
+                parts.append(f'{key}={_format_value(value)}')
+        return '\n'.join([' '.join(parts)] + tracebacks)
+
+    def flush(self):
+        """Format and write everything buffered so far in one write"""
+        with self._flush_lock:
+            events = self.drain()
+            if not events:
+                return 0
+            stream = self._stream or sys.stdout
+            stream.write(''.join(self.format(event) + '\n' for event in events))
+            stream.flush()
+            self.written += len(events)
+            return len(events)
+
+    def close(self):
+        self._stopped.set()
+        self.flush()
+
+    def stats(self):
+        """Counters for monitoring"""
+        buffered = len(self._events)
+        return {
+            'level': LEVEL_NAMES.get(self.level, 'OFF'),
+            'sample_rate': self.sample_rate,
+            'recorded': self.recorded,
+            'written': self.written,
+            'buffered': buffered,
+            'dropped': max(self.recorded - self.written - buffered, 0)
+        }
@@ -0,0 +1,287 @@
+"""
+Threshold tuning - sweep scoring parameters over labeled EAR traces
+
+Each parameter set is an explicit ScoringParams and every trace set is scored
+with scoring.score_batch() in one call, so a candidate costs one vectorized pass
+over all traces. Candidates run in parallel worker processes, each holding the
+traces in memory.
+
+Traces (one session each, times in seconds, EAR empty/NaN = no face):
+    *.csv    columns t,ear,drowsy (drowsy = 1 while the driver was actually drowsy)
+    *.rec    session recordings (see recorder.py); drowsy intervals come from
+             --labels labels.json: {"<file name or session id>": [[start, end], ...]}
+
+Per candidate it reports missed drowsy episodes (no alert between the episode's
+start and its end + --slack), detection latency (first alert after the episode
+start) and false alerts per hour (alerts starting outside every episode + slack).
+Candidates are ranked by missed episodes, then false alerts/hour, then mean latency.
+
+    python tune_thresholds.py traces/ --grid score_threshold=25,35,45 --grid ear_threshold=0.2,0.22,0.24
+    python tune_thresholds.py traces/ --random 500 --range blink_duration_max=0.2:0.8 --range confirmation_time=0:1
+"""
+import argparse
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from recorder import FILE_SUFFIX, read_recording
+from scoring import ScoringParams, score_batch
+
+DEFAULT_SLACK_SECONDS = 5.0
+
+
+# ============================================================================
+# TRACES
+# ============================================================================
+
+def load_csv_trace(path):
+    data = np.genfromtxt(path, delimiter=',', names=True, dtype=np.float64)
+    data = np.atleast_1d(data)
+    for column in ('t', 'ear', 'drowsy'):
+        if column not in data.dtype.names:
+            raise ValueError(f'{path}: missing column {column!r} (expected t,ear,drowsy)')
+    return data['t'], data['ear'], data['drowsy'] > 0
+
+
+def load_recording_trace(path, labels):
+    info, records = read_recording(path)
+    intervals = labels.get(os.path.basename(path), labels.get(info['session_id']))
+    if intervals is None:
+        raise ValueError(f'{path}: no drowsy intervals in the labels file (an empty list means none)')
+    t = np.array(records['t'], dtype=np.float64)
+    drowsy = np.zeros(len(t), dtype=bool)
+    for start, end in intervals:
+        drowsy |= (t >= start) & (t < end)
+    return t, np.array(records['raw_ear'], dtype=np.float64), drowsy
+
+
+def load_traces(paths, labels_path=None):
+    """[(name, t, ear, drowsy)] for every .csv / .rec file in paths (files or directories)"""
+    labels = {}
+    if labels_path:
+        with open(labels_path) as f:
+            labels = json.load(f)
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, f'*{FILE_SUFFIX}'))))
+        else:
+            files.append(path)
+    traces = []
+    for path in files:
+        if path.endswith(FILE_SUFFIX):
+            t, ear, drowsy = load_recording_trace(path, labels)
+        else:
+            t, ear, drowsy = load_csv_trace(path)
+        if len(t):
+            traces.append((os.path.basename(path), t, ear, drowsy))
+    return traces
+
+
+class TraceSet:
+    """Traces padded into (sessions, frames) arrays, plus the episode bookkeeping the metrics need"""
+
+    def __init__(self, traces, slack_seconds=DEFAULT_SLACK_SECONDS):
+        self.names = [name for name, *_ in traces]
+        frames = max(len(t) for _, t, _, _ in traces)
+        self.timestamps = np.full((len(traces), frames), np.nan)
+        self.ears = np.full((len(traces), frames), np.nan)
+        self.labels = np.zeros((len(traces), frames), dtype=bool)
+        for row, (_, t, ear, drowsy) in enumerate(traces):
+            self.timestamps[row, :len(t)] = t
+            self.ears[row, :len(t)] = ear
+            self.labels[row, :len(t)] = drowsy
+
+        # Episodes: (row, first frame, last frame allowed to detect it)
+        self.episodes = []
+        allowed = self.labels.copy()  # Where an alert may start without being false
+        drowsy_seconds = 0.0
+        for row, (_, t, _, drowsy) in enumerate(traces):
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], drowsy.astype(np.int8), [0]))))
+            starts, ends = edges[::2], edges[1::2]  # drowsy[start:end] is one episode
+            for start, end, next_start in zip(starts, ends, list(starts[1:]) + [len(t)]):
+                end_time = t[end] if end < len(t) else t[-1]
+                drowsy_seconds += end_time - t[start]
+                # The slack never reaches into the next episode: its alerts are its own
+                last = min(int(np.searchsorted(t, end_time + slack_seconds, side='right')), next_start) - 1
+                allowed[row, start:last + 1] = True
+                self.episodes.append((row, int(start), last))
+        self.allowed = allowed
+        total_seconds = sum(float(t[-1] - t[0]) for _, t, _, _ in traces)
+        self.alert_free_hours = max(total_seconds - drowsy_seconds, 0.0) / 3600.0
+        self.frame_count = sum(len(t) for _, t, _, _ in traces)
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def evaluate(trace_set, alerts):
+    """Detection metrics of an (sessions, frames) alert flag array"""
+    onsets = alerts.copy()
+    onsets[:, 1:] &= ~alerts[:, :-1]
+    false_alerts = int(np.count_nonzero(onsets & ~trace_set.allowed))
+
+    latencies = []
+    for row, start, last in trace_set.episodes:
+        hits = np.flatnonzero(alerts[row, start:last + 1])
+        if hits.size:
+            latencies.append(trace_set.timestamps[row, start + hits[0]] - trace_set.timestamps[row, start])
+    episodes = len(trace_set.episodes)
+    latencies = np.array(latencies)
+    return {
+        'episodes': episodes,
+        'missed': episodes - len(latencies),
+        'detection_rate': round(len(latencies) / episodes, 4) if episodes else None,
+        'latency_mean': round(float(latencies.mean()), 3) if latencies.size else None,
+        'latency_p95': round(float(np.percentile(latencies, 95)), 3) if latencies.size else None,
+        'false_alerts': false_alerts,
+        'false_alerts_per_hour': (round(false_alerts / trace_set.alert_free_hours, 3)
+                                  if trace_set.alert_free_hours else None)
+    }
+
+
+def rank_key(result):
+    """Fewest missed episodes, then fewest false alerts, then fastest detection"""
+    metrics = result['metrics']
+    latency = metrics['latency_mean']
+    return (metrics['missed'], metrics['false_alerts_per_hour'] or 0.0, latency if latency is not None else float('inf'))
+
+
+_trace_set = None
+
+
+def _load_worker(paths, labels_path, slack_seconds):
+    global _trace_set
+    _trace_set = TraceSet(load_traces(paths, labels_path), slack_seconds)
+
+
+def evaluate_candidate(overrides):
+    """Score every trace with ScoringParams(**overrides); runs in a worker process"""
+    _, alerts, _ = score_batch(_trace_set.timestamps, _trace_set.ears, ScoringParams(**overrides))
+    return {'params': overrides, 'metrics': evaluate(_trace_set, alerts)}
+
+
+# ============================================================================
+# SEARCH SPACE
+# ============================================================================
+
+def parse_values(text):
+    """'name=v1,v2,...' -> (name, [floats])"""
+    name, sep, values = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f'Expected name=v1,v2,..., got {text!r}')
+    try:
+        return name, [float(value) for value in values.split(',') if value]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{name}: values must be numbers') from None
+
+
+def parse_range(text):
+    """'name=low:high' -> (name, (low, high))"""
+    name, sep, bounds = text.partition('=')
+    low, colon, high = bounds.partition(':')
+    try:
+        if not sep or not colon:
+            raise ValueError
+        return name, (float(low), float(high))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Expected name=low:high, got {text!r}') from None
+
+
+def grid_candidates(grid):
+    """Cartesian product of the grid values: [{name: value}]"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_candidates(ranges, count, seed=0):
+    """count uniform draws from the ranges: [{name: value}]"""
+    rng = np.random.default_rng(seed)
+    return [{name: round(float(rng.uniform(low, high)), 4) for name, (low, high) in ranges.items()}
+            for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='Trace files (.csv, .rec) or directories of them')
+    parser.add_argument('--labels', help='Drowsy intervals for .rec recordings (JSON)')
+    parser.add_argument('--grid', action='append', type=parse_values, default=[], metavar='NAME=V1,V2,...',
+                        help='ScoringParams field and the values to try (repeatable; all combinations)')
+    parser.add_argument('--random', type=int, default=0, metavar='N', help='Also try N random parameter sets')
+    parser.add_argument('--range', dest='ranges', action='append', type=parse_range, default=[],
+                        metavar='NAME=LOW:HIGH', help='Range for --random (repeatable)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--slack', type=float, default=DEFAULT_SLACK_SECONDS,
+                        help='Seconds after an episode in which an alert still counts as a detection')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--top', type=int, default=10, help='Candidates to print')
+    parser.add_argument('-o', '--output', help='Write every candidate and its metrics as JSON')
+    args = parser.parse_args()
+
+    grid, ranges = dict(args.grid), dict(args.ranges)
+    if args.random and not ranges:
+        parser.error('--random needs at least one --range')
+    candidates = [{}]  # The current defaults, as the reference point
+    if grid:
+        candidates += grid_candidates(grid)
+    if args.random:
+        candidates += random_candidates(ranges, args.random, args.seed)
+    for overrides in candidates:
+        try:
+            ScoringParams(**overrides)
+        except TypeError as e:
+            parser.error(str(e))
+
+    started = time.perf_counter()
+    traces = load_traces(args.paths, args.labels)
+    if not traces:
+        parser.error('No traces found')
+    trace_set = TraceSet(traces, args.slack)
+    print(f'{len(traces)} traces, {trace_set.frame_count} frames, {len(trace_set.episodes)} drowsy episodes; '
+          f'{len(candidates)} parameter sets on {args.processes} processes', file=sys.stderr)
+
+    initargs = (args.paths, args.labels, args.slack)
+    results = []
+    if args.processes > 1 and len(candidates) > 1:
+        with multiprocessing.get_context('spawn').Pool(args.processes, _load_worker, initargs) as pool:
+            for result in pool.imap_unordered(evaluate_candidate, candidates):
+                results.append(result)
+                print(f'\r{len(results)}/{len(candidates)}', end='', file=sys.stderr, flush=True)
+        print(file=sys.stderr)
+    else:
+        global _trace_set
+        _trace_set = trace_set
+        results = [evaluate_candidate(overrides) for overrides in candidates]
+    elapsed = time.perf_counter() - started
+
+    baseline = next(result for result in results if not result['params'])
+    results.sort(key=rank_key)
+
+    def row(label, result):
+        m = result['metrics']
+        latency = f"{m['latency_mean']:.2f}s" if m['latency_mean'] is not None else '-'
+        print(f"{label:>8} missed {m['missed']:3d}/{m['episodes']:<3d} false/h {m['false_alerts_per_hour'] or 0:7.2f} "
+              f"latency {latency:>7}  {json.dumps(result['params'])}")
+
+    row('current', baseline)
+    for rank, result in enumerate(results[:args.top], 1):
+        row(f'#{rank}', result)
+    frames_scored = trace_set.frame_count * len(candidates)
+    print(f'{len(candidates)} parameter sets, {frames_scored} frames scored in {elapsed:.1f}s', file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'slack_seconds': args.slack, 'traces': trace_set.names, 'current': baseline,
+                       'results': results}, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,43 @@ if (process.env.NODE_ENV === 'production' && (!API_URL || API_URL === 'http://lo
   console.error('[ERROR] ⚠️ Set REACT_APP_API_URL to your Render backend URL in Netlify dashboard');
 }
 
+// One detection session per page load so the backend keeps this driver's state separate
+const SESSION_ID = (window.crypto && typeof window.crypto.randomUUID === 'function')
+  ? window.crypto.randomUUID()
+  : `session-${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+// Upload frames as raw JPEG bytes (canvas.toBlob) instead of base64 JSON.
+// Set REACT_APP_BINARY_UPLOAD=false to fall back to the JSON format.
+const USE_BINARY_UPLOAD = process.env.REACT_APP_BINARY_UPLOAD !== 'false';
+
+// Promise wrapper around canvas.toBlob; resolves null if the browser can't produce a blob
+const canvasToJpegBlob = (canvas, quality) => new Promise((resolve) => {
+  if (typeof canvas.toBlob !== 'function') {
+    resolve(null);
+    return;
+  }
+  canvas.toBlob((blob) => resolve(blob), 'image/jpeg', quality);
+});
+
+// Stream frames over the /ws/detect WebSocket instead of one HTTP POST per frame.
+// Per-frame overhead is low enough to sample several frames per second.
+const USE_WEBSOCKET = process.env.REACT_APP_USE_WEBSOCKET === 'true';
+const STREAM_FRAME_INTERVAL_MS = 200;
+
+// Capture loop: the backend recommends the delay before the next frame (next_capture_ms) -
+// longer while the driver is clearly awake, shorter once the eyes start closing.
+// Without a hint the loop runs at the fixed default rate.
+const DEFAULT_FRAME_INTERVAL_MS = USE_WEBSOCKET ? STREAM_FRAME_INTERVAL_MS : 1000;
+const MIN_FRAME_INTERVAL_MS = 100; // Bounds on the hint, so a bad value can't flood or stall the loop
+const MAX_FRAME_INTERVAL_MS = 5000;
+
+// Delay (ms) recommended by a detection result, or null if it has none
+const captureDelayHint = (result) => {
+  const hint = result && result.next_capture_ms;
+  if (typeof hint !== 'number' || !Number.isFinite(hint)) return null;
+  return Math.min(Math.max(hint, MIN_FRAME_INTERVAL_MS), MAX_FRAME_INTERVAL_MS);
+};
+
 function App() {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
@@ -35,7 +72,13 @@ function App() {
   const [isAlertPlaying, setIsAlertPlaying] = useState(false);
   
   const captureAndSendRef = useRef(null);
-  const detectionIntervalRef = useRef(null);
+  const detectionTimerRef = useRef(null); // Pending capture of the setTimeout chain
+  const detectionActiveRef = useRef(false); // False once unmounted - ends the chain
+  const captureDelayRef = useRef(DEFAULT_FRAME_INTERVAL_MS); // Delay before the next capture
+  const handleDetectionResultRef = useRef(null);
+  const streamRef = useRef(null); // Open /ws/detect WebSocket, if streaming
+  const streamInFlightRef = useRef(false); // Frame sent on the stream, result not back yet
+  const lastHttpPostRef = useRef(0);
 
   const suggestions = [
     '☕ Take a coffee break',
@@ -47,19 +90,59 @@ function App() {
   ];
 
   // Define callbacks first before using them
-  const startDetection = useCallback(() => {
-    // Reduced from 1500ms to 1000ms for faster detection
-    if (detectionIntervalRef.current) {
-      clearInterval(detectionIntervalRef.current);
-    }
-    
-    detectionIntervalRef.current = setInterval(() => {
-      if (captureAndSendRef.current) {
-        captureAndSendRef.current();
+
+  // Open the persistent /ws/detect stream; HTTP posts are used until it is open
+  const openStream = useCallback(() => {
+    if (streamRef.current || typeof WebSocket === 'undefined') return;
+
+    const wsUrl = `${API_URL.replace(/^http/, 'ws')}/ws/detect?session_id=${encodeURIComponent(SESSION_ID)}`;
+    const ws = new WebSocket(wsUrl);
+    streamRef.current = ws;
+
+    ws.onopen = () => {
+      console.log('[STREAM] Connected to', wsUrl);
+    };
+    ws.onmessage = (event) => {
+      streamInFlightRef.current = false;
+      if (handleDetectionResultRef.current) {
+        handleDetectionResultRef.current(JSON.parse(event.data));
       }
-    }, 1000);
+    };
+    ws.onclose = () => {
+      console.log('[STREAM] Disconnected - falling back to HTTP');
+      if (streamRef.current === ws) {
+        streamRef.current = null;
+      }
+      streamInFlightRef.current = false;
+    };
   }, []);
 
+  const startDetection = useCallback(() => {
+    if (detectionTimerRef.current) {
+      clearTimeout(detectionTimerRef.current);
+    }
+    detectionActiveRef.current = true;
+
+    if (USE_WEBSOCKET) {
+      openStream();
+    }
+
+    // setTimeout chain instead of a fixed setInterval: each capture is scheduled with the
+    // delay the last result recommended, counted from the start of the previous capture
+    const scheduleCapture = (delay) => {
+      detectionTimerRef.current = setTimeout(async () => {
+        const started = Date.now();
+        if (captureAndSendRef.current) {
+          await captureAndSendRef.current();
+        }
+        if (detectionActiveRef.current) {
+          scheduleCapture(Math.max(captureDelayRef.current - (Date.now() - started), 0));
+        }
+      }, delay);
+    };
+    scheduleCapture(captureDelayRef.current);
+  }, [openStream]);
+
   const startCamera = useCallback(async () => {
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ 
@@ -148,11 +231,114 @@ function App() {
     setIsAlertPlaying(false);
   }, []);
 
+  // Apply one detection result (from HTTP or the WebSocket stream) to the UI
+  const handleDetectionResult = useCallback((result) => {
+    // Reschedule the capture loop from the backend's hint (default rate without one)
+    captureDelayRef.current = captureDelayHint(result) ?? DEFAULT_FRAME_INTERVAL_MS;
+
+    // Handle error responses from the API
+    if (result.error) {
+      const errorMessage = result.error;
+      console.error('API error:', errorMessage);
+      setStatus(`Error: ${errorMessage}`);
+      setFaceBox(null);
+      setFaceState('searching');
+      return;
+    }
+    
+    // Enhanced debug logging
+    console.log(`[DEBUG] EAR: ${result.ear} | Raw: ${result.raw_ear} | Drowsy: ${result.is_drowsy} | Score: ${result.drowsy_score}/100 | Blink: ${result.is_blink}`);
+    
+    // Update drowsiness metrics
+    if (result.drowsy_score !== undefined) {
+      setDrowsyScore(result.drowsy_score);
+    }
+    
+    // Update face box and state
+    if (result.face_box) {
+      setFaceBox(result.face_box);
+      
+      if (result.is_drowsy) {
+        // DROWSY STATE - start alarm via state flag
+        if (!isDrowsy) {
+          console.log('[ALERT] 🚨 Backend reported drowsiness - will trigger alarm');
+        }
+        setIsDrowsy(true);
+        setFaceState('drowsy');
+        setWasAlertActive(true);
+        setStatus('🚨 WAKE UP! DROWSINESS DETECTED!');
+      } else {
+        if (isDrowsy) {
+          console.log('[ALERT] ✅ Backend cleared drowsiness - stopping alarm');
+        }
+        setIsDrowsy(false);
+        setFaceState('locked');
+        
+        // Dynamic status based on drowsiness score and message
+        const score = result.drowsy_score || 0;
+        const msg = result.message || '';
+        
+        if (msg === 'Recovered!' || msg === 'Recovering...') {
+          setStatus(`✅ ${msg}`);
+        } else if (score > 60) {
+          setStatus('⚠️ Warning - Getting very drowsy!');
+        } else if (score > 40) {
+          setStatus('⚠️ Face Locked - Eyes getting heavy...');
+        } else if (score > 20) {
+          setStatus('✅ Face Locked - Slight fatigue detected');
+        } else if (msg === 'Eyes heavy...') {
+          setStatus('✅ Face Locked - Monitoring...');
+        } else {
+          setStatus('✅ Face Locked - Alert and monitoring');
+        }
+      }
+    } else {
+      if (isDrowsy || wasAlertActive) {
+        console.log('[ALERT] ⚠️ Face lost - forcing alarm stop');
+      }
+      
+      setIsDrowsy(false);
+      setFaceBox(null);
+      setFaceState('searching');
+      setStatus(result.message || '🔍 Searching for face...');
+      setDrowsyScore(0);
+    }
+    
+    if (result.ear) {
+      setEar(result.ear);
+      
+      // Track calibration data
+      if (showCalibration && result.face_box) {
+        setCalibrationData(prev => {
+          const newMin = prev.min === null ? result.ear : Math.min(prev.min, result.ear);
+          const newMax = prev.max === null ? result.ear : Math.max(prev.max, result.ear);
+          const newCount = prev.count + 1;
+          const newAvg = prev.avg === null ? result.ear : (prev.avg * prev.count + result.ear) / newCount;
+          return { min: newMin, max: newMax, avg: newAvg, count: newCount };
+        });
+      }
+    }
+  }, [isDrowsy, wasAlertActive, showCalibration]);
+
   const captureAndSend = useCallback(async () => {
     if (!videoRef.current || !canvasRef.current) return;
 
     const canvas = canvasRef.current;
     const video = videoRef.current;
+    const stream = streamRef.current && streamRef.current.readyState === WebSocket.OPEN
+      ? streamRef.current
+      : null;
+
+    if (stream) {
+      // Streaming: one frame in flight at a time so a slow link never builds a backlog
+      if (streamInFlightRef.current) return;
+    } else if (USE_WEBSOCKET) {
+      // Stream not open: keep HTTP posts (and reconnect attempts) at the normal 1 per second
+      const now = Date.now();
+      if (now - lastHttpPostRef.current < 1000) return;
+      lastHttpPostRef.current = now;
+      openStream();
+    }
     
     canvas.width = video.videoWidth;
     canvas.height = video.videoHeight;
@@ -160,8 +346,6 @@ function App() {
     const ctx = canvas.getContext('2d');
     ctx.drawImage(video, 0, 0);
     
-    const imageData = canvas.toDataURL('image/jpeg', 0.8);
-
     try {
       // Ensure API_URL is set and valid
       if (!API_URL || API_URL === 'http://localhost:5001') {
@@ -170,16 +354,41 @@ function App() {
         return;
       }
 
-      const response = await fetch(`${API_URL}/detect_drowsiness`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ image: imageData })
-      });
+      // Binary path: raw JPEG body, ~25% smaller than base64 and no server-side decode of the string
+      const blob = USE_BINARY_UPLOAD || stream ? await canvasToJpegBlob(canvas, 0.8) : null;
+
+      if (stream) {
+        streamInFlightRef.current = true;
+        stream.send(blob || JSON.stringify({ image: canvas.toDataURL('image/jpeg', 0.8) }));
+        return;
+      }
+
+      const request = blob
+        ? {
+            method: 'POST',
+            headers: { 'Content-Type': 'image/jpeg', 'X-Session-ID': SESSION_ID },
+            body: blob
+          }
+        : {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ image: canvas.toDataURL('image/jpeg', 0.8), session_id: SESSION_ID })
+          };
+
+      const response = await fetch(`${API_URL}/detect_drowsiness`, request);
 
       // Check if response is OK before parsing JSON
       if (!response.ok) {
         const errorText = await response.text();
         console.error(`[ERROR] API returned ${response.status}: ${errorText}`);
+        // A busy server (503/429) says when to retry in next_capture_ms
+        let retry = null;
+        try {
+          retry = captureDelayHint(JSON.parse(errorText));
+        } catch (parseError) {
+          retry = null;
+        }
+        captureDelayRef.current = retry ?? DEFAULT_FRAME_INTERVAL_MS;
         setStatus(`Connection error: ${response.status}`);
         setFaceBox(null);
         setFaceState('searching');
@@ -188,89 +397,7 @@ function App() {
 
       // Parse JSON only if response is OK
       const result = await response.json();
-      
-      // Handle error responses from the API
-      if (result.error) {
-        const errorMessage = result.error;
-        console.error('API error:', errorMessage);
-        setStatus(`Error: ${errorMessage}`);
-        setFaceBox(null);
-        setFaceState('searching');
-        return;
-      }
-      
-      // Enhanced debug logging
-      console.log(`[DEBUG] EAR: ${result.ear} | Raw: ${result.raw_ear} | Drowsy: ${result.is_drowsy} | Score: ${result.drowsy_score}/100 | Blink: ${result.is_blink}`);
-      
-      // Update drowsiness metrics
-      if (result.drowsy_score !== undefined) {
-        setDrowsyScore(result.drowsy_score);
-      }
-      
-      // Update face box and state
-      if (result.face_box) {
-        setFaceBox(result.face_box);
-        
-        if (result.is_drowsy) {
-          // DROWSY STATE - start alarm via state flag
-          if (!isDrowsy) {
-            console.log('[ALERT] 🚨 Backend reported drowsiness - will trigger alarm');
-          }
-          setIsDrowsy(true);
-          setFaceState('drowsy');
-          setWasAlertActive(true);
-          setStatus('🚨 WAKE UP! DROWSINESS DETECTED!');
-        } else {
-          if (isDrowsy) {
-            console.log('[ALERT] ✅ Backend cleared drowsiness - stopping alarm');
-          }
-          setIsDrowsy(false);
-          setFaceState('locked');
-          
-          // Dynamic status based on drowsiness score and message
-          const score = result.drowsy_score || 0;
-          const msg = result.message || '';
-          
-          if (msg === 'Recovered!' || msg === 'Recovering...') {
-            setStatus(`✅ ${msg}`);
-          } else if (score > 60) {
-            setStatus('⚠️ Warning - Getting very drowsy!');
-          } else if (score > 40) {
-            setStatus('⚠️ Face Locked - Eyes getting heavy...');
-          } else if (score > 20) {
-            setStatus('✅ Face Locked - Slight fatigue detected');
-          } else if (msg === 'Eyes heavy...') {
-            setStatus('✅ Face Locked - Monitoring...');
-          } else {
-            setStatus('✅ Face Locked - Alert and monitoring');
-          }
-        }
-      } else {
-        if (isDrowsy || wasAlertActive) {
-          console.log('[ALERT] ⚠️ Face lost - forcing alarm stop');
-        }
-        
-        setIsDrowsy(false);
-        setFaceBox(null);
-        setFaceState('searching');
-        setStatus(result.message || '🔍 Searching for face...');
-        setDrowsyScore(0);
-      }
-      
-      if (result.ear) {
-        setEar(result.ear);
-        
-        // Track calibration data
-        if (showCalibration && result.face_box) {
-          setCalibrationData(prev => {
-            const newMin = prev.min === null ? result.ear : Math.min(prev.min, result.ear);
-            const newMax = prev.max === null ? result.ear : Math.max(prev.max, result.ear);
-            const newCount = prev.count + 1;
-            const newAvg = prev.avg === null ? result.ear : (prev.avg * prev.count + result.ear) / newCount;
-            return { min: newMin, max: newMax, avg: newAvg, count: newCount };
-          });
-        }
-      }
+      handleDetectionResult(result);
     } catch (err) {
       // Better error handling for network/parsing errors
       if (err instanceof SyntaxError) {
@@ -283,29 +410,40 @@ function App() {
         console.error('[ERROR] Unexpected error:', err);
         setStatus('Connection error - check console for details');
       }
+      captureDelayRef.current = DEFAULT_FRAME_INTERVAL_MS;
       setFaceBox(null);
       setFaceState('searching');
     }
-  }, [isDrowsy, wasAlertActive, showCalibration]);
+  }, [handleDetectionResult, openStream]);
   
   useEffect(() => {
     captureAndSendRef.current = captureAndSend;
   }, [captureAndSend]);
 
+  useEffect(() => {
+    handleDetectionResultRef.current = handleDetectionResult;
+  }, [handleDetectionResult]);
+
   // Mount effect - start camera
   useEffect(() => {
     startCamera();
     return () => {
       // Cleanup on unmount - capture ref values to avoid stale closure
       const video = videoRef.current;
-      const detectionInterval = detectionIntervalRef.current;
+      const detectionTimer = detectionTimerRef.current;
+      const stream = streamRef.current;
       
       if (video && video.srcObject) {
         video.srcObject.getTracks().forEach(track => track.stop());
       }
       
-      if (detectionInterval) {
-        clearInterval(detectionInterval);
+      detectionActiveRef.current = false;
+      if (detectionTimer) {
+        clearTimeout(detectionTimer);
+      }
+
+      if (stream) {
+        stream.close();
       }
       
       stopAlert(); // Stop any playing alerts
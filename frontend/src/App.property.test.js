@@ -112,6 +112,7 @@ describe('Property-Based Tests', () => {
             };
             canvas.getContext = jest.fn(() => mockContext);
             canvas.toDataURL = jest.fn(() => 'data:image/jpeg;base64,mockdata');
+            canvas.toBlob = jest.fn((callback) => callback(new Blob(['mockdata'], { type: 'image/jpeg' })));
 
             // Fast-forward past the 2 second delay for startDetection
             jest.advanceTimersByTime(2000);
@@ -220,6 +221,7 @@ describe('Property-Based Tests', () => {
             };
             canvas.getContext = jest.fn(() => mockContext);
             canvas.toDataURL = jest.fn(() => 'data:image/jpeg;base64,mockdata');
+            canvas.toBlob = jest.fn((callback) => callback(new Blob(['mockdata'], { type: 'image/jpeg' })));
 
             // Fast-forward past the 2 second delay for startDetection
             jest.advanceTimersByTime(2000);
@@ -343,6 +345,7 @@ describe('Property-Based Tests', () => {
             };
             canvas.getContext = jest.fn(() => mockContext);
             canvas.toDataURL = jest.fn(() => 'data:image/jpeg;base64,mockdata');
+            canvas.toBlob = jest.fn((callback) => callback(new Blob(['mockdata'], { type: 'image/jpeg' })));
 
             // Fast-forward past the 2 second delay for startDetection
             jest.advanceTimersByTime(2000);
@@ -550,6 +553,7 @@ describe('Property-Based Tests', () => {
             };
             canvas.getContext = jest.fn(() => mockContext);
             canvas.toDataURL = jest.fn(() => 'data:image/jpeg;base64,mockdata');
+            canvas.toBlob = jest.fn((callback) => callback(new Blob(['mockdata'], { type: 'image/jpeg' })));
 
             // Fast-forward past the 2 second delay for startDetection
             jest.advanceTimersByTime(2000);
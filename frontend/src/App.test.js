@@ -200,6 +200,7 @@ describe('App Component - Suggestions Display', () => {
       };
       canvas.getContext = jest.fn(() => mockContext);
       canvas.toDataURL = jest.fn(() => 'data:image/jpeg;base64,mockdata');
+      canvas.toBlob = jest.fn((callback) => callback(new Blob(['mockdata'], { type: 'image/jpeg' })));
 
       // Fast-forward to trigger detection
       jest.advanceTimersByTime(2000);